@@ -130,13 +130,40 @@ from django.urls import path
 from django.shortcuts import render, redirect
 from django.utils.translation import gettext_lazy as _
 from datetime import datetime
-from herbalapp.models import EngineLock, DailyIncomeReport, SponsorIncomeLog
+from herbalapp.models import EngineLock, EngineRun, DailyIncomeReport, SponsorIncomeLog
+
+ENGINE_PHASES = ("snapshot", "reset", "binary", "rank", "sponsor", "final_lock")
+
+
+class EngineRunInline(admin.TabularInline):
+    model = EngineRun
+    extra = 0
+    can_delete = False
+    ordering = ("-started_at",)
+    fields = (
+        "status", "started_at", "total_seconds", "query_count",
+        "db_time_ms", "members_processed", "rows_written", "peak_rss_kb",
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(EngineLock)
 class EngineLockAdmin(admin.ModelAdmin):
-    list_display = ("run_date", "is_running", "started_at", "finished_at")
+    list_display = ("run_date", "is_running", "started_at", "heartbeat_at", "progress", "finished_at")
     list_filter = ("is_running", "run_date")
     ordering = ("-run_date",)
+    readonly_fields = ("heartbeat_at", "progress_done", "progress_total")
+    inlines = [EngineRunInline]
+
+    @admin.display(description="Progress")
+    def progress(self, obj):
+        if not obj.progress_total:
+            return "-"
+        percent = obj.progress_done * 100 // obj.progress_total
+        return f"{obj.progress_done} / {obj.progress_total} ({percent}%)"
 
     change_list_template = "admin/engine_lock_changelist.html"
 
@@ -179,3 +206,33 @@ class EngineLockAdmin(admin.ModelAdmin):
         )
         return render(request, "admin/manual_engine_run.html", context)
 
+
+
+# ==========================================================
+# ✅ ENGINE RUN METRICS (next to EngineLock)
+# ==========================================================
+def _phase_column(name):
+    def column(obj):
+        phase = (obj.phases or {}).get(name)
+        if not phase:
+            return "-"
+        return f"{phase['seconds']:.2f}s / {phase['queries']}q"
+
+    column.short_description = name.replace("_", " ").title()
+    return column
+
+
+@admin.register(EngineRun)
+class EngineRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "run_date", "status", "started_at", "total_seconds",
+        *[_phase_column(name) for name in ENGINE_PHASES],
+        "query_count", "db_time_ms", "members_processed", "rows_written", "peak_rss_kb",
+    )
+    list_filter = ("status", "run_date")
+    date_hierarchy = "run_date"
+    ordering = ("-started_at",)
+    readonly_fields = [f.name for f in EngineRun._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,34 @@
+# herbalapp/management/commands/_dry_run.py
+"""Shared --dry-run / --output handling for the engine commands."""
+
+from herbalapp.mlm.final_master_engine import run_full_daily_engine, write_dry_run_jsonl
+
+
+def add_dry_run_arguments(parser):
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Simulate the day: compute all phases, write NOTHING, no EngineLock"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="With --dry-run: write per-member rows + totals to this JSONL file"
+    )
+
+
+def handle_dry_run(command, run_date, options):
+    command.stdout.write(f"🧪 DRY RUN for {run_date} (nothing will be written)")
+
+    result = run_full_daily_engine(run_date, workers=options.get("workers", 1), dry_run=True)
+
+    if options.get("output"):
+        with open(options["output"], "w", encoding="utf-8") as fp:
+            write_dry_run_jsonl(result, fp)
+        command.stdout.write(f"📝 {len(result['rows'])} rows written to {options['output']}")
+
+    for name, value in result["totals"].items():
+        command.stdout.write(f"   {name}: {value}")
+
+    command.stdout.write(command.style.SUCCESS("✅ Dry run completed"))
+    return result
@@ -0,0 +1,33 @@
+# herbalapp/management/commands/compact_monthly_bv.py
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from herbalapp.mlm.bv_rollup import compact_monthly_bv
+
+
+class Command(BaseCommand):
+    help = "Rebuild MemberMonthlyBV (self / left / right BV per month) from paid orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--month",
+            type=str,
+            help="Only this month (YYYY-MM); default = every month"
+        )
+
+    def handle(self, *args, **options):
+        month = None
+        if options.get("month"):
+            try:
+                month = datetime.strptime(options["month"], "%Y-%m").date()
+            except ValueError:
+                raise CommandError("❌ Invalid month. Use YYYY-MM")
+
+        label = f"{month:%Y-%m}" if month else "all months"
+        self.stdout.write(f"🔄 Compacting monthly BV for {label}...")
+
+        count = compact_monthly_bv(month)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Monthly BV compacted: {count} rows ({label})"))
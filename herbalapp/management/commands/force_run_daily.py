@@ -6,6 +6,7 @@ from datetime import date
 
 from herbalapp.models import EngineLock
 from herbalapp.mlm.final_master_engine import run_full_daily_engine
+from herbalapp.management.commands._dry_run import add_dry_run_arguments, handle_dry_run
 
 
 class Command(BaseCommand):
@@ -17,6 +18,18 @@ class Command(BaseCommand):
             type=str,
             help="Date to run engine (YYYY-MM-DD)"
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Compute the binary phase in N worker processes (default 1 = serial)"
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Keep the EngineLock checkpoint and continue the crashed run (no reset)"
+        )
+        add_dry_run_arguments(parser)
 
     def handle(self, *args, **options):
         # ✅ Set run_date
@@ -25,12 +38,26 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR("❌ Invalid date format. Use YYYY-MM-DD"))
             return
 
+        # 🧪 Simulation: no lock, no writes
+        if options["dry_run"]:
+            handle_dry_run(self, run_date, options)
+            return
+
         self.stdout.write(f"⚡ Force running MLM Engine for {run_date}")
 
-        # ✅ FORCE means: clear lock and re-run clean
-        deleted = EngineLock.objects.filter(run_date=run_date).delete()[0]
-        if deleted:
-            self.stdout.write(self.style.WARNING(f"🗑️ Deleted existing EngineLock for {run_date}"))
+        if options["resume"]:
+            # ⏩ RESUME means: release the lock but KEEP its checkpoint
+            EngineLock.objects.filter(run_date=run_date).update(
+                is_running=False,
+                started_at=None,
+                finished_at=None,
+            )
+            self.stdout.write(self.style.WARNING(f"⏩ EngineLock released for resume ({run_date})"))
+        else:
+            # ✅ FORCE means: clear lock and re-run clean
+            deleted = EngineLock.objects.filter(run_date=run_date).delete()[0]
+            if deleted:
+                self.stdout.write(self.style.WARNING(f"🗑️ Deleted existing EngineLock for {run_date}"))
 
         # 🔒 Create fresh lock (optional but nice for audit)
         EngineLock.objects.get_or_create(run_date=run_date)
@@ -38,7 +65,11 @@ class Command(BaseCommand):
 
         # 🚀 Run engine (engine itself must handle duplicate-safe flags)
         try:
-            run_full_daily_engine(run_date)
+            run_full_daily_engine(
+                run_date,
+                workers=options["workers"],
+                resume=options["resume"],
+            )
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"❌ Error: {e}"))
             return
@@ -6,8 +6,8 @@ from datetime import date
 from django.core.management.base import BaseCommand
 from django.utils.dateparse import parse_date
 
-from herbalapp.mlm.engine_lock import run_with_lock
 from herbalapp.mlm.final_master_engine import run_full_daily_engine
+from herbalapp.management.commands._dry_run import add_dry_run_arguments, handle_dry_run
 
 
 # ==========================================================
@@ -22,15 +22,38 @@ class Command(BaseCommand):
             type=str,
             help="Run date in YYYY-MM-DD format (optional)"
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Compute the binary phase in N worker processes (default 1 = serial)"
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue a crashed run from its last committed checkpoint (no reset)"
+        )
+        add_dry_run_arguments(parser)
 
     def handle(self, *args, **options):
         run_date = parse_date(options["date"]) if options.get("date") else date.today()
 
+        # 🧪 Simulation: no lock, no writes
+        if options["dry_run"]:
+            handle_dry_run(self, run_date, options)
+            return
+
         self.stdout.write(f"🚀 Running MLM Master Engine for {run_date}")
 
         try:
             # 🔒 LOCK-SAFE execution (CRITICAL)
-            run_with_lock(run_date, run_full_daily_engine)
+            # run_full_daily_engine takes the EngineLock itself (run_with_lock);
+            # wrapping it again here made the inner call see "already running"
+            run_full_daily_engine(
+                run_date,
+                workers=options["workers"],
+                resume=options["resume"],
+            )
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"❌ Error: {e}"))
             return
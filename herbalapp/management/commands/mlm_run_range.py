@@ -0,0 +1,48 @@
+# ==========================================================
+# herbalapp/management/commands/mlm_run_range.py
+# ==========================================================
+
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from herbalapp.mlm.final_master_engine import run_engine_range
+
+
+# ==========================================================
+# Backfill missed days (ONE tree load, per-day EngineLock)
+# ==========================================================
+class Command(BaseCommand):
+    help = "Replay MLM Daily Engine for a date range (missed beat days backfill)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=str, required=True, help="First date (YYYY-MM-DD)")
+        parser.add_argument("--end", type=str, required=True, help="Last date (YYYY-MM-DD, inclusive)")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Compute the binary phase in N worker processes (default 1 = serial)"
+        )
+
+    def handle(self, *args, **options):
+        start_date = parse_date(options["start"])
+        end_date = parse_date(options["end"])
+        if start_date is None or end_date is None:
+            self.stdout.write(self.style.ERROR("❌ Invalid date format. Use YYYY-MM-DD"))
+            return
+
+        self.stdout.write(f"🚀 Backfilling MLM Engine {start_date} → {end_date}")
+
+        try:
+            outcome = run_engine_range(start_date, end_date, workers=options["workers"])
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"❌ Error: {e}"))
+            return
+
+        for run_date, ran in outcome:
+            if ran:
+                self.stdout.write(f"✅ {run_date} processed")
+            else:
+                self.stdout.write(self.style.WARNING(f"⛔ {run_date} skipped (EngineLock)"))
+
+        self.stdout.write(self.style.SUCCESS("✅ Backfill Completed"))
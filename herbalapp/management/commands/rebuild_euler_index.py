@@ -0,0 +1,18 @@
+# herbalapp/management/commands/rebuild_euler_index.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from herbalapp.mlm.euler_index import rebuild_euler_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the Euler-tour index (Member.tin / tout / depth) for ALL members"
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Rebuilding Euler-tour index from tree snapshot...")
+
+        with transaction.atomic():
+            count = rebuild_euler_index()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Euler-tour index rebuilt for {count} members"))
@@ -0,0 +1,18 @@
+# herbalapp/management/commands/rebuild_leg_stats.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from herbalapp.mlm.leg_stats import rebuild_leg_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild MemberLegStats (left/right leg counters) for ALL members"
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Rebuilding leg counters from tree snapshot...")
+
+        with transaction.atomic():
+            count = rebuild_leg_stats()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Leg counters rebuilt for {count} members"))
@@ -0,0 +1,18 @@
+# herbalapp/management/commands/rebuild_member_bv.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from herbalapp.mlm.bv_rollup import rebuild_member_bv
+
+
+class Command(BaseCommand):
+    help = "Rebuild MemberBV (self / left / right / leg BV rollup) for ALL members"
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Rebuilding BV rollup from paid orders + tree snapshot...")
+
+        with transaction.atomic():
+            count = rebuild_member_bv()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ BV rollup rebuilt for {count} members"))
@@ -0,0 +1,18 @@
+# herbalapp/management/commands/rebuild_sponsor_closure.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from herbalapp.mlm.sponsor_closure import rebuild_sponsor_closure
+
+
+class Command(BaseCommand):
+    help = "Rebuild the sponsor-tree closure table (SponsorClosure) for ALL members"
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Rebuilding sponsor closure from sponsor links...")
+
+        with transaction.atomic():
+            count = rebuild_sponsor_closure()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Sponsor closure rebuilt ({count} rows)"))
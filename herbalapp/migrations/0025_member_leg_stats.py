@@ -0,0 +1,30 @@
+# Generated by Django 5.0.3 on 2026-10-17 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0024_alter_member_joined_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberLegStats',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leg_stats', serialize=False, to='herbalapp.member')),
+                ('left_total', models.IntegerField(default=0)),
+                ('right_total', models.IntegerField(default=0)),
+                ('left_active', models.IntegerField(default=0)),
+                ('right_active', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Member Leg Stats',
+                'verbose_name_plural': 'Member Leg Stats',
+                'db_table': 'herbalapp_member_leg_stats',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.3 on 2026-10-17 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0025_member_leg_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyLegSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('left_total', models.IntegerField(default=0)),
+                ('right_total', models.IntegerField(default=0)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leg_snapshots', to='herbalapp.member')),
+            ],
+            options={
+                'db_table': 'herbalapp_daily_leg_snapshot',
+                'ordering': ['-date', 'member'],
+                'indexes': [models.Index(fields=['date'], name='leg_snapshot_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailylegsnapshot',
+            constraint=models.UniqueConstraint(fields=('member', 'date'), name='unique_member_date_leg_snapshot'),
+        ),
+    ]
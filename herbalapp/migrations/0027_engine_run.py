@@ -0,0 +1,40 @@
+# Generated by Django 5.0.3 on 2026-10-17 10:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0026_daily_leg_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EngineRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_date', models.DateField(db_index=True)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('success', 'Success'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('total_seconds', models.FloatField(default=0)),
+                ('query_count', models.PositiveIntegerField(default=0)),
+                ('db_time_ms', models.FloatField(default=0)),
+                ('members_processed', models.PositiveIntegerField(default=0)),
+                ('rows_written', models.PositiveIntegerField(default=0)),
+                ('peak_rss_kb', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('phases', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True, default='')),
+                ('lock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='herbalapp.enginelock')),
+            ],
+            options={
+                'verbose_name': 'Engine Run',
+                'verbose_name_plural': 'Engine Runs',
+                'db_table': 'engine_run',
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
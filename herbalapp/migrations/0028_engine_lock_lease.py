@@ -0,0 +1,28 @@
+# Generated by Django 5.0.3 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0027_engine_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enginelock',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last heartbeat from the running engine', null=True),
+        ),
+        migrations.AddField(
+            model_name='enginelock',
+            name='progress_done',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='enginelock',
+            name='progress_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
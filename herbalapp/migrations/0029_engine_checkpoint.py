@@ -0,0 +1,23 @@
+# Generated by Django 5.0.3 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0028_engine_lock_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enginelock',
+            name='checkpoint_member_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='enginelock',
+            name='checkpoint_phase',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.3 on 2026-10-17 10:00
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0029_engine_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberBV',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='bv_stats', serialize=False, to='herbalapp.member')),
+                ('self_bv', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('left_bv', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('right_bv', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('left_leg_bv', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('right_leg_bv', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Member BV',
+                'verbose_name_plural': 'Member BV',
+                'db_table': 'herbalapp_member_bv',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.3 on 2026-10-17 10:00
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0030_member_bv'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberMonthlyBV',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('self_bv', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('left_bv', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('right_bv', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_bv', to='herbalapp.member')),
+            ],
+            options={
+                'db_table': 'herbalapp_member_monthly_bv',
+                'ordering': ['-month', 'member'],
+                'indexes': [models.Index(fields=['month'], name='monthly_bv_month_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='membermonthlybv',
+            constraint=models.UniqueConstraint(fields=('member', 'month'), name='unique_member_month_bv'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.3 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0031_member_monthly_bv'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='depth',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='tin',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='tout',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['tin'], name='member_tin_idx'),
+        ),
+    ]
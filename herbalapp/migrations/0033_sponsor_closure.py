@@ -0,0 +1,31 @@
+# Generated by Django 5.0.3 on 2026-10-17 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0032_member_euler_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SponsorClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sponsor_descendants', to='herbalapp.member')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sponsor_ancestors', to='herbalapp.member')),
+            ],
+            options={
+                'db_table': 'herbalapp_sponsor_closure',
+                'indexes': [models.Index(fields=['ancestor', 'level'], name='sponsor_closure_level_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sponsorclosure',
+            constraint=models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_sponsor_closure_pair'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0033_sponsor_closure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='tree_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
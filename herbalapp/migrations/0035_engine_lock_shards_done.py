@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-17 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0034_member_tree_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enginelock',
+            name='shards_done',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
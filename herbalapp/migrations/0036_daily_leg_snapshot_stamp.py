@@ -0,0 +1,26 @@
+# Generated by Django 5.0.3 on 2026-10-17 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0035_engine_lock_shards_done'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyLegSnapshotStamp',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('tree_stamp', models.CharField(max_length=40)),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'herbalapp_daily_leg_snapshot_stamp',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-17 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0036_daily_leg_snapshot_stamp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='path_joined',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
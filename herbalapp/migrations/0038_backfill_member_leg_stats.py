@@ -0,0 +1,21 @@
+# Generated by Django 5.0.3 on 2026-10-17 11:00
+
+from django.db import migrations
+
+
+def backfill_leg_stats(apps, schema_editor):
+    # incremental writers (leg_stats) assume every existing member has its row
+    from herbalapp.mlm.leg_stats import rebuild_leg_stats
+
+    rebuild_leg_stats()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0037_member_path_joined'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_leg_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.3 on 2026-10-17 11:00
+
+from django.db import migrations
+
+
+def backfill_member_bv(apps, schema_editor):
+    # incremental writers (bv_rollup) assume every existing member has its row
+    from herbalapp.mlm.bv_rollup import rebuild_member_bv
+
+    rebuild_member_bv()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0038_backfill_member_leg_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_member_bv, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.3 on 2026-10-17 11:00
+
+from django.db import migrations
+
+
+def backfill_monthly_bv(apps, schema_editor):
+    # order changes only add deltas to MemberMonthlyBV -> start from every month's totals
+    from herbalapp.mlm.bv_rollup import compact_monthly_bv
+
+    compact_monthly_bv()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0039_backfill_member_bv'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_monthly_bv, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.3 on 2026-10-17 11:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('herbalapp', '0040_backfill_member_monthly_bv'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='enginerun',
+            name='lock',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='runs', to='herbalapp.enginelock'),
+        ),
+    ]
@@ -0,0 +1,253 @@
+# herbalapp/mlm/asof_index.py
+"""
+As-of-date leg counts (NumPy, in memory)
+
+Built ONCE from a TreeSnapshot:
+
+    Euler order     -> every subtree is one contiguous slice
+    key per node    -> latest joined_date on the path from its root
+                       (node visible on day D  <=>  key <= D)
+    merge-sort tree -> level k = Euler keys sorted inside blocks of 2**k
+
+✅ count_as_of(member_id, side, day)  -> O(log² N)
+   (O(log N) blocks per leg slice, one searchsorted per block)
+✅ leg_totals(*days) -> every member for every day, one cumsum per day
+   (same dict as TreeSnapshot.leg_totals, used by the engine and the
+   range backfill)
+✅ tree_stamp(day) -> hash of everything the counts of that day depend on
+   (decides whether stored DailyLegSnapshot rows are still valid)
+
+Counting rules are the ones of count_all_descendants: a node counts only
+when joined_date <= day, a node not yet joined hides its whole subtree,
+only "left"/"right" edges are followed.
+
+Keys are measured from the ROOT, the walk starts below the member.
+They only disagree when the member or one of its uplines joined after
+the day while someone below had already joined (back-dated rows).
+Such members are answered exactly from the snapshot instead.
+"""
+
+import hashlib
+
+import numpy as np
+
+SIDES = ("left", "right")
+SIDE_CODES = {"left": 1, "right": 2}
+
+# joined_date missing -> never visible
+NEVER = np.iinfo(np.int64).max
+
+
+def _day(value):
+    return NEVER if value is None else value.toordinal()
+
+
+class AsOfLegIndex:
+    """Euler tour + merge-sort tree over one TreeSnapshot."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        n = len(snapshot)
+
+        children = [[] for _ in range(n)]
+        roots = []
+        for pos, parent_pos in enumerate(snapshot.parent_pos):
+            if parent_pos < 0 or snapshot.sides[pos] not in SIDES:
+                roots.append(pos)
+            else:
+                children[parent_pos].append(pos)
+        self.children = children
+
+        joined = [_day(d) for d in snapshot.joined_dates]
+        key = list(joined)
+        start = [-1] * n
+        order = []
+
+        # iterative pre-order DFS (parent before its subtree)
+        for root in roots:
+            stack = [root]
+            while stack:
+                pos = stack.pop()
+                start[pos] = len(order)
+                order.append(pos)
+                own_key = key[pos]
+                for child in reversed(children[pos]):
+                    if own_key > key[child]:
+                        key[child] = own_key
+                    stack.append(child)
+
+        # nodes caught in a parent cycle are never reached (start = -1)
+        size = [0] * n
+        edges = []
+        for pos in reversed(order):
+            size[pos] += 1
+            for child in children[pos]:
+                size[pos] += size[child]
+                edges.append(child)
+
+        self.joined = np.array(joined, dtype=np.int64)
+        self.key = np.array(key, dtype=np.int64)
+        self.start = np.array(start, dtype=np.int64)
+        self.size = np.array(size, dtype=np.int64)
+        self.order = np.array(order, dtype=np.int64)
+        self.euler_key = self.key[self.order]
+
+        # every placed child once: (child, parent, side)
+        self.edge_child = np.array(edges, dtype=np.int64)
+        self.edge_parent = np.array(snapshot.parent_pos, dtype=np.int64)[self.edge_child]
+        self.edge_left = np.array(snapshot.sides, dtype=object)[self.edge_child] == "left"
+
+        self._levels = None
+        self._placement = None
+
+    # ------------------------------------------------------
+    # Tree stamp (validity of stored DailyLegSnapshot rows)
+    # ------------------------------------------------------
+    def tree_stamp(self, day):
+        """
+        SHA-1 of (id, parent_id, side, joined_date) of every member joined
+        on or before `day`, in id order. Leg counts as of `day` can only
+        change when this does (moves, deletes, back-dated or late joins,
+        admin edits of parent / side / joined_date).
+        """
+        if self._placement is None:
+            snapshot = self.snapshot
+            placement = np.array(
+                [
+                    snapshot.ids,
+                    [-1 if p is None else p for p in snapshot.parent_ids],
+                    [SIDE_CODES.get(side, 0) for side in snapshot.sides],
+                    self.joined,
+                ],
+                dtype=np.int64,
+            ).T
+            self._placement = placement[np.argsort(placement[:, 0], kind="stable")]
+
+        rows = self._placement[self._placement[:, 3] <= day.toordinal()]
+        return hashlib.sha1(np.ascontiguousarray(rows).tobytes()).hexdigest()
+
+    # ------------------------------------------------------
+    # Merge-sort tree (built on first count_as_of)
+    # ------------------------------------------------------
+    def levels(self):
+        if self._levels is not None:
+            return self._levels
+
+        width = 1
+        while width < len(self.euler_key):
+            width *= 2
+        base = np.full(width, NEVER, dtype=np.int64)
+        base[:len(self.euler_key)] = self.euler_key
+
+        levels = [base]
+        block = 2
+        while block <= width:
+            levels.append(np.sort(base.reshape(-1, block), axis=1).ravel())
+            block *= 2
+
+        self._levels = levels
+        return levels
+
+    def _count_visible(self, lo, hi, day):
+        """Euler slots lo..hi-1 with key <= day (O(log N) blocks)."""
+        levels = self.levels()
+        total = 0
+        level = 0
+        while lo < hi:
+            keys = levels[level]
+            if lo & 1:
+                total += int(np.searchsorted(keys[lo << level:(lo + 1) << level], day, side="right"))
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                total += int(np.searchsorted(keys[hi << level:(hi + 1) << level], day, side="right"))
+            lo >>= 1
+            hi >>= 1
+            level += 1
+        return total
+
+    def _walk(self, pos, side, day):
+        """Exact count below pos (members whose upline joined after day)."""
+        sides = self.snapshot.sides
+        stack = [c for c in self.children[pos] if sides[c] == side]
+        count = 0
+        while stack:
+            child = stack.pop()
+            if self.joined[child] > day:
+                continue
+            count += 1
+            stack.extend(self.children[child])
+        return count
+
+    # ------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------
+    def count_as_of(self, member_id, side, as_of_date=None):
+        """
+        Members in member_id's side leg joined on/before as_of_date
+        (None = lifetime). Unknown member -> 0.
+        """
+        pos = self.snapshot.index.get(member_id)
+        if pos is None or self.start[pos] < 0:
+            return 0
+
+        legs = [c for c in self.children[pos] if self.snapshot.sides[c] == side]
+        if as_of_date is None:
+            return int(sum(self.size[c] for c in legs))
+
+        day = as_of_date.toordinal()
+        if self.key[pos] > day:
+            return self._walk(pos, side, day)
+
+        return sum(
+            self._count_visible(int(self.start[c]), int(self.start[c] + self.size[c]), day)
+            for c in legs
+        )
+
+    def _day_totals(self, as_of_date):
+        """(left, right) arrays for every position on one day."""
+        n = len(self.snapshot)
+        child = self.edge_child
+        lo = self.start[child]
+        hi = lo + self.size[child]
+
+        if as_of_date is None:
+            counts = self.size[child]
+        else:
+            day = as_of_date.toordinal()
+            visible = np.zeros(len(self.euler_key) + 1, dtype=np.int64)
+            np.cumsum(self.euler_key <= day, out=visible[1:])
+            counts = visible[hi] - visible[lo]
+
+        left = np.bincount(self.edge_parent[self.edge_left], counts[self.edge_left], minlength=n)
+        right = np.bincount(self.edge_parent[~self.edge_left], counts[~self.edge_left], minlength=n)
+        return left.astype(np.int64).tolist(), right.astype(np.int64).tolist()
+
+    def _exact_for(self, as_of_date):
+        """True when root-measured keys give the walk's numbers for every member."""
+        if as_of_date is None:
+            return True
+        day = as_of_date.toordinal()
+        reached = self.start >= 0
+        return not np.any(reached & (self.joined <= day) & (self.key > day))
+
+    def leg_totals(self, *as_of_dates):
+        """
+        {member_id: ((left, right), ...)} -> one pair per date, same as
+        TreeSnapshot.leg_totals (back-dated trees fall back to its pass).
+        """
+        per_day = []
+        for as_of in as_of_dates:
+            if self._exact_for(as_of):
+                per_day.append(self._day_totals(as_of))
+            else:
+                exact = self.snapshot.leg_totals(as_of)
+                per_day.append((
+                    [exact[member_id][0][0] for member_id in self.snapshot.ids],
+                    [exact[member_id][0][1] for member_id in self.snapshot.ids],
+                ))
+
+        return {
+            member_id: tuple((left[pos], right[pos]) for left, right in per_day)
+            for pos, member_id in enumerate(self.snapshot.ids)
+        }
@@ -0,0 +1,89 @@
+# herbalapp/mlm/binary_vector.py
+"""
+Vectorized Binary & Flashout calculator (NumPy)
+
+Array version of calculate_member_binary_income_for_day():
+one call computes the whole binary phase for ALL members.
+
+✅ Same rules, same order (eligibility pair -> binary -> flashout -> CF)
+✅ Integer math only: every income is returned in PAISE (int64)
+✅ Exactly matches the scalar function, element by element
+"""
+
+import numpy as np
+
+PAISE = 100
+
+
+def _paise(amount):
+    return int(amount * PAISE)
+
+
+def calculate_binary_income_vector(
+        left_today,
+        right_today,
+        left_cf_before,
+        right_cf_before,
+        binary_eligible,
+        became_binary_eligible_today
+):
+    """
+    All arguments are 1-D arrays of equal length (one slot per member).
+
+    Returns dict of int64 arrays:
+        binary_pairs_paid, flashout_units, flashout_pairs_used, washed_pairs,
+        left_cf_after, right_cf_after,
+        eligibility_income, binary_income, flashout_income, total_income  (paise)
+    """
+    from herbalapp.mlm.final_master_engine import (
+        DAILY_BINARY_PAIR_LIMIT,
+        ELIGIBILITY_BONUS,
+        FLASHOUT_PAIR_UNIT,
+        MAX_FLASHOUT_UNITS,
+        PAIR_VALUE,
+    )
+
+    L = np.asarray(left_today, dtype=np.int64) + np.asarray(left_cf_before, dtype=np.int64)
+    R = np.asarray(right_today, dtype=np.int64) + np.asarray(right_cf_before, dtype=np.int64)
+    eligible = np.asarray(binary_eligible, dtype=bool)
+    became = np.asarray(became_binary_eligible_today, dtype=bool)
+
+    # 0️⃣ Not eligible yet -> only flashout (no binary)
+    flashout_only = ~eligible & ~became
+
+    # 1️⃣ Eligibility day -> consume the locked 2:1 / 1:2 pair first
+    take_2_1 = became & (L >= 2) & (R >= 1)
+    take_1_2 = became & ~take_2_1 & (L >= 1) & (R >= 2)
+    L = L - np.where(take_2_1, 2, 0) - np.where(take_1_2, 1, 0)
+    R = R - np.where(take_2_1, 1, 0) - np.where(take_1_2, 2, 0)
+
+    # Binary pairs: 4 on eligibility day, 5 on a normal day
+    pair_limit = np.where(became, DAILY_BINARY_PAIR_LIMIT - 1, DAILY_BINARY_PAIR_LIMIT)
+    binary_pairs_paid = np.where(flashout_only, 0, np.minimum(np.minimum(L, R), pair_limit))
+    L = L - binary_pairs_paid
+    R = R - binary_pairs_paid
+
+    # Flashout after binary income
+    remaining_pairs = np.minimum(L, R)
+    flashout_units = np.minimum(remaining_pairs // FLASHOUT_PAIR_UNIT, MAX_FLASHOUT_UNITS)
+    used_pairs = flashout_units * FLASHOUT_PAIR_UNIT
+    L = L - used_pairs
+    R = R - used_pairs
+    washed_pairs = remaining_pairs - used_pairs
+
+    eligibility_income = np.where(became, _paise(ELIGIBILITY_BONUS), 0).astype(np.int64)
+    binary_income = binary_pairs_paid * _paise(PAIR_VALUE)
+    flashout_income = flashout_units * _paise(1000)
+
+    return {
+        "binary_pairs_paid": binary_pairs_paid,
+        "flashout_units": flashout_units,
+        "flashout_pairs_used": used_pairs,
+        "washed_pairs": washed_pairs,
+        "left_cf_after": L,
+        "right_cf_after": R,
+        "eligibility_income": eligibility_income,
+        "binary_income": binary_income,
+        "flashout_income": flashout_income,
+        "total_income": np.where(flashout_only, 0, eligibility_income + binary_income),
+    }
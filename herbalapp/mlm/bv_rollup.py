@@ -0,0 +1,325 @@
+# herbalapp/mlm/bv_rollup.py
+"""
+Lifetime BV rollup (MemberBV)
+
+✅ ONE GROUP BY for every member's own Paid-order BV
+✅ Rolled up the placement tree in ONE post-order pass (TreeSnapshot)
+✅ Order Paid / un-Paid -> BV pushed up the ancestor chain in ONE UPDATE
+   (herbalapp.signals, same transaction as the order save)
+✅ Move / delete -> subtree BV shifted between uplines (tree_events)
+✅ Reads -> one row via get_member_bv(member) / get_leg_bv(member)
+✅ Full rebuild: python manage.py rebuild_member_bv
+   (existing trees are backfilled by migration 0039; incremental
+   updates assume a complete table)
+
+MemberMonthlyBV keeps the same self / own-side numbers per calendar month
+(compact_monthly_bv fills it, migration 0040 backfilled existing months,
+order changes keep it current).
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DateField, DecimalField, F, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from herbalapp.mlm import tree_cache
+from herbalapp.models import Member, MemberBV, MemberMonthlyBV, Order
+from herbalapp.utils.tree_utils import get_ancestor_chain
+
+CHUNK_SIZE = 5000
+
+ZERO = Decimal("0.00")
+
+
+def member_own_bv():
+    """{member_id: BV of the member's own Paid orders} (single GROUP BY)."""
+    rows = (
+        Order.objects.filter(status="Paid")
+        .values("member_id")
+        .annotate(bv=Sum(F("product__bv_value") * F("quantity")))
+        .values_list("member_id", "bv")
+    )
+    return {member_id: bv for member_id, bv in rows if bv}
+
+
+def _ensure_rows(member_ids):
+    MemberBV.objects.bulk_create(
+        [MemberBV(member_id=member_id) for member_id in member_ids],
+        ignore_conflicts=True,
+    )
+
+
+def _bv(amount):
+    return Value(Decimal(amount), output_field=DecimalField(max_digits=16, decimal_places=2))
+
+
+def _leg_case(ids, amount):
+    return Case(When(member_id__in=ids, then=_bv(amount)), default=_bv(0))
+
+
+def _shift_chain(chain, left, right, total):
+    """
+    ONE UPDATE over every ancestor in chain:
+    left_bv += left, right_bv += right (own-side BV, same for all uplines)
+    left_leg_bv / right_leg_bv += total on the leg holding the subtree
+    """
+    if not chain or (left == 0 and right == 0 and total == 0):
+        return
+
+    ancestor_ids = [ancestor_id for ancestor_id, _ in chain]
+    _ensure_rows(ancestor_ids)
+
+    left_ids = [ancestor_id for ancestor_id, side in chain if side == "left"]
+    right_ids = [ancestor_id for ancestor_id, side in chain if side == "right"]
+
+    MemberBV.objects.filter(member_id__in=ancestor_ids).update(
+        left_bv=F("left_bv") + _bv(left),
+        right_bv=F("right_bv") + _bv(right),
+        left_leg_bv=F("left_leg_bv") + _leg_case(left_ids, total),
+        right_leg_bv=F("right_leg_bv") + _leg_case(right_ids, total),
+    )
+
+
+def _side_split(side, amount):
+    """(left, right) share of amount for a node placed on side."""
+    if side == "left":
+        return amount, ZERO
+    if side == "right":
+        return ZERO, amount
+    return ZERO, ZERO
+
+
+def _subtree_bv(member):
+    """(self_bv, left_bv, right_bv) of member + its whole downline."""
+    data = get_member_bv(member)
+    return data["self_bv"], data["left_bv"], data["right_bv"]
+
+
+# ----------------------------------------------------------
+# Writers (inside the caller's transaction)
+# ----------------------------------------------------------
+def _shift_month(member_id, month, side, chain, delta):
+    """Monthly row of member (+self_bv) and of every ancestor (own-side BV)."""
+    ancestor_ids = [ancestor_id for ancestor_id, _ in chain]
+    MemberMonthlyBV.objects.bulk_create(
+        [MemberMonthlyBV(member_id=i, month=month) for i in [member_id] + ancestor_ids],
+        ignore_conflicts=True,
+    )
+
+    rows = MemberMonthlyBV.objects.filter(month=month)
+    rows.filter(member_id=member_id).update(self_bv=F("self_bv") + _bv(delta))
+
+    left, right = _side_split(side, delta)
+    if ancestor_ids and (left or right):
+        rows.filter(member_id__in=ancestor_ids).update(
+            left_bv=F("left_bv") + _bv(left),
+            right_bv=F("right_bv") + _bv(right),
+        )
+
+
+def apply_order_bv(member_id, delta, month=None):
+    """
+    Paid-order BV change for member_id (+bv when Paid, -bv when it
+    leaves Paid): own row + every ancestor on the correct side.
+    month (first day) -> MemberMonthlyBV rows of that month as well.
+    """
+    delta = Decimal(delta)
+    if delta == 0:
+        return
+
+    _ensure_rows([member_id])
+    MemberBV.objects.filter(member_id=member_id).update(self_bv=F("self_bv") + _bv(delta))
+
+    side = Member.objects.filter(id=member_id).values_list("side", flat=True).first()
+    chain = get_ancestor_chain(member_id)
+    left, right = _side_split(side, delta)
+    _shift_chain(chain, left, right, delta)
+
+    if month is not None:
+        _shift_month(member_id, month, side, chain, delta)
+
+    # ETags of the member + every upline (tree JSON endpoints)
+    tree_cache.bump_chain(member_id, chain)
+
+
+def apply_move(member, old_chain, old_side):
+    """
+    Member (with its downline) moved to a new parent/side.
+    old_chain / old_side captured BEFORE the move.
+    """
+    self_bv, left_bv, right_bv = _subtree_bv(member)
+    total = self_bv + left_bv + right_bv
+
+    old_left, old_right = _side_split(old_side, self_bv)
+    _shift_chain(old_chain, -(left_bv + old_left), -(right_bv + old_right), -total)
+
+    new_left, new_right = _side_split(member.side, self_bv)
+    _shift_chain(get_ancestor_chain(member.id), left_bv + new_left, right_bv + new_right, total)
+
+
+def apply_remove(member, chain):
+    """Member (with its downline) detached from the tree."""
+    self_bv, left_bv, right_bv = _subtree_bv(member)
+    own_left, own_right = _side_split(member.side, self_bv)
+    _shift_chain(chain, -(left_bv + own_left), -(right_bv + own_right), -(self_bv + left_bv + right_bv))
+
+
+# ----------------------------------------------------------
+# Full rebuild (repair / first deploy)
+# ----------------------------------------------------------
+def rebuild_member_bv(snapshot=None):
+    """Recompute every member's MemberBV row from one GROUP BY + tree pass."""
+    from herbalapp.mlm.tree_snapshot import TreeSnapshot
+
+    snapshot = snapshot or TreeSnapshot.load()
+    own_bv = member_own_bv()
+    rollup = snapshot.bv_rollup(own_bv)
+
+    rows = [
+        MemberBV(
+            member_id=member_id,
+            self_bv=own_bv.get(member_id, ZERO),
+            left_bv=left_bv,
+            right_bv=right_bv,
+            left_leg_bv=left_leg_bv,
+            right_leg_bv=right_leg_bv,
+        )
+        for member_id, (left_bv, right_bv, left_leg_bv, right_leg_bv) in rollup.items()
+    ]
+
+    MemberBV.objects.bulk_create(
+        rows,
+        batch_size=CHUNK_SIZE,
+        update_conflicts=True,
+        unique_fields=["member"],
+        update_fields=["self_bv", "left_bv", "right_bv", "left_leg_bv", "right_leg_bv"],
+    )
+    return len(rows)
+
+
+# ----------------------------------------------------------
+# Monthly compaction
+# ----------------------------------------------------------
+def month_start(value):
+    """First day of the (local) month of a date / datetime."""
+    if hasattr(value, "hour"):
+        value = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value.replace(day=1)
+
+
+def previous_month(today=None):
+    """First day of last calendar month."""
+    first_this_month = month_start(today or timezone.localdate())
+    return month_start(first_this_month - timedelta(days=1))
+
+
+def monthly_own_bv(month=None):
+    """
+    {month: {member_id: own Paid-order BV}} from ONE GROUP BY
+    (all months, or only the given month).
+    """
+    orders = Order.objects.filter(status="Paid")
+    if month is not None:
+        next_month = month_start(month + timedelta(days=31))
+        orders = orders.filter(created_at__date__gte=month, created_at__date__lt=next_month)
+
+    rows = (
+        orders.annotate(month=TruncMonth("created_at", output_field=DateField()))
+        .values("month", "member_id")
+        .annotate(bv=Sum(F("product__bv_value") * F("quantity")))
+        .values_list("month", "member_id", "bv")
+    )
+
+    months = {}
+    for row_month, member_id, bv in rows:
+        if bv:
+            months.setdefault(row_month, {})[member_id] = bv
+    return months
+
+
+def compact_monthly_bv(month=None, snapshot=None):
+    """
+    Rebuild MemberMonthlyBV for one month (or every month) from one
+    GROUP BY + one tree pass per month. Only non-zero rows are stored.
+    Returns rows written.
+    """
+    from herbalapp.mlm.tree_snapshot import TreeSnapshot
+
+    snapshot = snapshot or TreeSnapshot.load()
+    months = monthly_own_bv(month)
+
+    rows = []
+    for row_month, own_bv in months.items():
+        for member_id, (left_bv, right_bv, _, _) in snapshot.bv_rollup(own_bv).items():
+            self_bv = own_bv.get(member_id, ZERO)
+            if self_bv or left_bv or right_bv:
+                rows.append(MemberMonthlyBV(
+                    member_id=member_id,
+                    month=row_month,
+                    self_bv=self_bv,
+                    left_bv=left_bv,
+                    right_bv=right_bv,
+                ))
+
+    with transaction.atomic():
+        stale = MemberMonthlyBV.objects.all()
+        if month is not None:
+            stale = stale.filter(month=month_start(month))
+        stale.delete()
+        MemberMonthlyBV.objects.bulk_create(rows, batch_size=CHUNK_SIZE)
+    return len(rows)
+
+
+# ----------------------------------------------------------
+# Readers
+# ----------------------------------------------------------
+def get_member_bv(member):
+    """
+    Same dict as the Member.calculate_bv walk:
+    self_bv, left_bv, right_bv, total_bv, matched_bv
+    Missing row = no Paid BV in the member's subtree yet (the table is
+    complete: backfilled by migration, rows added on the first BV change).
+    """
+    stats = MemberBV.objects.filter(member_id=member.id).first()
+    if stats is None:
+        return {"self_bv": ZERO, "left_bv": ZERO, "right_bv": ZERO, "total_bv": ZERO, "matched_bv": ZERO}
+
+    return {
+        "self_bv": stats.self_bv,
+        "left_bv": stats.left_bv,
+        "right_bv": stats.right_bv,
+        "total_bv": stats.self_bv + stats.left_bv + stats.right_bv,
+        "matched_bv": stats.matched_bv,
+    }
+
+
+def get_leg_bv(member):
+    """
+    (left_leg_bv, right_leg_bv) -> whole left / right leg subtree BV.
+    Missing row = no BV below the member yet (see get_member_bv).
+    """
+    stats = MemberBV.objects.filter(member_id=member.id).first()
+    if stats is None:
+        return ZERO, ZERO
+    return stats.left_leg_bv, stats.right_leg_bv
+
+
+def get_month_bv(member, month):
+    """
+    {"self_bv", "left_bv", "right_bv", "matched_bv"} of member for month
+    (one indexed row read; missing row = no BV that month).
+    """
+    row = MemberMonthlyBV.objects.filter(
+        member_id=member.id, month=month_start(month)
+    ).values_list("self_bv", "left_bv", "right_bv").first()
+    self_bv, left_bv, right_bv = row or (ZERO, ZERO, ZERO)
+
+    return {
+        "self_bv": self_bv,
+        "left_bv": left_bv,
+        "right_bv": right_bv,
+        "matched_bv": min(left_bv, right_bv),
+    }
@@ -0,0 +1,159 @@
+# herbalapp/mlm/distributed_engine.py
+"""
+Distributed daily engine (Celery chord fan-out)
+
+    coordinator  -> EngineLock lease + reset + leg totals (DailyLegSnapshot)
+                    + member-id shards
+    binary shard -> binary phase for ONE member-id range (mlm_engine queue)
+    callback     -> sponsor + final lock + release EngineLock
+
+✅ Shards only rewrite their own members' binary columns (same inputs ->
+   same values), so a retried shard never double-credits.
+✅ Sponsor credit happens ONCE, in the callback, behind
+   sponsor_today_processed / total_income_locked (already duplicate safe).
+✅ Every step checks the lease token (EngineLock.started_at); a run whose
+   lock was taken over stops with EngineLeaseLost. Shards renew the lease
+   from the engine's own chunk heartbeats (hold_lease).
+✅ progress_done grows once per shard (EngineLock.shards_done), retries
+   are not counted twice.
+✅ ONE EngineRun per run: every step adds its phases / counts to the row
+   of the lease token, the callback marks it finished.
+
+Celery tasks live in herbalapp/tasks.py; this module is plain Django code.
+"""
+
+from datetime import date, datetime, timedelta
+
+from herbalapp.models import DailyIncomeReport, EngineLock, Member
+from herbalapp.mlm.engine_lock import (
+    EngineLease,
+    acquire_engine_lock,
+    hold_lease,
+    release_engine_lock,
+)
+from herbalapp.mlm.engine_metrics import engine_phase, record_members, track_engine_run
+from herbalapp.mlm.final_master_engine import (
+    ENGINE_MEMBER_FIELDS,
+    load_report_cf,
+    reset_day_reports,
+    run_binary_phase,
+    run_sponsor_and_final_lock,
+)
+from herbalapp.mlm.tree_snapshot import engine_leg_totals, load_engine_leg_totals
+
+SHARD_SIZE = 50000
+
+
+def _lease(run_date, token, track_progress=True):
+    return EngineLease(run_date, datetime.fromisoformat(token), track_progress)
+
+
+def _track(lease, finish=False):
+    """EngineRun of this run (shared by coordinator, shards and callback)."""
+    lock = EngineLock.objects.get(run_date=lease.run_date)
+    return track_engine_run(lock, lease.started_at, finish=finish)
+
+
+def plan_shards(member_ids, shard_size=SHARD_SIZE):
+    """Sorted member ids -> [(first_id, last_id), ...] contiguous id ranges."""
+    return [
+        (member_ids[i], member_ids[min(i + shard_size, len(member_ids)) - 1])
+        for i in range(0, len(member_ids), shard_size)
+    ]
+
+
+# ----------------------------------------------------------
+# 1) Coordinator
+# ----------------------------------------------------------
+def prepare_distributed_run(run_date: date, shard_size=SHARD_SIZE):
+    """
+    Take the lease, reset the day, store today's + yesterday's leg totals.
+
+    Returns {"token": ..., "shards": [(first_id, last_id), ...]}
+    or None when EngineLock says skip.
+    """
+    acquired = acquire_engine_lock(run_date, allow_rerun_today=True, cooldown_minutes=5)
+    if acquired is None:
+        return None
+
+    lock, lease = acquired
+
+    try:
+        with hold_lease(lease), track_engine_run(lock, lease.started_at, finish=False):
+            reset_day_reports(run_date)
+
+            # ✅ Shared read-only snapshot for all shards
+            with engine_phase("snapshot"):
+                engine_leg_totals(run_date, store_yesterday=True)
+
+            member_ids = list(
+                Member.objects.filter(
+                    is_active=True,
+                    joined_date__lte=run_date
+                ).order_by("id").values_list("id", flat=True)
+            )
+            lease.beat(done=0, total=len(member_ids), force=True)
+    except Exception:
+        release_engine_lock(lease, finished=False)
+        raise
+
+    return {
+        "token": lease.started_at.isoformat(),
+        "shards": plan_shards(member_ids, shard_size),
+    }
+
+
+# ----------------------------------------------------------
+# 2) Binary shard
+# ----------------------------------------------------------
+def run_binary_shard(run_date: date, token, first_id, last_id):
+    """Binary phase (+ rank) for members first_id..last_id. Returns member count."""
+    lease = _lease(run_date, token, track_progress=False)
+    lease.beat(force=True)
+
+    with hold_lease(lease), _track(lease):
+        members = list(
+            Member.objects.filter(
+                id__range=(first_id, last_id),
+                is_active=True,
+                joined_date__lte=run_date
+            ).only(*ENGINE_MEMBER_FIELDS).order_by("auto_id")
+        )
+        record_members(len(members))
+
+        reports = {
+            r.member_id: r
+            for r in DailyIncomeReport.objects.filter(
+                date=run_date,
+                member_id__gte=first_id,
+                member_id__lte=last_id,
+            )
+        }
+
+        run_binary_phase(
+            run_date,
+            members,
+            load_engine_leg_totals(run_date, first_id, last_id),
+            load_report_cf(run_date - timedelta(days=1), first_id, last_id),
+            reports=reports,
+        )
+
+    lease.complete_shard(first_id, last_id, len(members))
+    return len(members)
+
+
+# ----------------------------------------------------------
+# 3) Chord callback
+# ----------------------------------------------------------
+def finish_distributed_run(run_date: date, token):
+    """Sponsor + final lock after ALL shards, then mark the lock finished."""
+    lease = _lease(run_date, token)
+    finished = False
+
+    try:
+        lease.beat(force=True)
+        with hold_lease(lease), _track(lease, finish=True):
+            run_sponsor_and_final_lock(run_date)
+        finished = True
+    finally:
+        release_engine_lock(lease, finished)
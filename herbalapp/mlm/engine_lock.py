@@ -1,18 +1,147 @@
 # herbalapp/mlm/engine_lock.py
 
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 from herbalapp.models import EngineLock
+from herbalapp.mlm.engine_metrics import track_engine_run
 
+# ✅ Lease: a running lock is stale only after this long WITHOUT a heartbeat
+LEASE_TIMEOUT = timedelta(minutes=10)
 
-def run_with_lock(run_date, engine_func, allow_rerun_today=True, cooldown_minutes=5):
+# ✅ Heartbeats closer than this are skipped (progress still kept in memory)
+HEARTBEAT_MIN_INTERVAL = timedelta(seconds=5)
+
+_current_lease = ContextVar("engine_lease", default=None)
+
+
+class EngineLeaseLost(RuntimeError):
+    """Our lock was released/taken over while the engine was still running."""
+
+
+class EngineLease:
     """
-    ✅ Global MLM Engine Lock (MODEL-MATCHED)
+    Renewable lease on EngineLock for ONE run.
 
-    - Prevents parallel execution using is_running
-    - Uses finished_at for completion
-    - Allows rerun ONLY for TODAY with cooldown (late joins fix)
+    started_at is the owner token: every heartbeat / release only touches
+    the lock row if it still carries OUR started_at.
+
+    track_progress=False -> heartbeats only renew the lease (shards of a
+    distributed run: their chunk progress is local to the shard, the run's
+    progress is added once per shard by complete_shard()).
+    """
+
+    def __init__(self, run_date, started_at, track_progress=True):
+        self.run_date = run_date
+        self.started_at = started_at
+        self.last_beat = started_at
+        self.track_progress = track_progress
+
+    def _owned(self):
+        return EngineLock.objects.filter(
+            run_date=self.run_date,
+            is_running=True,
+            started_at=self.started_at,
+        )
+
+    def beat(self, done=None, total=None, force=False):
+        now = timezone.now()
+        if not force and now - self.last_beat < HEARTBEAT_MIN_INTERVAL:
+            return
+
+        fields = {"heartbeat_at": now}
+        if self.track_progress:
+            if done is not None:
+                fields["progress_done"] = done
+            if total is not None:
+                fields["progress_total"] = total
+
+        if self._owned().update(**fields) == 0:
+            raise EngineLeaseLost(f"EngineLock lease lost for {self.run_date}")
+        self.last_beat = now
+
+    def complete_shard(self, first_id, last_id, count):
+        """
+        Distributed run: shard first_id..last_id is done -> progress_done += count,
+        ONCE per shard (a retried / replayed shard is not counted again).
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            lock = self._owned().select_for_update().first()
+            if lock is None:
+                raise EngineLeaseLost(f"EngineLock lease lost for {self.run_date}")
+
+            shard = [first_id, last_id]
+            if shard not in lock.shards_done:
+                lock.shards_done.append(shard)
+                lock.progress_done += count
+            lock.heartbeat_at = now
+            lock.save(update_fields=["shards_done", "progress_done", "heartbeat_at"])
+        self.last_beat = now
+
+
+def engine_heartbeat(done=None, total=None, force=False):
+    """
+    ✅ Called by the engine as it goes through chunks.
+    Renews the lease + stores progress. No-op outside run_with_lock().
+    Must be called OUTSIDE long transaction.atomic() blocks, otherwise
+    other workers cannot see the renewed heartbeat.
+    """
+    lease = _current_lease.get()
+    if lease is not None:
+        lease.beat(done=done, total=total, force=force)
+
+
+class EngineCheckpoint:
+    """
+    Last committed step of the engine run for run_date (stored on EngineLock).
+
+        phase ""         -> nothing committed yet
+        phase "binary"   -> binary chunks committed up to member_id (id order)
+        phase "sponsor"  -> binary done, sponsor next
+        phase "final_lock" / "done"
+
+    mark() runs right AFTER the step's own transaction commits, so a crash
+    in between only means that step is redone (all steps are re-run safe).
+    """
+
+    PHASES = ("", "binary", "sponsor", "final_lock", "done")
+
+    def __init__(self, run_date):
+        self.run_date = run_date
+
+    def load(self):
+        """(phase, member_id) stored for run_date."""
+        row = EngineLock.objects.filter(run_date=self.run_date).values_list(
+            "checkpoint_phase", "checkpoint_member_id"
+        ).first()
+        return row or ("", None)
+
+    def mark(self, phase, member_id=None):
+        EngineLock.objects.filter(run_date=self.run_date).update(
+            checkpoint_phase=phase,
+            checkpoint_member_id=member_id,
+        )
+
+    def clear(self):
+        self.mark("")
+
+
+def lock_is_stale(lock, now=None):
+    """Running lock with no heartbeat (or start) for LEASE_TIMEOUT."""
+    now = now or timezone.now()
+    last_seen = lock.heartbeat_at or lock.started_at
+    return last_seen is None or now - last_seen > LEASE_TIMEOUT
+
+
+def acquire_engine_lock(run_date, allow_rerun_today=True, cooldown_minutes=5):
+    """
+    ✅ Take the EngineLock lease for run_date (same rules as run_with_lock)
+
+    Returns (lock, EngineLease), or None when the run must be skipped.
     """
 
     now = timezone.now()
@@ -25,14 +154,14 @@ def run_with_lock(run_date, engine_func, allow_rerun_today=True, cooldown_minute
         # 🛑 Already running check
         # -----------------------------
         if lock.is_running:
-            # auto-release stale lock (10 mins)
-            if lock.started_at and now - lock.started_at > timedelta(minutes=10):
+            # auto-release stale lease (no heartbeat for LEASE_TIMEOUT)
+            if lock_is_stale(lock, now):
                 lock.is_running = False
                 lock.started_at = None
                 lock.save(update_fields=["is_running", "started_at"])
             else:
                 print("⛔ Engine already running — skipped")
-                return
+                return None
 
         # -----------------------------
         # ✅ Finished check (rerun policy)
@@ -41,45 +170,90 @@ def run_with_lock(run_date, engine_func, allow_rerun_today=True, cooldown_minute
             # Past dates -> never auto rerun
             if run_date != today:
                 print(f"⛔ Engine already finished for {run_date} — skipped")
-                return
+                return None
 
             # Today -> allow rerun only if enabled
             if not allow_rerun_today:
                 print(f"⛔ Today rerun disabled for {run_date} — skipped")
-                return
+                return None
 
             # Cooldown based on last finished time
             if now - lock.finished_at < timedelta(minutes=cooldown_minutes):
                 print(f"⏳ Cooldown active ({cooldown_minutes}m) — skipped")
-                return
+                return None
 
         # -----------------------------
-        # ✅ Acquire lock
+        # ✅ Acquire lock (lease)
         # -----------------------------
         lock.is_running = True
         lock.started_at = now
-        lock.save(update_fields=["is_running", "started_at"])
+        lock.heartbeat_at = now
+        lock.progress_done = 0
+        lock.progress_total = 0
+        lock.shards_done = []
+        lock.save(update_fields=[
+            "is_running", "started_at", "heartbeat_at", "progress_done", "progress_total",
+            "shards_done",
+        ])
+
+    return lock, EngineLease(run_date, now)
 
-    try:
-        engine_func(run_date)
 
-        # ✅ Mark finished on success
+def release_engine_lock(lease, finished):
+    """
+    🔓 Release OUR lease (never touches a lock taken over by another run)
+    finished=True -> also set finished_at (successful run)
+    """
+    try:
         with transaction.atomic():
-            fresh_lock = EngineLock.objects.select_for_update().get(run_date=run_date)
+            fresh_lock = EngineLock.objects.select_for_update().get(run_date=lease.run_date)
+            if not (fresh_lock.is_running and fresh_lock.started_at == lease.started_at):
+                return
+
             fresh_lock.is_running = False
             fresh_lock.started_at = None
-            fresh_lock.finished_at = timezone.now()
-            fresh_lock.save(update_fields=["is_running", "started_at", "finished_at"])
+            update_fields = ["is_running", "started_at"]
+            if finished:
+                fresh_lock.finished_at = timezone.now()
+                update_fields.append("finished_at")
+            fresh_lock.save(update_fields=update_fields)
+    except EngineLock.DoesNotExist:
+        pass
+
 
+@contextmanager
+def hold_lease(lease):
+    """Make engine_heartbeat() renew this lease inside the block."""
+    token = _current_lease.set(lease)
+    try:
+        yield lease
     finally:
-        # 🔓 Always release lock even if crash (do not touch finished_at)
-        try:
-            with transaction.atomic():
-                fresh_lock = EngineLock.objects.select_for_update().get(run_date=run_date)
-                if fresh_lock.is_running:
-                    fresh_lock.is_running = False
-                    fresh_lock.started_at = None
-                    fresh_lock.save(update_fields=["is_running", "started_at"])
-        except EngineLock.DoesNotExist:
-            pass
+        _current_lease.reset(token)
 
+
+def run_with_lock(run_date, engine_func, allow_rerun_today=True, cooldown_minutes=5):
+    """
+    ✅ Global MLM Engine Lock (MODEL-MATCHED)
+
+    - Prevents parallel execution using is_running
+    - Running lock is a renewable lease (heartbeat_at), stale only after
+      LEASE_TIMEOUT without a heartbeat
+    - Uses finished_at for completion
+    - Allows rerun ONLY for TODAY with cooldown (late joins fix)
+    - Records one EngineRun (phase timings / queries / RSS) per execution
+    """
+    acquired = acquire_engine_lock(run_date, allow_rerun_today, cooldown_minutes)
+    if acquired is None:
+        return
+
+    lock, lease = acquired
+    finished = False
+
+    try:
+        with hold_lease(lease), track_engine_run(lock, lease.started_at):
+            engine_func(run_date)
+        finished = True
+
+    finally:
+        # ✅ Mark finished on success / 🔓 always release even if crash
+        release_engine_lock(lease, finished)
@@ -0,0 +1,176 @@
+# herbalapp/mlm/engine_metrics.py
+"""
+Engine run metrics (EngineRun)
+
+run_with_lock() opens ONE EngineRun per execution:
+
+    with track_engine_run(lock):
+        engine_func(run_date)
+
+Engine code marks its phases without knowing about the run:
+
+    with engine_phase("binary"):
+        ...
+    record_members(len(members))
+    record_rows(written)
+
+✅ Wall time, DB query count, DB time per phase
+✅ Members processed, rows written, peak RSS
+✅ No-op when called outside a tracked run (tests, shell, debug scripts)
+✅ Distributed runs: coordinator, every shard and the chord callback add
+   their part to ONE EngineRun (keyed by the lease token), see
+   distributed_engine.py
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_current = ContextVar("engine_metrics", default=None)
+
+
+def peak_rss_kb():
+    """Peak RSS of this process (and finished worker processes) in KB."""
+    if resource is None:
+        return None
+
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # macOS reports bytes, Linux reports KB
+    if sys.platform == "darwin":
+        peak //= 1024
+    return peak
+
+
+class EngineMetrics:
+    def __init__(self):
+        self.phases = {}
+        self.members_processed = 0
+        self.rows_written = 0
+
+    @contextmanager
+    def phase(self, name):
+        stats = self.phases.setdefault(name, {"seconds": 0.0, "queries": 0, "db_ms": 0.0})
+
+        def _wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                stats["queries"] += 1
+                stats["db_ms"] += (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(_wrapper):
+                yield
+        finally:
+            stats["seconds"] += time.perf_counter() - start
+
+    def totals(self):
+        return {
+            "query_count": sum(p["queries"] for p in self.phases.values()),
+            "db_time_ms": round(sum(p["db_ms"] for p in self.phases.values()), 3),
+        }
+
+
+# ----------------------------------------------------------
+# Engine-side helpers (no-op outside a tracked run)
+# ----------------------------------------------------------
+@contextmanager
+def engine_phase(name):
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.phase(name):
+        yield
+
+
+def record_members(count):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.members_processed += count
+
+
+def record_rows(count):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.rows_written += count
+
+
+# ----------------------------------------------------------
+# run_with_lock side
+# ----------------------------------------------------------
+@contextmanager
+def track_engine_run(lock, started_at=None, finish=True):
+    """
+    Create the EngineRun row, collect metrics, store them on exit.
+
+    started_at : lease token -> every step of the same run (other workers
+                 too) adds its phases / counts to the same row
+    finish     : False for coordinator / shard steps -> the row stays
+                 "running" until the step with finish=True
+    """
+    from herbalapp.models import EngineRun
+
+    run, _ = EngineRun.objects.get_or_create(
+        lock=lock,
+        started_at=started_at or timezone.now(),
+        defaults={"run_date": lock.run_date},
+    )
+    metrics = EngineMetrics()
+    token = _current.set(metrics)
+    error = None
+
+    try:
+        yield run
+    except Exception as e:
+        error = str(e)[:2000]
+        raise
+    finally:
+        _current.reset(token)
+        _store_metrics(run.pk, metrics, error, finish)
+
+
+def _store_metrics(run_id, metrics, error, finish):
+    """Add one step's metrics to the EngineRun row (row-locked: shards run in parallel)."""
+    from herbalapp.models import EngineRun
+
+    with transaction.atomic():
+        run = EngineRun.objects.select_for_update().get(pk=run_id)
+
+        for name, p in metrics.phases.items():
+            stored = run.phases.setdefault(name, {"seconds": 0, "queries": 0, "db_ms": 0})
+            stored["seconds"] = round(stored["seconds"] + p["seconds"], 3)
+            stored["queries"] += p["queries"]
+            stored["db_ms"] = round(stored["db_ms"] + p["db_ms"], 3)
+
+        totals = metrics.totals()
+        run.query_count += totals["query_count"]
+        run.db_time_ms = round(run.db_time_ms + totals["db_time_ms"], 3)
+        run.members_processed += metrics.members_processed
+        run.rows_written += metrics.rows_written
+        run.peak_rss_kb = max(filter(None, (run.peak_rss_kb, peak_rss_kb())), default=None)
+
+        if error is not None:
+            run.status = "failed"
+            run.error = error
+        elif finish:
+            run.status = "success"
+
+        if error is not None or finish:
+            run.finished_at = timezone.now()
+            run.total_seconds = round((run.finished_at - run.started_at).total_seconds(), 3)
+        run.save()
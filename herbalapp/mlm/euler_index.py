@@ -0,0 +1,324 @@
+# herbalapp/mlm/euler_index.py
+"""
+Euler-tour interval index on the placement tree (Member.tin / tout / depth)
+
+    descendants of X      -> tin BETWEEN X.tin AND X.tout
+    X's left leg          -> tin BETWEEN L.tin AND L.tout (L = left child)
+
+✅ Full rebuild from one TreeSnapshot pass (rebuild_euler_index)
+✅ Join  -> new leaf takes half of the free slots left in its parent's
+            interval (no other row touched); only when a parent runs out of
+            slots is room opened with 2 set-based UPDATEs
+✅ Move  -> subtree interval shifted into its new parent (1 UPDATE)
+✅ Delete -> orphaned children re-placed as roots (parent is SET_NULL)
+✅ As-of-date legs -> Member.path_joined (latest joined_date on the path
+            from the interval root): visible on D <=> path_joined <= D,
+            one range scan, no per-row subquery
+✅ Joins / moves lock the parent row first, so two joins under the same
+   parent never get the same slot
+
+Only edges with side "left"/"right" are followed, same as the recursive
+count_all_descendants walk: a node without a valid side starts its own
+interval and is never inside its parent's.
+
+All writers must run inside the caller's transaction.atomic().
+"""
+
+from django.db.models import F, Max, Q
+
+from herbalapp.models import Member
+
+SIDES = ("left", "right")
+
+# Free slots reserved at the end of every interval on rebuild.
+# A new leaf takes half of its parent's free slots, so ~32 appended
+# levels fit below any node before room has to be opened.
+EULER_GAP = 2 ** 32
+
+CHUNK_SIZE = 5000
+
+
+# ----------------------------------------------------------
+# Full rebuild
+# ----------------------------------------------------------
+def _later(path_joined, joined_date):
+    """Path key of a child (None = someone on the path never joined)."""
+    if path_joined is None or joined_date is None:
+        return None
+    return max(path_joined, joined_date)
+
+
+def rebuild_euler_index(snapshot=None):
+    """Recompute tin / tout / depth / path_joined for every member (iterative DFS)."""
+    from herbalapp.mlm.tree_snapshot import TreeSnapshot
+
+    snapshot = snapshot or TreeSnapshot.load()
+    n = len(snapshot)
+
+    children = [[] for _ in range(n)]
+    roots = []
+    for pos, parent_pos in enumerate(snapshot.parent_pos):
+        if parent_pos < 0 or snapshot.sides[pos] not in SIDES:
+            roots.append(pos)
+        else:
+            children[parent_pos].append(pos)
+
+    joined = snapshot.joined_dates
+    tin = [None] * n
+    tout = [None] * n
+    depth = [None] * n
+    path = [None] * n
+    counter = 0
+
+    for root in roots:
+        depth[root] = 0
+        path[root] = joined[root]
+        stack = [(root, False)]
+        while stack:
+            pos, closing = stack.pop()
+            if closing:
+                counter += EULER_GAP
+                tout[pos] = counter
+                counter += 1
+                continue
+
+            tin[pos] = counter
+            counter += 1
+            stack.append((pos, True))
+            for child in reversed(children[pos]):
+                depth[child] = depth[pos] + 1
+                path[child] = _later(path[pos], joined[child])
+                stack.append((child, False))
+
+    rows = [
+        Member(id=member_id, tin=tin[pos], tout=tout[pos], depth=depth[pos], path_joined=path[pos])
+        for pos, member_id in enumerate(snapshot.ids)
+    ]
+    Member.objects.bulk_update(rows, ["tin", "tout", "depth", "path_joined"], batch_size=CHUNK_SIZE)
+    return len(rows)
+
+
+# ----------------------------------------------------------
+# Incremental helpers
+# ----------------------------------------------------------
+def _attached_parent(member_id):
+    """
+    (id, tin, tout, depth, path_joined) of the indexed parent, or None ->
+    member is a root. The parent row is locked (select_for_update) until
+    the caller's transaction ends, so slots inside it are handed out one
+    join at a time.
+    """
+    row = Member.objects.filter(id=member_id).values_list("parent_id", "side").first()
+    if not row or row[0] is None or row[1] not in SIDES:
+        return None
+
+    parent = (
+        Member.objects.select_for_update()
+        .filter(id=row[0])
+        .values_list("id", "tin", "tout", "depth", "path_joined")
+        .first()
+    )
+    if parent is None or parent[1] is None:
+        return None
+    return parent
+
+
+def _root_slot():
+    """First free value after every indexed interval."""
+    last = Member.objects.aggregate(last=Max("tout"))["last"]
+    return 0 if last is None else last + 1
+
+
+def _parent_slot(member_id, parent_id, parent_tin, parent_tout):
+    """(start, free) -> first unused value inside the parent + slots left."""
+    last = (
+        Member.objects.filter(
+            parent_id=parent_id,
+            side__in=SIDES,
+            tin__isnull=False,
+        )
+        .exclude(id=member_id)
+        .aggregate(last=Max("tout"))["last"]
+    )
+    start = (parent_tin if last is None else last) + 1
+    return start, parent_tout - start
+
+
+def _open_room(at, amount):
+    """Shift every value >= at by amount (enclosing intervals grow)."""
+    Member.objects.filter(tin__gte=at).update(tin=F("tin") + amount)
+    Member.objects.filter(tout__gte=at).update(tout=F("tout") + amount)
+
+
+# ----------------------------------------------------------
+# Writers
+# ----------------------------------------------------------
+def apply_join(member):
+    """New member placed in the tree (leaf)."""
+    parent = _attached_parent(member.id)
+
+    if parent is None:
+        tin = _root_slot()
+        tout = tin + EULER_GAP
+        depth = 0
+        path_joined = member.joined_date
+    else:
+        parent_id, parent_tin, parent_tout, parent_depth, parent_path = parent
+        tin, free = _parent_slot(member.id, parent_id, parent_tin, parent_tout)
+        if free < 2:
+            _open_room(parent_tout, EULER_GAP)
+            free += EULER_GAP
+        # keep tin < tout so the new leaf can get children of its own
+        tout = tin + free // 2
+        depth = parent_depth + 1
+        path_joined = _later(parent_path, member.joined_date)
+
+    Member.objects.filter(id=member.id).update(tin=tin, tout=tout, depth=depth, path_joined=path_joined)
+    member.tin, member.tout, member.depth, member.path_joined = tin, tout, depth, path_joined
+
+
+def apply_move(member):
+    """Member (with its downline) now has a new parent/side: shift its interval."""
+    row = Member.objects.filter(id=member.id).values_list("tin", "tout", "depth").first()
+    if not row or row[0] is None:
+        return
+    width = row[1] - row[0] + 1
+
+    parent = _attached_parent(member.id)
+    if parent is None:
+        start = _root_slot()
+        new_depth = 0
+    else:
+        parent_id, parent_tin, parent_tout, parent_depth, _ = parent
+        start, free = _parent_slot(member.id, parent_id, parent_tin, parent_tout)
+        if free < width + 1:
+            _open_room(parent_tout, max(EULER_GAP, width + 1))
+            row = Member.objects.filter(id=member.id).values_list("tin", "tout", "depth").first()
+        new_depth = parent_depth + 1
+
+    tin, tout, depth = row
+    Member.objects.filter(tin__gte=tin, tin__lte=tout).update(
+        tin=F("tin") + (start - tin),
+        tout=F("tout") + (start - tin),
+        depth=F("depth") + (new_depth - depth),
+    )
+    refresh_path_joined(member.id)
+
+
+def refresh_path_joined(member_id):
+    """
+    Recompute path_joined inside member's interval (after a move or a
+    joined_date edit): ONE tin-ordered read + bulk_update of changed rows.
+    """
+    row = Member.objects.filter(id=member_id).values_list(
+        "tin", "tout", "joined_date", "parent__path_joined", "parent__tin", "side"
+    ).first()
+    if not row or row[0] is None:
+        return
+    tin, tout, joined_date, parent_path, parent_tin, side = row
+
+    attached = parent_tin is not None and side in SIDES
+    path = {member_id: _later(parent_path, joined_date) if attached else joined_date}
+
+    changed = []
+    rows = (
+        Member.objects.filter(tin__gte=tin, tin__lte=tout)
+        .order_by("tin")
+        .values_list("id", "parent_id", "joined_date", "path_joined")
+    )
+    for node_id, parent_id, node_joined, stored in rows.iterator(chunk_size=CHUNK_SIZE):
+        if node_id != member_id:
+            path[node_id] = _later(path.get(parent_id), node_joined)
+        if path[node_id] != stored:
+            changed.append(Member(id=node_id, path_joined=path[node_id]))
+
+    Member.objects.bulk_update(changed, ["path_joined"], batch_size=CHUNK_SIZE)
+
+
+def apply_detach(child_ids):
+    """Children left without a parent (parent deleted) -> own root intervals."""
+    for child in Member.objects.filter(id__in=list(child_ids)).only("id"):
+        apply_move(child)
+
+
+# ----------------------------------------------------------
+# Readers
+# ----------------------------------------------------------
+def leg_ranges(member, side):
+    """
+    [(tin, tout, joined_date, path_joined), ...] of member's children on side
+    (None when any of them is not indexed yet).
+    """
+    ranges = list(
+        Member.objects.filter(parent_id=member.id, side=side).values_list(
+            "tin", "tout", "joined_date", "path_joined"
+        )
+    )
+    if any(row[0] is None for row in ranges):
+        return None
+    return ranges
+
+
+def _in_ranges(ranges):
+    q = Q()
+    for tin, tout, *_ in ranges:
+        q |= Q(tin__gte=tin, tin__lte=tout)
+    return q
+
+
+def _visible_ids(tin, tout, as_of_date):
+    """
+    Ids visible on as_of_date inside ONE child interval, one tin-ordered
+    pass (parents come before children): joined by then and every node
+    between it and the interval root too.
+    """
+    rows = (
+        Member.objects.filter(tin__gte=tin, tin__lte=tout, joined_date__lte=as_of_date)
+        .order_by("tin")
+        .values_list("id", "tin", "parent_id")
+    )
+    visible = set()
+    for member_id, node_tin, parent_id in rows.iterator(chunk_size=CHUNK_SIZE):
+        if node_tin == tin or parent_id in visible:
+            visible.add(member_id)
+    return visible
+
+
+def leg_members(member, side, as_of_date=None):
+    """
+    Queryset of every member in member's side leg (None when not indexed).
+    as_of_date -> only joined on/before it; a node not yet joined hides
+    its whole subtree (same rule as count_all_descendants).
+
+    path_joined is measured from the interval root, so it answers the
+    leg exactly when the child's own path key is <= as_of_date. Otherwise
+    the member or an upline joined later than someone below it
+    (back-dated rows) and that leg is walked once in tin order.
+    """
+    ranges = leg_ranges(member, side)
+    if ranges is None:
+        return None
+    if as_of_date is None:
+        return Member.objects.filter(_in_ranges(ranges)) if ranges else Member.objects.none()
+
+    q = None
+    for tin, tout, joined_date, path_joined in ranges:
+        if joined_date is None or joined_date > as_of_date:
+            continue  # child not joined yet -> whole leg hidden
+        if path_joined is not None and path_joined <= as_of_date:
+            part = Q(tin__gte=tin, tin__lte=tout, path_joined__lte=as_of_date)
+        else:
+            part = Q(id__in=_visible_ids(tin, tout, as_of_date))
+        q = part if q is None else q | part
+
+    if q is None:
+        return Member.objects.none()
+    return Member.objects.filter(q)
+
+
+def count_leg_members(member, side, as_of_date=None):
+    """Leg size from one range scan (None when not indexed)."""
+    members = leg_members(member, side, as_of_date)
+    if members is None:
+        return None
+    return members.order_by().count()
@@ -5,6 +5,20 @@ from django.db.models import Q
 from herbalapp.models import DailyIncomeReport
 
 
+def valid_sponsor_child_reports(run_date):
+    """
+    Today's DailyIncomeReport rows whose member is a valid sponsor child
+    (same rules as get_valid_sponsor_children, as a queryset)
+    """
+    return DailyIncomeReport.objects.filter(
+        date=run_date,
+        sponsor_today_processed=False
+    ).filter(
+        Q(binary_income__gt=Decimal("0.00")) |
+        Q(binary_eligibility_income__gt=Decimal("0.00"))
+    )
+
+
 def get_valid_sponsor_children(run_date):
     """
     Returns list of members eligible for sponsor income today
@@ -14,13 +28,6 @@ def get_valid_sponsor_children(run_date):
     2️⃣ sponsor_today_processed=False (daily lock)
     """
 
-    reports = DailyIncomeReport.objects.filter(
-        date=run_date,
-        sponsor_today_processed=False
-    ).filter(
-        Q(binary_income__gt=Decimal("0.00")) |
-        Q(binary_eligibility_income__gt=Decimal("0.00"))
-    )
+    reports = valid_sponsor_child_reports(run_date)
 
     return [r.member for r in reports]
-
@@ -1,15 +1,18 @@
 # ==========================================================
 # herbalapp/management/commands/mlm_run_full_daily.py
 # ==========================================================
+from bisect import bisect_right
 from datetime import date
 from decimal import Decimal
 from django.core.management.base import BaseCommand
 from django.utils.dateparse import parse_date
 from django.db import transaction, IntegrityError
+from django.db.models import F
 from django.utils import timezone
-from herbalapp.mlm.engine_lock import run_with_lock
+from herbalapp.mlm.engine_lock import EngineCheckpoint, engine_heartbeat, run_with_lock
+from herbalapp.mlm.engine_metrics import engine_phase, record_members, record_rows
 from datetime import date, timedelta
-from herbalapp.mlm_rank_engine import process_rank_upgrade
+from herbalapp.mlm_rank_engine import load_side_bv_totals, process_rank_upgrades
 
 # --------------------------
 # Models
@@ -17,7 +20,14 @@ from herbalapp.mlm_rank_engine import process_rank_upgrade
 from herbalapp.models import Member, DailyIncomeReport
 
 # ✅ Filter engine / helper functions
-from herbalapp.mlm.filters import get_valid_sponsor_children
+from herbalapp.mlm.sponsor_engine import run_sponsor_income_batch
+from herbalapp.mlm.tree_snapshot import (
+    TreeSnapshot,
+    engine_leg_totals,
+    load_daily_leg_totals,
+    save_daily_leg_totals,
+)
+from herbalapp.mlm.binary_vector import calculate_binary_income_vector
 
 #from herbalapp.tasks import run_engine_task
 
@@ -44,10 +54,23 @@ def count_all_descendants(member, side, as_of_date=None):
     side: 'left' or 'right'
     as_of_date: date or None
     Returns total descendants count including direct children (as of date)
+
+    ✅ Euler-tour index (Member.tin / tout) -> one range scan
+    ✅ Falls back to the recursive walk while the leg is not indexed
     """
     if not member:
         return 0
 
+    from herbalapp.mlm.euler_index import count_leg_members
+    count = count_leg_members(member, side, as_of_date)
+    if count is not None:
+        return count
+
+    return _walk_descendants(member, side, as_of_date)
+
+
+def _walk_descendants(member, side, as_of_date=None):
+    """Recursive count_all_descendants (no index needed)."""
     qs = Member.objects.filter(parent=member, side=side)
     if as_of_date is not None:
         qs = qs.filter(joined_date__lte=as_of_date)
@@ -55,8 +78,8 @@ def count_all_descendants(member, side, as_of_date=None):
     total = 0
     for child in qs:
         total += 1
-        total += count_all_descendants(child, "left", as_of_date=as_of_date)
-        total += count_all_descendants(child, "right", as_of_date=as_of_date)
+        total += _walk_descendants(child, "left", as_of_date=as_of_date)
+        total += _walk_descendants(child, "right", as_of_date=as_of_date)
 
     return total
 
@@ -104,15 +127,15 @@ def run_mlm_engine(run_date):
         joined_date__lte=run_date
     ).order_by("auto_id")
 
-    for m in members:
+    # ✅ One query + one post-order pass for every member (both dates)
+    leg_totals = TreeSnapshot.load().leg_totals(run_date, yesterday)
 
-        # Totals as of today
-        left_today_total = count_all_descendants(m, "left", as_of_date=run_date)
-        right_today_total = count_all_descendants(m, "right", as_of_date=run_date)
+    for m in members:
 
-        # Totals as of yesterday
-        left_yday_total = count_all_descendants(m, "left", as_of_date=yesterday)
-        right_yday_total = count_all_descendants(m, "right", as_of_date=yesterday)
+        (
+            (left_today_total, right_today_total),
+            (left_yday_total, right_yday_total),
+        ) = leg_totals.get(m.id, ((0, 0), (0, 0)))
 
         # TODAY joins (delta)
         left_joins_today = max(left_today_total - left_yday_total, 0)
@@ -396,26 +419,373 @@ def get_sponsor_receiver(child: Member, run_date):
 
 
 # ==========================================================
-# FULL DAILY ENGINE (RE-RUN SAFE)
+# BINARY PHASE – IN-MEMORY BUILD + BULK WRITE
 # ==========================================================
-def run_full_daily_engine(run_date: date):
+BULK_BATCH_SIZE = 1000
+# rows per transaction / heartbeat in the binary phase
+PERSIST_CHUNK = 20000
+
+# Every DailyIncomeReport column the binary phase assigns
+BINARY_REPORT_FIELDS = [
+    "left_cf",
+    "right_cf",
+    "left_cf_before",
+    "right_cf_before",
+    "left_cf_after",
+    "right_cf_after",
+    "left_joins",
+    "right_joins",
+    "binary_eligible",
+    "eligibility_income",
+    "binary_eligibility_income",
+    "binary_income",
+    "binary_pairs_paid",
+    "flashout_wallet_income",
+    "flashout_units",
+    "washed_pairs",
+    "earned_fresh_binary_today",
+    "total_income",
+    "binary_income_processed",
+    "sponsor_today_processed",
+    "total_income_locked",
+]
+
+# Member fields the engine needs (rank upgrade reads the rank fields)
+ENGINE_MEMBER_FIELDS = [
+    "id",
+    "auto_id",
+    "side",
+    "joined_date",
+    "binary_eligible",
+    "binary_eligible_date",
+    "current_rank",
+    "rank_level",
+    "rank_checkpoint_bv",
+    "rank_assigned_at",
+]
+
+
+def _rupees(paise):
+    """int paise (from the vector calculator) -> Decimal rupees"""
+    return Decimal(int(paise)).scaleb(-2)
+
+
+def binary_input_rows(members, leg_totals, yesterday_cf):
     """
-    ✅ FULL DAILY ENGINE (LOCKED)
+    Plain (picklable) input rows for compute_binary_rows():
+    (member_id, auto_id, binary_eligible, binary_eligible_date,
+     left_total_today, right_total_today, left_total_yday, right_total_yday,
+     left_cf_before, right_cf_before)
+    """
+    rows = []
+    for member in members:
+        (
+            (left_total_today, right_total_today),
+            (left_total_yday, right_total_yday),
+        ) = leg_totals.get(member.id, ((0, 0), (0, 0)))
+        left_cf_before, right_cf_before = yesterday_cf.get(member.id, (0, 0))
+
+        rows.append((
+            member.id, member.auto_id,
+            member.binary_eligible, getattr(member, "binary_eligible_date", None),
+            left_total_today, right_total_today,
+            left_total_yday, right_total_yday,
+            int(left_cf_before), int(right_cf_before),
+        ))
+    return rows
+
+
+def compute_binary_rows(run_date, rows):
+    """
+    ✅ PURE binary phase (no DB access) – safe to run in worker processes
 
-    - Uses EngineLock (is_running + finished_at)
-    - Allows rerun only for TODAY with cooldown (late join fix)
-    - Sets EngineLock.finished_at after successful run
+    rows: output of binary_input_rows()
+    Returns one (kind, binary_eligible, binary_eligible_date, fields) per row:
+        kind   -> "root" | "flashout" | "hold" | "paid"
+        fields -> DailyIncomeReport attributes to set
     """
+    results = []
+    # (position, eligible_row, left_today, right_today, left_cf, right_cf, eligible, became)
+    pending = []
 
-    def _engine(run_date: date):
-        # ✅ YOUR EXISTING ENGINE CODE STARTS HERE (UNCHANGED)
-        print(f"🚀 Running MLM Master Engine for {run_date}")
+    for (member_id, auto_id, binary_eligible, existing_date,
+         left_total_today, right_total_today, left_total_yday, right_total_yday,
+         left_cf_before, right_cf_before) in rows:
 
-        yesterday_date = run_date - timedelta(days=1)
+        # ROOT: never gets any income; still keep report row
+        if auto_id == ROOT_ID:
+            results.append(("root", binary_eligible, existing_date, {}))
+            continue
+
+        # Today joins (pure delta)
+        left_today = max(left_total_today - left_total_yday, 0)
+        right_today = max(right_total_today - right_total_yday, 0)
 
         # --------------------------------------------------
-        # ✅ RE-RUN SAFE: reset ONLY that day's reports
+        # ✅ NEWLY REACHED ELIGIBILITY TODAY ONLY
+        # (supports rerun: if eligible_date == run_date -> treat as became today)
         # --------------------------------------------------
+        eligible_today = (
+            (left_total_today >= 2 and right_total_today >= 1) or
+            (left_total_today >= 1 and right_total_today >= 2)
+        )
+        eligible_yday = (
+            (left_total_yday >= 2 and right_total_yday >= 1) or
+            (left_total_yday >= 1 and right_total_yday >= 2)
+        )
+
+        # If eligible today, member is lifetime eligible (set True)
+        if eligible_today:
+            binary_eligible = True
+
+        # Decide "became eligible today" purely by counts:
+        # eligible_today True AND eligible_yday False AND
+        # (never eligible before OR first eligible is today)
+        became_binary_eligible_today = (
+            eligible_today
+            and (not eligible_yday)
+            and (existing_date is None or existing_date == run_date)
+        )
+
+        # If member first time eligible (existing_date is None), set earliest eligible date
+        # If some bad run wrote a later date, keep the earliest date
+        eligible_date = existing_date
+        if eligible_today:
+            if (
+                existing_date is None
+                or (
+                    hasattr(existing_date, "date")
+                    and existing_date.date() > run_date
+                )
+                or (
+                    isinstance(existing_date, date)
+                    and existing_date > run_date
+                )
+            ):
+                eligible_date = run_date
+
+        fields = {
+            "left_cf_before": left_cf_before,
+            "right_cf_before": right_cf_before,
+            "left_joins": left_today,
+            "right_joins": right_today,
+            "binary_eligible": binary_eligible,
+            "binary_income_processed": True,
+        }
+
+        # --------------------------------------------------
+        # ✅ If not eligible (and not became today) -> no binary cash
+        # (still allow flashout via the calculator, it returns cash 0)
+        # --------------------------------------------------
+        if not (binary_eligible or became_binary_eligible_today):
+            kind = "flashout"
+            pending.append((len(results), False, left_today, right_today,
+                            left_cf_before, right_cf_before, False, False))
+
+        # --------------------------------------------------
+        # ✅ Eligible: calculate using TODAY joins + CF
+        # If NO joins today AND not eligibility day -> just keep CF, no binary
+        # --------------------------------------------------
+        elif left_today == 0 and right_today == 0 and not became_binary_eligible_today:
+            kind = "hold"
+            fields.update(
+                left_cf=left_cf_before,
+                right_cf=right_cf_before,
+                left_cf_after=left_cf_before,
+                right_cf_after=right_cf_before,
+                total_income=Decimal("0.00"),
+            )
+
+        else:
+            kind = "paid"
+            pending.append((len(results), True, left_today, right_today,
+                            left_cf_before, right_cf_before,
+                            binary_eligible, became_binary_eligible_today))
+
+        results.append((kind, binary_eligible, eligible_date, fields))
+
+    # --------------------------------------------------
+    # ✅ ONE vectorized calculator call for every pending row
+    # --------------------------------------------------
+    if pending:
+        columns = list(zip(*pending))
+        res = calculate_binary_income_vector(*columns[2:])
+
+        for i, (position, eligible_row) in enumerate(zip(columns[0], columns[1])):
+            fields = results[position][3]
+            left_cf = int(res["left_cf_after"][i])
+            right_cf = int(res["right_cf_after"][i])
+
+            fields.update(
+                flashout_wallet_income=_rupees(res["flashout_income"][i]),
+                left_cf=left_cf,
+                right_cf=right_cf,
+                left_cf_after=left_cf,
+                right_cf_after=right_cf,
+            )
+
+            if not eligible_row:
+                fields["total_income"] = Decimal("0.00")
+                continue
+
+            eligibility_income = _rupees(res["eligibility_income"][i])
+            binary_income = _rupees(res["binary_income"][i])
+
+            fields.update(
+                eligibility_income=eligibility_income,
+                binary_eligibility_income=eligibility_income,  # mirror for sponsor
+                binary_income=binary_income,
+                binary_pairs_paid=int(res["binary_pairs_paid"][i]),
+                flashout_units=int(res["flashout_units"][i]),
+                washed_pairs=int(res["washed_pairs"][i]),
+                earned_fresh_binary_today=(binary_income > 0) or (eligibility_income > 0),
+                # Sponsor income will be added later
+                total_income=eligibility_income + binary_income,
+            )
+
+    return results
+
+
+# ----------------------------------------------------------
+# Process-pool mode (--workers N)
+# ----------------------------------------------------------
+_WORKER_ROWS = None
+
+
+def _init_binary_worker(rows):
+    """Each worker keeps ONE read-only copy of the input rows."""
+    global _WORKER_ROWS
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+    _WORKER_ROWS = rows
+
+
+def _compute_binary_chunk(args):
+    run_date, start, stop = args
+    return compute_binary_rows(run_date, _WORKER_ROWS[start:stop])
+
+
+def compute_binary_rows_parallel(run_date, rows, workers):
+    """
+    Same output as compute_binary_rows(), computed in a ProcessPoolExecutor.
+    Chunks are merged back in member order, so results are identical.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    if workers <= 1 or len(rows) < 2:
+        # serial: chunked only to keep the EngineLock lease alive
+        results = []
+        for part in _chunks(rows, PERSIST_CHUNK):
+            results.extend(compute_binary_rows(run_date, part))
+            engine_heartbeat()
+        return results
+
+    chunk = min(-(-len(rows) // workers), PERSIST_CHUNK)
+    ranges = [(run_date, i, i + chunk) for i in range(0, len(rows), chunk)]
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_binary_worker,
+        initargs=(rows,),
+    ) as pool:
+        for part in pool.map(_compute_binary_chunk, ranges):
+            results.extend(part)
+            engine_heartbeat()
+    return results
+
+
+def apply_binary_results(run_date, members, results, reports):
+    """
+    ✅ Apply compute_binary_rows() results to report + member objects (IN MEMORY)
+
+    members : Member objects, aligned with results
+    reports : {member_id: DailyIncomeReport} already existing for run_date
+
+    Returns dict:
+        new_reports      -> rows to bulk_create
+        updated_reports  -> rows to bulk_update
+        changed_members  -> members whose eligibility fields changed
+        rank_candidates  -> eligible members with NO joins today
+    """
+    new_reports = []
+    updated_reports = []
+    changed_members = []
+    rank_candidates = []
+
+    for member, (kind, eligible, eligible_date, fields) in zip(members, results):
+
+        report = reports.get(member.id)
+        if report is None:
+            report = DailyIncomeReport(member=member, date=run_date, left_cf=0, right_cf=0)
+            new_reports.append(report)
+        else:
+            updated_reports.append(report)
+
+        if kind == "root":
+            report.binary_income_processed = True
+            report.sponsor_today_processed = True
+            report.total_income_locked = True
+            continue
+
+        # ✅ Write member only if fields changed
+        if member.binary_eligible != eligible or member.binary_eligible_date != eligible_date:
+            member.binary_eligible = eligible
+            member.binary_eligible_date = eligible_date
+            changed_members.append(member)
+
+        for name, value in fields.items():
+            setattr(report, name, value)
+
+        # ✅ RANK UPGRADE (lifetime BV) – after reports are written
+        if kind == "hold":
+            rank_candidates.append(member)
+
+    return {
+        "new_reports": new_reports,
+        "updated_reports": updated_reports,
+        "changed_members": changed_members,
+        "rank_candidates": rank_candidates,
+    }
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def write_binary_chunk(result):
+    """✅ One chunk of the binary phase -> bulk writes in ONE transaction"""
+    with transaction.atomic():
+        DailyIncomeReport.objects.bulk_create(
+            result["new_reports"],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        DailyIncomeReport.objects.bulk_update(
+            result["updated_reports"],
+            BINARY_REPORT_FIELDS,
+            batch_size=BULK_BATCH_SIZE,
+        )
+        Member.objects.bulk_update(
+            result["changed_members"],
+            ["binary_eligible", "binary_eligible_date"],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+
+# ==========================================================
+# ONE ENGINE DAY (shared by daily run + range backfill)
+# ==========================================================
+def reset_day_reports(run_date):
+    """✅ RE-RUN SAFE: reset ONLY that day's reports"""
+    with engine_phase("reset"):
         DailyIncomeReport.objects.filter(date=run_date).update(
             eligibility_income=Decimal("0.00"),
             binary_eligibility_income=Decimal("0.00"),
@@ -432,332 +802,430 @@ def run_full_daily_engine(run_date: date):
             washed_pairs=0,
         )
 
-        members = Member.objects.filter(
-            is_active=True,
-            joined_date__lte=run_date
-        ).order_by("auto_id")
-
-        # ==================================================
-        # 1) BINARY + ELIGIBILITY + FLASHOUT + CF
-        # ==================================================
-        for member in members:
-
-            # ROOT: never gets any income; still keep report row
-            if member.auto_id == ROOT_ID:
-                report, _ = DailyIncomeReport.objects.get_or_create(
-                    date=run_date,
-                    member=member,
-                    defaults={
-                        "left_cf": 0,
-                        "right_cf": 0,
-                    }
-                )
-                report.binary_income_processed = True
-                report.sponsor_today_processed = True
-                report.total_income_locked = True
-                report.save(update_fields=[
-                    "binary_income_processed",
-                    "sponsor_today_processed",
-                    "total_income_locked",
-                ])
 
+def run_binary_phase(run_date, members, leg_totals, yesterday_cf, workers=1,
+                     reports=None, checkpoint=None):
+    """
+    ✅ Binary + eligibility + flashout + CF, then rank upgrades
+    (for the given members only – whole tree or one shard)
 
-                print(f"⛔ {member.auto_id} skipped (ROOT dummy)")
-                continue
+    Members are written in CHUNKS ordered by id. Per chunk:
+        1. reports + member eligibility in ONE transaction
+        2. rank upgrades of that chunk (batched, see process_rank_upgrades)
+        3. checkpoint -> last member id of the chunk (when checkpoint given)
+    A chunk redone after a crash rewrites the same values (re-run safe).
+
+    reports: {member_id: DailyIncomeReport} for run_date
+             (default: every row of run_date)
 
-            # ✅ ONE PLACE ONLY: get_or_create (no try/except duplicate)
-            report, _ = DailyIncomeReport.objects.get_or_create(
-                date=run_date,
-                member=member,
-                defaults={
-                    "left_cf": 0,
-                    "right_cf": 0,
-                    "sponsor_today_processed": False,
-                    "binary_income_processed": False,
-                }
+    Returns {member_id: (left_cf, right_cf)} written for run_date.
+    """
+    members = sorted(members, key=lambda m: m.id)
+    carried_cf = {}
+    bv_totals = None
+    created = updated = changed = 0
+
+    with engine_phase("binary"):
+        # ✅ PREFETCH: today's rows (after reset)
+        if reports is None:
+            reports = {
+                r.member_id: r
+                for r in DailyIncomeReport.objects.filter(date=run_date)
+            }
+
+        rows = binary_input_rows(members, leg_totals, yesterday_cf)
+        results = compute_binary_rows_parallel(run_date, rows, workers)
+
+    for start in range(0, len(members), PERSIST_CHUNK):
+        chunk = members[start:start + PERSIST_CHUNK]
+
+        with engine_phase("binary"):
+            result = apply_binary_results(
+                run_date, chunk, results[start:start + len(chunk)], reports
             )
+            write_binary_chunk(result)
 
-            # Yesterday report for CF
-            yesterday_report = DailyIncomeReport.objects.filter(
-                date=yesterday_date,
-                member=member
-            ).first()
+        # ✅ RANK UPGRADE (lifetime BV, one rolled-up BV table per run)
+        if result["rank_candidates"]:
+            with engine_phase("rank"):
+                if bv_totals is None:
+                    bv_totals = load_side_bv_totals()
+                process_rank_upgrades(run_date, result["rank_candidates"], bv_totals)
 
-            left_cf_before = int(yesterday_report.left_cf) if yesterday_report else 0
-            right_cf_before = int(yesterday_report.right_cf) if yesterday_report else 0
+        if checkpoint is not None:
+            checkpoint.mark("binary", chunk[-1].id)
 
-            report.left_cf_before = left_cf_before
-            report.right_cf_before = right_cf_before
+        created += len(result["new_reports"])
+        updated += len(result["updated_reports"])
+        changed += len(result["changed_members"])
+        for report in result["new_reports"] + result["updated_reports"]:
+            carried_cf[report.member_id] = (report.left_cf, report.right_cf)
 
-            # Today totals vs yesterday totals (date-aware)
-            left_total_today = count_all_descendants(member, "left", as_of_date=run_date)
-            right_total_today = count_all_descendants(member, "right", as_of_date=run_date)
+        engine_heartbeat(done=start + len(chunk), total=len(members))
 
-            left_total_yday = count_all_descendants(member, "left", as_of_date=yesterday_date)
-            right_total_yday = count_all_descendants(member, "right", as_of_date=yesterday_date)
+    record_rows(created + updated + changed)
 
-            # Today joins (pure delta)
-            left_today = max(left_total_today - left_total_yday, 0)
-            right_today = max(right_total_today - right_total_yday, 0)
+    print(
+        f"✅ Binary phase: {created} created, {updated} updated, "
+        f"{changed} members newly eligible"
+    )
 
-            report.left_joins = left_today
-            report.right_joins = right_today
+    return carried_cf
 
-            # --------------------------------------------------
-            # ✅ NEWLY REACHED ELIGIBILITY TODAY ONLY
-            # (supports rerun: if eligible_date == run_date -> treat as became today)
-            # --------------------------------------------------
-            eligible_today = (
-                (left_total_today >= 2 and right_total_today >= 1) or
-                (left_total_today >= 1 and right_total_today >= 2)
-            )
-            eligible_yday = (
-                (left_total_yday >= 2 and right_total_yday >= 1) or
-                (left_total_yday >= 1 and right_total_yday >= 2)
-            )
 
-            # -----------------------------------------
-            # ✅ Deterministic eligibility logic
-            # -----------------------------------------
-            existing_date = getattr(member, "binary_eligible_date", None)
-
-            # If eligible today, member is lifetime eligible (set True)
-            if eligible_today and not member.binary_eligible:
-                member.binary_eligible = True
-
-            # Decide "became eligible today" purely by counts:
-            # eligible_today True AND eligible_yday False AND
-            # (never eligible before OR first eligible is today)
-            became_binary_eligible_today = (
-                eligible_today
-                and (not eligible_yday)
-                and (existing_date is None or existing_date == run_date)
-            )
+def run_sponsor_and_final_lock(run_date, checkpoint=None):
+    """
+    ✅ Sponsor phase + final total lock (after ALL binary rows are written)
+    checkpoint: EngineCheckpoint -> marked "final_lock" / "done" as it goes
+    """
 
-            # If member first time eligible (existing_date is None), set earliest eligible date
-            # If some bad run wrote a later date, keep the earliest date
-            if eligible_today:
-                if (
-                    existing_date is None
-                    or (
-                        hasattr(existing_date, "date")
-                        and existing_date.date() > run_date
-                    )
-                    or (
-                        isinstance(existing_date, date)
-                        and existing_date > run_date
-                    )
-                ):
-                    member.binary_eligible_date = run_date
-
-            # ✅ Save member only if fields changed
-            member.save(update_fields=["binary_eligible", "binary_eligible_date"])
-
-            # Report snapshot
-            report.binary_eligible = member.binary_eligible
+    # ==================================================
+    # 2️⃣ SPONSOR INCOME – DIRECT 1:1 ELIGIBLE RECEIVER
+    # ==================================================
+    engine_heartbeat(force=True)
+    with engine_phase("sponsor"):
+        stats = run_sponsor_income_batch(run_date)
+    record_rows(stats["rows"])
+    if checkpoint is not None:
+        checkpoint.mark("final_lock")
+    engine_heartbeat(force=True)
+
+    print(
+        f"✅ Sponsor phase: {stats['amount']} credited to {stats['receivers']} "
+        f"receivers ({stats['children']} children)"
+    )
 
-            # --------------------------------------------------
-            # ✅ If not eligible (and not became today) -> no binary cash
-            # --------------------------------------------------
-            if not (member.binary_eligible or became_binary_eligible_today):
-                # still allow flashout via calculate() (it returns cash 0)
-                res = calculate_member_binary_income_for_day(
-                    member,
-                    left_today=left_today,
-                    right_today=right_today,
-                    left_cf_before=left_cf_before,
-                    right_cf_before=right_cf_before,
-                    binary_eligible=False,
-                    became_binary_eligible_today=False
-                )
+    # ==================================================
+    # 3) FINAL TOTAL LOCK
+    # ==================================================
+    with engine_phase("final_lock"):
+        locked = DailyIncomeReport.objects.filter(
+            date=run_date,
+            total_income_locked=False
+        ).update(
+            total_income=F("binary_income") + F("binary_eligibility_income") + F("sponsor_income"),
+            total_income_locked=True,
+        )
+    record_rows(locked)
+    if checkpoint is not None:
+        checkpoint.mark("done")
 
-                report.flashout_wallet_income = res["flashout_income"]
-                report.left_cf = res["left_cf_after"]
-                report.right_cf = res["right_cf_after"]
-                report.left_cf_after = report.left_cf
-                report.right_cf_after = report.right_cf
-
-                report.binary_income_processed = True
-                report.total_income = Decimal("0.00")
-                report.save(update_fields=[
-                    "flashout_wallet_income",
-                    "left_cf",
-                    "right_cf",
-                    "left_cf_after",
-                    "right_cf_after",
-                    "binary_income_processed",
-                    "total_income",
-                ])
-
-                print(f"⛔ {member.auto_id} skipped binary income (not eligible)")
-                continue
+
+def run_engine_day(run_date, members, leg_totals, yesterday_cf, workers=1,
+                   resume=False):
+    """
+    ✅ Binary -> Rank -> Sponsor -> Final lock for ONE date
+    (caller holds the EngineLock for run_date)
+
+    members      : active Member objects joined on/before run_date
+    leg_totals   : {member_id: ((left_today, right_today), (left_yday, right_yday))}
+    yesterday_cf : {member_id: (left_cf, right_cf)}
+    resume=True  : continue after the EngineLock checkpoint of a crashed run
+                   (NO reset; committed binary chunks / phases are skipped)
+
+    Returns {member_id: (left_cf, right_cf)} written for run_date
+    (tomorrow's yesterday_cf; only the members processed by THIS call).
+    """
+    print(f"🚀 Running MLM Master Engine for {run_date}")
+
+    checkpoint = EngineCheckpoint(run_date)
+    phase, last_id = checkpoint.load() if resume else ("", None)
+    step = EngineCheckpoint.PHASES.index(phase)
+
+    if step == 0:
+        checkpoint.clear()
+        reset_day_reports(run_date)
+    else:
+        print(f"⏩ Resuming {run_date} from checkpoint: {phase} {last_id or ''}".rstrip())
+
+    if phase == "binary" and last_id is not None:
+        members = [m for m in members if m.id > last_id]
+    record_members(len(members))
+
+    # ==================================================
+    # 1) BINARY + ELIGIBILITY + FLASHOUT + CF
+    # ==================================================
+    carried_cf = {}
+    if step <= EngineCheckpoint.PHASES.index("binary"):
+        carried_cf = run_binary_phase(
+            run_date, members, leg_totals, yesterday_cf,
+            workers=workers, checkpoint=checkpoint,
+        )
+        checkpoint.mark("sponsor")
+
+    if step < EngineCheckpoint.PHASES.index("done"):
+        run_sponsor_and_final_lock(run_date, checkpoint=checkpoint)
+
+    print("✅ MLM Master Engine Completed Successfully")
+    return carried_cf
+
+
+def load_engine_members(run_date):
+    """Active members joined on/before run_date (engine order)."""
+    return list(
+        Member.objects.filter(
+            is_active=True,
+            joined_date__lte=run_date
+        ).only(*ENGINE_MEMBER_FIELDS).order_by("auto_id")
+    )
+
+
+def load_report_cf(run_date, first_id=None, last_id=None):
+    """{member_id: (left_cf, right_cf)} stored for run_date (optionally one id range)."""
+    reports = DailyIncomeReport.objects.filter(date=run_date)
+    if first_id is not None:
+        reports = reports.filter(member_id__gte=first_id, member_id__lte=last_id)
+
+    return {
+        member_id: (left_cf, right_cf)
+        for member_id, left_cf, right_cf in reports.values_list("member_id", "left_cf", "right_cf")
+    }
+
+
+# ==========================================================
+# FULL DAILY ENGINE (RE-RUN SAFE)
+# ==========================================================
+def run_full_daily_engine(run_date: date, workers: int = 1, dry_run: bool = False,
+                          resume: bool = False):
+    """
+    ✅ FULL DAILY ENGINE (LOCKED)
+
+    - Uses EngineLock (is_running + finished_at)
+    - Allows rerun only for TODAY with cooldown (late join fix)
+    - Sets EngineLock.finished_at after successful run
+    - workers > 1 -> binary phase computed in a process pool
+      (same results as the serial run; all writes stay in this process)
+    - dry_run=True -> simulate_daily_engine(): NO lock, NO writes,
+      returns the per-member result instead
+    - resume=True -> continue a crashed run from its EngineLock checkpoint
+      (committed binary chunks are not recomputed, sponsor stays single-credit)
+    """
+    if dry_run:
+        return simulate_daily_engine(run_date, workers=workers)
+
+    def _engine(run_date: date):
+        with engine_phase("snapshot"):
+            members = load_engine_members(run_date)
 
             # --------------------------------------------------
-            # ✅ Eligible: calculate using TODAY joins + CF
-            # If NO joins today AND not eligibility day -> just keep CF, no binary
+            # ✅ TREE SNAPSHOT: today + yesterday leg totals for
+            # every member from ONE query and ONE post-order pass
+            # (yesterday read back from DailyLegSnapshot when stored)
             # --------------------------------------------------
-            if left_today == 0 and right_today == 0 and not became_binary_eligible_today:
-                report.left_cf = left_cf_before
-                report.right_cf = right_cf_before
-                report.left_cf_after = report.left_cf
-                report.right_cf_after = report.right_cf
-                report.binary_income_processed = True
-                report.total_income = Decimal("0.00")
-                report.save(update_fields=[
-                    "left_cf",
-                    "right_cf",
-                    "left_cf_after",
-                    "right_cf_after",
-                    "binary_income_processed",
-                    "total_income",
-                ])
-
-                # ✅ RANK UPGRADE (lifetime BV)
-                process_rank_upgrade(member)
+            leg_totals = engine_leg_totals(run_date)
+            yesterday_cf = load_report_cf(run_date - timedelta(days=1))
 
-                continue
+        run_engine_day(
+            run_date, members, leg_totals, yesterday_cf,
+            workers=workers, resume=resume,
+        )
 
-            res = calculate_member_binary_income_for_day(
-                member,
-                left_today=left_today,
-                right_today=right_today,
-                left_cf_before=left_cf_before,
-                right_cf_before=right_cf_before,
-                binary_eligible=member.binary_eligible,
-                became_binary_eligible_today=became_binary_eligible_today
-            )
+    # ✅ IMPORTANT: run through global lock wrapper
+    return run_with_lock(run_date, _engine, allow_rerun_today=True, cooldown_minutes=5)
 
-            with transaction.atomic():
-                report.eligibility_income = res["eligibility_income"]
-                report.binary_eligibility_income = res["eligibility_income"]  # mirror for sponsor
 
-                report.binary_income = res["binary_income"]
-                report.binary_pairs_paid = res["binary_pairs_paid"]
+# ==========================================================
+# DRY RUN / SIMULATION (READ ONLY)
+# ==========================================================
+DRY_RUN_INCOME_FIELDS = (
+    "eligibility_income",
+    "binary_income",
+    "flashout_wallet_income",
+    "sponsor_income",
+    "total_income",
+)
 
-                report.flashout_wallet_income = res["flashout_income"]
-                report.flashout_units = res["flashout_units"]
-                report.washed_pairs = res["washed_pairs"]
 
-                report.left_cf = res["left_cf_after"]
-                report.right_cf = res["right_cf_after"]
-                report.left_cf_after = report.left_cf
-                report.right_cf_after = report.right_cf
+def simulate_daily_engine(run_date: date, workers: int = 1):
+    """
+    ✅ Payout preview for run_date – writes NOTHING
 
-                report.earned_fresh_binary_today = (
-                    (report.binary_income > 0) or (report.binary_eligibility_income > 0)
-                )
+    - No EngineLock, no DailyIncomeReport / Member / DailyLegSnapshot writes
+    - Binary phase: same pure compute as the real run (compute_binary_rows)
+    - Sponsor phase: same receiver rules (resolve_sponsor_credits), credited
+      in memory from the simulated binary incomes
+    - Rank upgrades are NOT simulated (only counted as rank_candidates)
 
-                # Sponsor income will be added later
-                report.total_income = report.eligibility_income + report.binary_income
-
-                report.binary_income_processed = True
-
-                report.save(update_fields=[
-                    "eligibility_income",
-                    "binary_eligibility_income",
-                    "binary_income",
-                    "binary_pairs_paid",
-                    "flashout_wallet_income",
-                    "flashout_units",
-                    "washed_pairs",
-                    "left_cf",
-                    "right_cf",
-                    "left_cf_after",
-                    "right_cf_after",
-                    "earned_fresh_binary_today",
-                    "total_income",
-                    "binary_income_processed",
-                ])
-
-        # ==================================================
-        # 2️⃣ SPONSOR INCOME – DIRECT 1:1 ELIGIBLE RECEIVER
-        # ==================================================
-        sponsor_children = list(get_valid_sponsor_children(run_date))
-
-        print("🧾 SPONSOR CHILDREN TODAY:", [c.auto_id for c in sponsor_children])
-
-        for child in sponsor_children:
-
-            if child.auto_id == ROOT_ID:
-                continue
+    Returns {"run_date", "rows": [per-member dict], "totals": {...}}
+    """
+    from herbalapp.mlm.sponsor_engine import resolve_sponsor_credits, sum_sponsor_credits
+
+    members = load_engine_members(run_date)
+    leg_totals = engine_leg_totals(run_date, save=False)
+    yesterday_cf = load_report_cf(run_date - timedelta(days=1))
+
+    rows = binary_input_rows(members, leg_totals, yesterday_cf)
+    results = compute_binary_rows_parallel(run_date, rows, workers)
+
+    zero = Decimal("0.00")
+    out = {}
+    rank_candidates = 0
+
+    for member, (kind, eligible, eligible_date, fields) in zip(members, results):
+        row = {
+            "member_id": member.id,
+            "auto_id": member.auto_id,
+            "kind": kind,
+            "binary_eligible": eligible,
+            "binary_eligible_date": eligible_date,
+            "left_joins": fields.get("left_joins", 0),
+            "right_joins": fields.get("right_joins", 0),
+            "left_cf_before": fields.get("left_cf_before", 0),
+            "right_cf_before": fields.get("right_cf_before", 0),
+            "left_cf_after": fields.get("left_cf_after", 0),
+            "right_cf_after": fields.get("right_cf_after", 0),
+            "binary_pairs_paid": fields.get("binary_pairs_paid", 0),
+            "flashout_units": fields.get("flashout_units", 0),
+            "washed_pairs": fields.get("washed_pairs", 0),
+        }
+        for name in DRY_RUN_INCOME_FIELDS:
+            row[name] = fields.get(name, zero) if kind != "root" else zero
+        row["sponsor_income"] = zero
+
+        out[member.id] = row
+        if kind == "hold":
+            rank_candidates += 1
+
+    # --------------------------------------------------
+    # ✅ Sponsor income (in memory)
+    # --------------------------------------------------
+    earning = [
+        (member_id, member_id, row["binary_income"] + row["eligibility_income"])
+        for member_id, row in out.items()
+        if row["binary_income"] + row["eligibility_income"] > 0
+    ]
+    links = {
+        member_id: (placement_id, sponsor_id)
+        for member_id, placement_id, sponsor_id in Member.objects.filter(
+            id__in=[e[0] for e in earning]
+        ).values_list("id", "placement_id", "sponsor_id")
+    }
+    root_ids = set(Member.objects.filter(auto_id=ROOT_ID).values_list("id", flat=True))
 
-            child_report = DailyIncomeReport.objects.filter(
-                member=child,
-                date=run_date
-            ).first()
-            if not child_report:
-                continue
+    credits = resolve_sponsor_credits(
+        run_date,
+        [(key, child_id, *links.get(child_id, (None, None)), amount) for key, child_id, amount in earning],
+        root_ids,
+    )
 
-            # 🔍 DEBUG: child mapping (before receiver decide)
-            print(
-                "\n👶 CHILD:", child.auto_id,
-                "| placement_id:", getattr(child, "placement_id", None),
-                "| sponsor_id:", getattr(child, "sponsor_id", None),
-                "| parent:", child.parent.auto_id if getattr(child, "parent", None) else None,
-                "| sponsor:", child.sponsor.auto_id if getattr(child, "sponsor", None) else None
-            )
+    for receiver_id, amount in sum_sponsor_credits(credits).items():
+        row = out.get(receiver_id)
+        if row is None:
+            # receiver outside today's engine members (e.g. inactive)
+            receiver = Member.objects.only("id", "auto_id").get(id=receiver_id)
+            row = out[receiver_id] = {
+                "member_id": receiver_id, "auto_id": receiver.auto_id, "kind": "sponsor_only",
+                **{name: zero for name in DRY_RUN_INCOME_FIELDS},
+            }
+        row["sponsor_income"] += amount
+
+    # --------------------------------------------------
+    # ✅ Final total (same as FINAL TOTAL LOCK)
+    # --------------------------------------------------
+    for row in out.values():
+        if row["kind"] != "root":
+            row["total_income"] = row["binary_income"] + row["eligibility_income"] + row["sponsor_income"]
+
+    result_rows = list(out.values())
+    totals = {
+        name: sum((row[name] for row in result_rows), zero)
+        for name in DRY_RUN_INCOME_FIELDS
+    }
+    totals.update(
+        members=len(members),
+        earning_members=sum(1 for row in result_rows if row["total_income"] > 0),
+        sponsor_credits=len(credits),
+        flashout_units=sum(row.get("flashout_units", 0) for row in result_rows),
+        rank_candidates=rank_candidates,
+    )
 
-            # ✅ Receiver based on Rule-1/Rule-2 + DIRECT 1:1 eligibility
-            receiver = get_sponsor_receiver(child, run_date)
-            print("🎯 RECEIVER:", receiver.auto_id if receiver else None)
+    return {"run_date": run_date, "rows": result_rows, "totals": totals}
 
-            if not receiver:
-                continue
 
-            # ✅ Child-level lock (duplicate safe)
-            updated = DailyIncomeReport.objects.filter(
-                member=child,
-                date=run_date,
-                sponsor_today_processed=False
-            ).update(sponsor_today_processed=True)
+def write_dry_run_jsonl(result, fp):
+    """One JSON line per member row, then one {"totals": ...} line."""
+    import json
+    from django.core.serializers.json import DjangoJSONEncoder
 
-            print("🔒 CHILD LOCK UPDATED:", updated)
+    for row in result["rows"]:
+        fp.write(json.dumps({"run_date": result["run_date"], **row}, cls=DjangoJSONEncoder) + "\n")
+    fp.write(json.dumps({"run_date": result["run_date"], "totals": result["totals"]}, cls=DjangoJSONEncoder) + "\n")
 
-            if updated == 0:
-                continue
 
-            sponsor_amount = child_report.binary_income + child_report.binary_eligibility_income
-            print("💰 CHILD AMOUNT:", child_report.binary_income, "+", child_report.binary_eligibility_income, "=", sponsor_amount)
+# ==========================================================
+# MULTI-DAY BACKFILL (ONE TREE LOAD)
+# ==========================================================
+def run_engine_range(start_date: date, end_date: date, workers: int = 1):
+    """
+    ✅ Replay start_date..end_date (inclusive) after missed days
 
-            if sponsor_amount <= 0:
-                continue
+    - Tree + members loaded ONCE for the whole range
+    - Leg totals rolled forward day by day in memory
+      (as-of index built once, one cumsum per join day)
+      (a day without any placement reuses yesterday's totals)
+    - CF carried in memory from one day to the next
+    - Each day still runs under its OWN EngineLock (run_with_lock),
+      so finished past dates are skipped exactly like force/daily runs
 
-            with transaction.atomic():
-                receiver_report, _ = DailyIncomeReport.objects.get_or_create(
-                    member=receiver,
-                    date=run_date
-                )
-                receiver_report.sponsor_income += sponsor_amount
-                receiver_report.total_income += sponsor_amount
-                receiver_report.save(update_fields=["sponsor_income", "total_income"])
+    Returns list of (run_date, ran) tuples.
+    """
+    if end_date < start_date:
+        raise ValueError("end_date must be on/after start_date")
+
+    snapshot = TreeSnapshot.load()
+    index = snapshot.as_of_index()
+    all_members = load_engine_members(end_date)
+    join_days = {d for d in snapshot.joined_dates if d is not None}
+
+    # members sorted by joined_date once -> each day takes a prefix
+    by_join = sorted(all_members, key=lambda m: m.joined_date)
+    join_keys = [m.joined_date for m in by_join]
+    engine_order = {m.id: i for i, m in enumerate(all_members)}
+
+    day = start_date
+    yesterday = day - timedelta(days=1)
+    yday_totals = load_daily_leg_totals(yesterday, index.tree_stamp(yesterday))
+    if yday_totals is None:
+        yday_totals = {k: v[0] for k, v in index.leg_totals(yesterday).items()}
+
+    carried_cf = None
+    outcome = []
+
+    while day <= end_date:
+        if day in join_days or day == start_date:
+            today_totals = {k: v[0] for k, v in index.leg_totals(day).items()}
+        else:
+            today_totals = yday_totals
+
+        members = by_join[:bisect_right(join_keys, day)]
+        members.sort(key=lambda m: engine_order[m.id])
+
+        leg_totals = {
+            member_id: (pair, yday_totals.get(member_id, (0, 0)))
+            for member_id, pair in today_totals.items()
+        }
 
-                print("✅ CREDITED TO:", receiver.auto_id, "| sponsor_income now:", receiver_report.sponsor_income)
+        state = {}
 
-        # ==================================================
-        # 3) FINAL TOTAL LOCK
-        # ==================================================
-        for report in DailyIncomeReport.objects.filter(date=run_date):
-            if report.total_income_locked:
-                continue
+        def _engine(run_date, members=members, leg_totals=leg_totals,
+                    today_totals=today_totals, yesterday_cf=carried_cf):
+            with engine_phase("snapshot"):
+                save_daily_leg_totals(run_date, today_totals, index.tree_stamp(run_date))
+                if yesterday_cf is None:
+                    yesterday_cf = load_report_cf(run_date - timedelta(days=1))
+            state["cf"] = run_engine_day(run_date, members, leg_totals, yesterday_cf, workers=workers)
 
-            report.total_income = (
-                (report.binary_income or Decimal("0.00")) +
-                (report.binary_eligibility_income or Decimal("0.00")) +
-                (report.sponsor_income or Decimal("0.00"))
-            )
-            report.total_income_locked = True
-            report.save(update_fields=["total_income", "total_income_locked"])
+        run_with_lock(day, _engine, allow_rerun_today=True, cooldown_minutes=5)
 
-        print("✅ MLM Master Engine Completed Successfully")
-        # ✅ YOUR EXISTING ENGINE CODE ENDS HERE (UNCHANGED)
+        # skipped day (lock) -> next day reads CF from DB
+        carried_cf = state.get("cf")
+        outcome.append((day, "cf" in state))
 
-    # ✅ IMPORTANT: run through global lock wrapper
-    return run_with_lock(run_date, _engine, allow_rerun_today=True, cooldown_minutes=5)
+        yday_totals = today_totals
+        day += timedelta(days=1)
 
-        from herbalapp.mlm_rank_engine import process_rank_upgrade
+    return outcome
 
-        # inside daily member loop
-        process_rank_upgrade(member)
 
 # ----------------------------------------------------------
 # Django Command - MANUAL / CRON / CELERY SAFE
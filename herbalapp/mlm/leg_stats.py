@@ -0,0 +1,166 @@
+# herbalapp/mlm/leg_stats.py
+"""
+Incremental leg counters (MemberLegStats)
+
+✅ Join  -> +1 on the correct leg of EVERY ancestor (2 UPDATE queries)
+✅ Move  -> subtract whole subtree from old uplines, add to new uplines
+✅ is_active toggled -> +/-1 active on the correct leg of every ancestor
+   (Member post_save in herbalapp.signals)
+✅ Reads -> O(1) via get_leg_counts(member)
+✅ Full rebuild from one TreeSnapshot pass (rebuild_leg_stats)
+   (existing trees are backfilled by migration 0038, so the writers
+   always start from a complete table)
+
+All writers must run inside the caller's transaction.atomic().
+"""
+
+from django.db.models import F
+
+from herbalapp.models import MemberLegStats
+from herbalapp.utils.tree_utils import get_ancestor_chain
+
+CHUNK_SIZE = 5000
+
+
+def _ensure_rows(member_ids):
+    MemberLegStats.objects.bulk_create(
+        [MemberLegStats(member_id=member_id) for member_id in member_ids],
+        ignore_conflicts=True,
+    )
+
+
+def _shift_chain(chain, total, active):
+    """Add (total, active) to the matching leg of every ancestor in chain."""
+    if not chain or (total == 0 and active == 0):
+        return
+
+    _ensure_rows(ancestor_id for ancestor_id, _ in chain)
+
+    left_ids = [ancestor_id for ancestor_id, side in chain if side == "left"]
+    right_ids = [ancestor_id for ancestor_id, side in chain if side == "right"]
+
+    if left_ids:
+        MemberLegStats.objects.filter(member_id__in=left_ids).update(
+            left_total=F("left_total") + total,
+            left_active=F("left_active") + active,
+        )
+    if right_ids:
+        MemberLegStats.objects.filter(member_id__in=right_ids).update(
+            right_total=F("right_total") + total,
+            right_active=F("right_active") + active,
+        )
+
+
+def _subtree_weight(member):
+    """(total, active) contributed by member + its whole downline."""
+    stats = MemberLegStats.objects.filter(member_id=member.id).first()
+    total = 1
+    active = 1 if member.is_active else 0
+    if stats:
+        total += stats.left_total + stats.right_total
+        active += stats.left_active + stats.right_active
+    return total, active
+
+
+# ----------------------------------------------------------
+# Writers
+# ----------------------------------------------------------
+def apply_join(member):
+    """New member placed in the tree (leaf)."""
+    _ensure_rows([member.id])
+    _shift_chain(get_ancestor_chain(member.id), 1, 1 if member.is_active else 0)
+
+
+def apply_move(member, old_chain):
+    """
+    Member (with its downline) moved to a new parent/side.
+    old_chain = get_ancestor_chain(member.id) captured BEFORE the move.
+    """
+    total, active = _subtree_weight(member)
+    _shift_chain(old_chain, -total, -active)
+    _shift_chain(get_ancestor_chain(member.id), total, active)
+
+
+def apply_active_change(member, chain=None):
+    """
+    member.is_active flipped (already saved): only the *_active counters move.
+    chain = uplines the member is counted under (default: current ones;
+    the OLD chain when a move is applied right after, see signals.py).
+    """
+    if chain is None:
+        chain = get_ancestor_chain(member.id)
+    _shift_chain(chain, 0, 1 if member.is_active else -1)
+
+
+def apply_remove(member, chain):
+    """Member (with its downline) detached from the tree."""
+    total, active = _subtree_weight(member)
+    _shift_chain(chain, -total, -active)
+
+
+# ----------------------------------------------------------
+# Readers
+# ----------------------------------------------------------
+def get_leg_counts(member, as_of_date=None, index=None):
+    """
+    Returns (left_total, right_total) for member.
+    Falls back to the recursive count when the row does not exist yet.
+
+    as_of_date -> counts as on that day (historic screens / reports):
+    answered by index (AsOfLegIndex, many members from one snapshot)
+    or by one Euler range scan per leg.
+    """
+    if as_of_date is not None:
+        if index is not None:
+            return (
+                index.count_as_of(member.id, "left", as_of_date),
+                index.count_as_of(member.id, "right", as_of_date),
+            )
+
+        from herbalapp.mlm.final_master_engine import count_all_descendants
+        return (
+            count_all_descendants(member, "left", as_of_date=as_of_date),
+            count_all_descendants(member, "right", as_of_date=as_of_date),
+        )
+
+    stats = MemberLegStats.objects.filter(member_id=member.id).first()
+    if stats:
+        return stats.left_total, stats.right_total
+
+    from herbalapp.mlm.final_master_engine import count_all_descendants
+    return (
+        count_all_descendants(member, "left", as_of_date=None),
+        count_all_descendants(member, "right", as_of_date=None),
+    )
+
+
+# ----------------------------------------------------------
+# Full rebuild (repair / first deploy)
+# ----------------------------------------------------------
+def rebuild_leg_stats(snapshot=None):
+    """Recompute every member's counters from one TreeSnapshot pass."""
+    from herbalapp.mlm.tree_snapshot import TreeSnapshot
+
+    snapshot = snapshot or TreeSnapshot.load()
+    totals = snapshot.leg_totals(None)
+    active = snapshot.leg_totals(None, active_only=True)
+
+    rows = [
+        MemberLegStats(
+            member_id=member_id,
+            left_total=totals[member_id][0][0],
+            right_total=totals[member_id][0][1],
+            left_active=active[member_id][0][0],
+            right_active=active[member_id][0][1],
+        )
+        for member_id in snapshot.ids
+    ]
+
+    MemberLegStats.objects.bulk_create(
+        rows,
+        batch_size=CHUNK_SIZE,
+        update_conflicts=True,
+        unique_fields=["member"],
+        update_fields=["left_total", "right_total", "left_active", "right_active"],
+    )
+    return len(rows)
@@ -0,0 +1,154 @@
+# herbalapp/mlm/sponsor_closure.py
+"""
+Sponsor-tree closure table (SponsorClosure)
+
+    (ancestor, descendant, level) for every sponsor upline of every member,
+    plus one level-0 row per member (itself)
+
+✅ Join            -> sponsor's upline rows copied one level down
+                      (1 read + 1 INSERT)
+✅ Sponsor change  -> whole sponsored downline detached from the old uplines
+                      and attached under the new sponsor (set-based)
+✅ Delete          -> sponsored downline becomes its own tree
+                      (sponsor FK is SET_NULL)
+✅ Reads           -> level-wise counts / "team up to level N" /
+                      generation report in ONE indexed query each
+✅ Full rebuild: python manage.py rebuild_sponsor_closure
+
+All writers must run inside the caller's transaction.atomic().
+"""
+
+from django.db.models import Count, F, Q
+
+from herbalapp.models import Member, SponsorClosure
+
+CHUNK_SIZE = 5000
+
+
+# ----------------------------------------------------------
+# Full rebuild (repair / first deploy)
+# ----------------------------------------------------------
+def rebuild_sponsor_closure():
+    """Recompute every closure row from one (id, sponsor_id) query."""
+    sponsor_of = dict(Member.objects.order_by().values_list("id", "sponsor_id"))
+
+    rows = []
+    for member_id in sponsor_of:
+        rows.append(SponsorClosure(ancestor_id=member_id, descendant_id=member_id, level=0))
+
+        seen = {member_id}
+        ancestor_id = sponsor_of.get(member_id)
+        level = 1
+        # a sponsor cycle stops at the first repeated member
+        while ancestor_id is not None and ancestor_id not in seen:
+            rows.append(SponsorClosure(ancestor_id=ancestor_id, descendant_id=member_id, level=level))
+            seen.add(ancestor_id)
+            ancestor_id = sponsor_of.get(ancestor_id)
+            level += 1
+
+    SponsorClosure.objects.all().delete()
+    SponsorClosure.objects.bulk_create(rows, batch_size=CHUNK_SIZE)
+    return len(rows)
+
+
+# ----------------------------------------------------------
+# Writers
+# ----------------------------------------------------------
+def _attach(subtree, sponsor_id, rows=()):
+    """
+    Rows linking every (member, depth) in subtree below sponsor_id's
+    uplines (+ any extra rows) in ONE INSERT.
+    """
+    rows = list(rows)
+    if sponsor_id is not None:
+        uplines = SponsorClosure.objects.filter(descendant_id=sponsor_id).values_list("ancestor_id", "level")
+        rows += [
+            SponsorClosure(ancestor_id=ancestor_id, descendant_id=member_id, level=up + depth + 1)
+            for ancestor_id, up in uplines
+            for member_id, depth in subtree
+        ]
+    if rows:
+        SponsorClosure.objects.bulk_create(rows, batch_size=CHUNK_SIZE, ignore_conflicts=True)
+
+
+def _detach(member_id):
+    """Drop the links between member's sponsored subtree and its uplines."""
+    subtree_ids = SponsorClosure.objects.filter(ancestor_id=member_id).values("descendant_id")
+    SponsorClosure.objects.filter(descendant_id__in=subtree_ids).exclude(
+        ancestor_id__in=subtree_ids
+    ).delete()
+
+
+def apply_join(member):
+    """New member saved with its sponsor."""
+    own = SponsorClosure(ancestor_id=member.id, descendant_id=member.id, level=0)
+    _attach([(member.id, 0)], member.sponsor_id, rows=[own])
+
+
+def apply_sponsor_change(member):
+    """
+    member.sponsor was changed (already saved): the member and everyone
+    it sponsored move under the new sponsor's uplines.
+    """
+    subtree = list(
+        SponsorClosure.objects.filter(ancestor_id=member.id).values_list("descendant_id", "level")
+    )
+    if member.sponsor_id is not None and any(d == member.sponsor_id for d, _ in subtree):
+        raise ValueError("New sponsor is inside the member's own sponsored downline")
+
+    _detach(member.id)
+    _attach(subtree or [(member.id, 0)], member.sponsor_id)
+
+
+def apply_remove(member):
+    """Member about to be deleted: its sponsored downline becomes a separate tree."""
+    _detach(member.id)
+
+
+# ----------------------------------------------------------
+# Readers (one query each)
+# ----------------------------------------------------------
+def _levels(member, max_level=None):
+    rows = SponsorClosure.objects.filter(ancestor_id=member.id, level__gte=1)
+    if max_level is not None:
+        rows = rows.filter(level__lte=max_level)
+    return rows
+
+
+def sponsor_level_counts(member, max_level=None):
+    """{level: members sponsored at that depth} (1 = direct)."""
+    rows = _levels(member, max_level).values("level").annotate(count=Count("id")).order_by("level")
+    return {row["level"]: row["count"] for row in rows}
+
+
+def sponsored_downline(member, max_level=None):
+    """
+    Queryset of member's sponsored downline up to max_level,
+    each Member annotated with sponsor_level.
+    """
+    link = Q(sponsor_ancestors__ancestor_id=member.id, sponsor_ancestors__level__gte=1)
+    if max_level is not None:
+        link &= Q(sponsor_ancestors__level__lte=max_level)
+    return (
+        Member.objects.filter(link)
+        .annotate(sponsor_level=F("sponsor_ancestors__level"))
+        .order_by("sponsor_level", "id")
+    )
+
+
+def generation_report(member, max_level=None):
+    """
+    [{"level", "members", "active", "binary_eligible"}, ...] per generation
+    of the sponsor tree.
+    """
+    rows = (
+        _levels(member, max_level)
+        .values("level")
+        .annotate(
+            members=Count("id"),
+            active=Count("id", filter=Q(descendant__is_active=True)),
+            binary_eligible=Count("id", filter=Q(descendant__binary_eligible=True)),
+        )
+        .order_by("level")
+    )
+    return list(rows)
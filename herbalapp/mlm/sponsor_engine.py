@@ -3,8 +3,8 @@
 from decimal import Decimal
 from django.db import transaction
 
-from herbalapp.models import DailyIncomeReport, Member
-from herbalapp.mlm.filters import get_valid_sponsor_children
+from herbalapp.models import DailyIncomeReport, Member, SponsorIncomeLog
+from herbalapp.mlm.filters import valid_sponsor_child_reports
 
 ROOT_ID = "rocky001"
 
@@ -65,74 +65,186 @@ def get_sponsor_receiver(child: Member, run_date):
     return receiver
 
 
-def run_sponsor_income_safe(run_date):
+# ==========================================================
+# BATCHED SPONSOR PHASE
+# ==========================================================
+BULK_BATCH_SIZE = 1000
+
+
+def direct_one_one_ids(member_ids, run_date):
     """
-    ✅ SAFE SPONSOR INCOME ENGINE (SINGLE SOURCE)
+    ✅ Batched can_receive_sponsor_income()
 
-    RULES:
-    1️⃣ Child must earn (binary_income > 0 OR binary_eligibility_income > 0) TODAY
-    2️⃣ Receiver determined by placement_id vs sponsor_id
-    3️⃣ Receiver must satisfy DIRECT 1:1 eligibility (as of run_date)
-    4️⃣ ROOT never gets sponsor income
-    5️⃣ sponsor_today_processed = HARD LOCK (no duplicates)
-    6️⃣ Sponsor amount = child (binary + eligibility) only (NO flashout)
+    Returns the set of ids (out of member_ids) having an active DIRECT left
+    AND an active DIRECT right child as of run_date.
     """
-    print(f"🔄 Running Sponsor Engine for {run_date}")
+    member_ids = list(member_ids)
+    sides = {}
 
-    children = get_valid_sponsor_children(run_date)
+    for i in range(0, len(member_ids), BULK_BATCH_SIZE):
+        rows = Member.objects.filter(
+            parent_id__in=member_ids[i:i + BULK_BATCH_SIZE],
+            side__in=["left", "right"],
+            is_active=True,
+            joined_date__lte=run_date
+        ).values_list("parent_id", "side").distinct()
 
-    for child in children:
-        if child.auto_id == ROOT_ID:
-            continue
+        for parent_id, side in rows:
+            sides.setdefault(parent_id, set()).add(side)
 
-        child_report = DailyIncomeReport.objects.filter(member=child, date=run_date).first()
-        if not child_report:
-            continue
+    return {member_id for member_id, found in sides.items() if len(found) == 2}
 
-        receiver = get_sponsor_receiver(child, run_date)
-        if not receiver:
-            continue
 
-        sponsor_amount = child_report.binary_income + child_report.binary_eligibility_income
-        if sponsor_amount <= 0:
+def resolve_sponsor_credits(run_date, children, root_ids):
+    """
+    ✅ Rule-1 / Rule-2 receiver + DIRECT 1:1 check for many children (READ ONLY)
+
+    children: (key, child_id, placement_id, sponsor_id, amount) tuples
+    Returns [(key, child_id, receiver_id, amount), ...] for children that credit.
+    """
+    # Rule-1: placement_id == sponsor_id -> placement
+    # Rule-2: otherwise                  -> sponsor
+    wanted = []
+    for key, child_id, placement_id, sponsor_id, amount in children:
+        if child_id in root_ids:
             continue
 
-        # ✅ DB-level lock (duplicate safe)
-        updated = DailyIncomeReport.objects.filter(
-            member=child,
-            date=run_date,
-            sponsor_today_processed=False
-        ).update(sponsor_today_processed=True)
+        if placement_id and sponsor_id and placement_id == sponsor_id:
+            receiver_id = placement_id
+        else:
+            receiver_id = sponsor_id
 
-        if updated == 0:
-            continue
+        if receiver_id and receiver_id not in root_ids:
+            wanted.append((key, child_id, receiver_id, amount))
+
+    eligible = direct_one_one_ids({w[2] for w in wanted}, run_date)
+    return [w for w in wanted if w[2] in eligible]
+
+
+def sum_sponsor_credits(credits):
+    """{receiver_id: total amount} from resolve_sponsor_credits() output."""
+    amounts = {}
+    for _, _, receiver_id, amount in credits:
+        amounts[receiver_id] = amounts.get(receiver_id, Decimal("0.00")) + amount
+    return amounts
 
-        # ✅ atomic per credit
-        with transaction.atomic():
-            receiver_report, _ = DailyIncomeReport.objects.get_or_create(
-                member=receiver,
+
+def run_sponsor_income_batch(run_date):
+    """
+    ✅ BATCHED SPONSOR INCOME (same rules as get_sponsor_receiver)
+
+    - ONE query for today's earning children (with placement/sponsor ids)
+    - Rule-1 / Rule-2 receivers resolved in memory
+    - DIRECT 1:1 check for all receivers in one pass
+    - Amounts summed per receiver -> ONE bulk_update / bulk_create
+    - Child locks + SponsorIncomeLog rows written in bulk
+
+    Children without an eligible receiver stay unlocked (same as before).
+    Returns dict: children, receivers, amount, rows (rows written)
+    """
+    root_ids = set(Member.objects.filter(auto_id=ROOT_ID).values_list("id", flat=True))
+
+    with transaction.atomic():
+        rows = list(
+            valid_sponsor_child_reports(run_date)
+            .select_for_update()
+            .exclude(member_id__in=root_ids)
+            .values_list(
+                "id",
+                "member_id",
+                "member__placement_id",
+                "member__sponsor_id",
+                "binary_income",
+                "binary_eligibility_income",
+            )
+        )
+
+        credits = resolve_sponsor_credits(
+            run_date,
+            [
+                (report_id, child_id, placement_id, sponsor_id, binary + eligibility)
+                for report_id, child_id, placement_id, sponsor_id, binary, eligibility in rows
+            ],
+            root_ids,
+        )
+        amounts = sum_sponsor_credits(credits)
+
+        # ✅ Child-level lock (all credited children at once)
+        rows_written = DailyIncomeReport.objects.filter(
+            id__in=[c[0] for c in credits]
+        ).update(sponsor_today_processed=True)
+
+        # ✅ Receiver credit: update existing rows, create missing ones
+        receiver_reports = list(
+            DailyIncomeReport.objects.select_for_update().filter(
                 date=run_date,
-                defaults={
-                    "binary_income": Decimal("0.00"),
-                    "binary_eligibility_income": Decimal("0.00"),
-                    "eligibility_income": Decimal("0.00"),
-                    "sponsor_income": Decimal("0.00"),
-                    "flashout_wallet_income": Decimal("0.00"),
-                    "total_income": Decimal("0.00"),
-                    "left_cf": 0,
-                    "right_cf": 0,
-                    "earned_fresh_binary_today": False,
-                    "sponsor_today_processed": False,
-                    "total_income_locked": False,
-                    "binary_income_processed": False,
-                }
+                member_id__in=list(amounts)
             )
+        )
+        for report in receiver_reports:
+            report.sponsor_income += amounts[report.member_id]
+            report.total_income += amounts[report.member_id]
+
+        rows_written += DailyIncomeReport.objects.bulk_update(
+            receiver_reports,
+            ["sponsor_income", "total_income"],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        existing = {r.member_id for r in receiver_reports}
+        rows_written += len(amounts) - len(existing)
+        DailyIncomeReport.objects.bulk_create(
+            [
+                DailyIncomeReport(
+                    member_id=receiver_id,
+                    date=run_date,
+                    left_cf=0,
+                    right_cf=0,
+                    sponsor_income=amount,
+                    total_income=amount,
+                )
+                for receiver_id, amount in amounts.items()
+                if receiver_id not in existing
+            ],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        SponsorIncomeLog.objects.bulk_create(
+            [
+                SponsorIncomeLog(sponsor_id=receiver_id, child_id=child_id, date=run_date)
+                for _, child_id, receiver_id, _ in credits
+            ],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        rows_written += len(credits)
+
+    return {
+        "children": len(credits),
+        "receivers": len(amounts),
+        "amount": sum(amounts.values(), Decimal("0.00")),
+        "rows": rows_written,
+    }
 
-            receiver_report.sponsor_income += sponsor_amount
-            receiver_report.total_income += sponsor_amount
-            receiver_report.save(update_fields=["sponsor_income", "total_income"])
 
-        print(f"✅ Sponsor income {sponsor_amount} credited to {receiver.auto_id} (child {child.auto_id})")
+def run_sponsor_income_safe(run_date):
+    """
+    ✅ SAFE SPONSOR INCOME ENGINE (SINGLE SOURCE)
 
-    print("✅ Sponsor Engine Completed Successfully")
+    RULES:
+    1️⃣ Child must earn (binary_income > 0 OR binary_eligibility_income > 0) TODAY
+    2️⃣ Receiver determined by placement_id vs sponsor_id
+    3️⃣ Receiver must satisfy DIRECT 1:1 eligibility (as of run_date)
+    4️⃣ ROOT never gets sponsor income
+    5️⃣ sponsor_today_processed = HARD LOCK (no duplicates)
+    6️⃣ Sponsor amount = child (binary + eligibility) only (NO flashout)
+    """
+    print(f"🔄 Running Sponsor Engine for {run_date}")
 
+    stats = run_sponsor_income_batch(run_date)
+
+    print(
+        f"✅ Sponsor income {stats['amount']} credited to {stats['receivers']} "
+        f"receivers ({stats['children']} children)"
+    )
+    print("✅ Sponsor Engine Completed Successfully")
@@ -0,0 +1,93 @@
+# herbalapp/mlm/tree_cache.py
+"""
+Subtree version counters + cached tree HTML fragments + ETags
+
+    Member.tree_version -> bumped for the changed member and EVERY upline
+                           on join / move / delete (tree_events), on
+                           Paid-order BV changes (bv_rollup) and on any
+                           Member.save() that changes a field the tree
+                           screens show (signals.push_member_changes),
+                           in ONE UPDATE inside the same transaction
+
+✅ Fragment cache key = (kind, root, depth, root's tree_version)
+   -> any change below a root gives it a new key, nothing else is touched
+✅ Stored in the default CACHES backend (Redis); old versions simply
+   expire (FRAGMENT_TIMEOUT) -> the cache is NEVER flushed
+✅ Tree JSON endpoints send the version as ETag and answer a matching
+   If-None-Match with 304 (member_etag / not_modified / with_etag)
+"""
+
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from herbalapp.models import Member
+from herbalapp.utils.tree_utils import get_ancestor_chain
+
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+# ----------------------------------------------------------
+# Writers (inside the caller's transaction)
+# ----------------------------------------------------------
+def bump_versions(member_ids):
+    """+1 on tree_version of every given member (ONE UPDATE)."""
+    member_ids = {member_id for member_id in member_ids if member_id is not None}
+    if member_ids:
+        Member.objects.filter(id__in=member_ids).update(tree_version=F("tree_version") + 1)
+
+
+def bump_chain(member_id, chain=None):
+    """Member + its uplines (chain = get_ancestor_chain result, loaded when not given)."""
+    if chain is None:
+        chain = get_ancestor_chain(member_id)
+    bump_versions([member_id] + [ancestor_id for ancestor_id, _ in chain])
+
+
+# ----------------------------------------------------------
+# Readers
+# ----------------------------------------------------------
+def tree_version(member):
+    """Current version of member's subtree (one indexed read)."""
+    return Member.objects.filter(id=member.id).values_list("tree_version", flat=True).first() or 0
+
+
+def fragment_key(kind, member_id, depth, version):
+    return f"tree:{kind}:{member_id}:{depth}:v{version}"
+
+
+def cached_fragment(kind, member, depth, render):
+    """
+    HTML for (kind, member, depth) from the cache, or render() once and
+    store it under the member's current version.
+    """
+    key = fragment_key(kind, member.id, depth, tree_version(member))
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, FRAGMENT_TIMEOUT)
+    return html
+
+
+# ----------------------------------------------------------
+# ETag / 304 for tree JSON endpoints
+# ----------------------------------------------------------
+def member_etag(member, *variant):
+    """
+    ETag from member's subtree version (+ anything else the body
+    depends on, e.g. query string / month).
+    """
+    tag = ":".join(str(part) for part in (member.id, member.tree_version) + variant)
+    return f'"{tag}"'
+
+
+def not_modified(request, etag):
+    """304 response when If-None-Match already holds etag, else None."""
+    return get_conditional_response(request, etag=etag)
+
+
+def with_etag(response, etag):
+    """Attach etag; clients keep the body but revalidate every time."""
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
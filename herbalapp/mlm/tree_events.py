@@ -0,0 +1,85 @@
+# herbalapp/mlm/tree_events.py
+"""
+Tree change hooks (JOIN / MOVE / DELETE / SPONSOR CHANGE)
+
+Every view or helper that changes the placement tree calls ONE of these,
+inside its own transaction.atomic(), so all derived tree data is updated
+in the same transaction as the change itself.
+
+    on_member_joined(member)
+
+    with member_move(member):
+        member.parent = new_parent
+        member.side = new_side
+        member.save(...)
+
+    (a plain member.save() of parent / side, e.g. from the admin, runs
+    the same move hooks through the Member post_save in signals.py)
+
+    with member_remove(member):
+        member.delete()
+
+    member.sponsor = new_sponsor
+    member.save(...)
+    on_sponsor_changed(member)
+"""
+
+from contextlib import contextmanager
+
+from herbalapp.mlm import bv_rollup, euler_index, leg_stats, sponsor_closure, tree_cache
+from herbalapp.models import Member
+from herbalapp.utils.tree_utils import get_ancestor_chain
+
+
+def on_member_joined(member):
+    """New member saved with parent + side."""
+    leg_stats.apply_join(member)
+    euler_index.apply_join(member)
+    sponsor_closure.apply_join(member)
+    tree_cache.bump_chain(member.id)
+
+
+def on_sponsor_changed(member):
+    """member.sponsor changed and saved (placement tree untouched)."""
+    sponsor_closure.apply_sponsor_change(member)
+    tree_cache.bump_versions([member.id])
+
+
+def on_member_moved(member, old_chain, old_side):
+    """
+    member.parent / side changed and saved.
+    old_chain = get_ancestor_chain(member.id) captured BEFORE the save
+    (member_move does this; signals.py for plain admin / form saves).
+    """
+    leg_stats.apply_move(member, old_chain)
+    bv_rollup.apply_move(member, old_chain, old_side)
+    euler_index.apply_move(member)
+    tree_cache.bump_versions(ancestor_id for ancestor_id, _ in old_chain)
+    tree_cache.bump_chain(member.id)
+
+
+@contextmanager
+def member_move(member):
+    """Wrap a parent/side change of an existing member."""
+    old_chain = get_ancestor_chain(member.id)
+    old_side = member.side
+    # the save inside is handled here, not again by the Member post_save
+    member._in_member_move = True
+    try:
+        yield
+    finally:
+        member._in_member_move = False
+    on_member_moved(member, old_chain, old_side)
+
+
+@contextmanager
+def member_remove(member):
+    """Wrap a member delete (counters are adjusted before the row goes)."""
+    chain = get_ancestor_chain(member.id)
+    leg_stats.apply_remove(member, chain)
+    bv_rollup.apply_remove(member, chain)
+    sponsor_closure.apply_remove(member)
+    tree_cache.bump_chain(member.id, chain)
+    child_ids = list(Member.objects.filter(parent_id=member.id).values_list("id", flat=True))
+    yield
+    euler_index.apply_detach(child_ids)
@@ -0,0 +1,275 @@
+# herbalapp/mlm/tree_query.py
+"""
+Whole-downline reads for the tree screens (ONE query)
+
+✅ Every active descendant of a root fetched with ONE recursive CTE
+   (no per-node children query, no lazy m.parent per edge)
+✅ values() projection -> only the columns the payload needs
+✅ Cytoscape nodes / edges JSON produced as a stream of chunks
+   (StreamingHttpResponse, never one huge dict in memory)
+✅ ?format=columnar -> parallel arrays + shared avatar table
+   (columnar_tree, several times smaller, gzip on top)
+✅ Depth-limited binary subtree (bounded_subtree) for lazy tree pages:
+   a few levels + "has more" markers + leg counts, ONE query
+   (rendered markup cached per subtree version: subtree_fragment)
+
+Same rules as the old nested dfs(): children of any side are followed,
+an inactive member hides its whole subtree.
+"""
+
+import json
+
+from django.db.models import Exists, OuterRef
+from django.db.models.expressions import RawSQL
+
+from herbalapp.models import Member
+
+DEFAULT_AVATAR = "/static/img/default-avatar.png"
+
+STREAM_CHUNK = 500
+
+SIDES = ("left", "right")
+SIDE_CODES = {"left": "L", "right": "R"}
+
+# UNION (not UNION ALL) -> a parent cycle cannot loop forever
+SUBTREE_SQL = """
+    WITH RECURSIVE subtree(id) AS (
+        SELECT id FROM {table} WHERE parent_id = %s AND is_active = %s
+        UNION
+        SELECT m.id FROM {table} m
+        JOIN subtree s ON m.parent_id = s.id
+        WHERE m.is_active = %s
+    )
+    SELECT id FROM subtree
+"""
+
+
+def subtree_ids(root):
+    """Subquery of every active descendant id of root (recursive CTE)."""
+    sql = SUBTREE_SQL.format(table=Member._meta.db_table)
+    return RawSQL(sql, (root.id, True, True))
+
+
+def subtree_values(root, *fields):
+    """values() rows of root's active downline (id order), ONE query."""
+    return Member.objects.filter(id__in=subtree_ids(root)).order_by("id").values(*fields)
+
+
+def avatar_url(name):
+    """Avatar URL from the stored file name (no model instance needed)."""
+    return Member._meta.get_field("avatar").storage.url(name) if name else DEFAULT_AVATAR
+
+
+def node_json(auto_id, name, bv, avatar):
+    return json.dumps({
+        "data": {
+            "id": auto_id,
+            "name": name,
+            "bv": str(bv or 0),
+            "avatar": avatar_url(avatar),
+        }
+    })
+
+
+def stream_tree_json(root):
+    """
+    Yields {"nodes": [...], "edges": [...]} in chunks:
+    nodes while the rows stream in, then the (small) edge pairs.
+    """
+    rows = subtree_values(root, "auto_id", "name", "bv", "avatar", "parent__auto_id")
+
+    yield '{"nodes": [' + node_json(root.auto_id, root.name, root.bv, root.avatar.name)
+
+    edges = []
+    chunk = []
+    for row in rows.iterator(chunk_size=2000):
+        chunk.append(node_json(row["auto_id"], row["name"], row["bv"], row["avatar"]))
+        edges.append((row["parent__auto_id"], row["auto_id"]))
+        if len(chunk) >= STREAM_CHUNK:
+            yield ", " + ", ".join(chunk)
+            chunk = []
+    if chunk:
+        yield ", " + ", ".join(chunk)
+
+    yield '], "edges": ['
+    for start in range(0, len(edges), STREAM_CHUNK):
+        yield (", " if start else "") + ", ".join(
+            json.dumps({"data": {"source": source, "target": target}})
+            for source, target in edges[start:start + STREAM_CHUNK]
+        )
+    yield "]}"
+
+
+def columnar_tree(root):
+    """
+    ?format=columnar payload of the same downline (ONE query):
+    parallel arrays instead of one {"data": {...}} dict per node.
+
+        ids / names / bv      -> one entry per node (root first)
+        parents               -> index of the parent in ids (-1 = root)
+        sides                 -> "L" / "R" / "" per node
+        avatars + avatar      -> shared URL table + index per node
+    """
+    rows = subtree_values(root, "auto_id", "name", "bv", "avatar", "side", "parent__auto_id")
+
+    ids = [root.auto_id]
+    names = [root.name]
+    bv = [float(root.bv or 0)]
+    sides = [""]
+    parent_ids = [None]
+    avatar_names = [root.avatar.name]
+
+    for row in rows.iterator(chunk_size=2000):
+        ids.append(row["auto_id"])
+        names.append(row["name"])
+        bv.append(float(row["bv"] or 0))
+        sides.append(SIDE_CODES.get(row["side"], ""))
+        parent_ids.append(row["parent__auto_id"])
+        avatar_names.append(row["avatar"])
+
+    position = {auto_id: i for i, auto_id in enumerate(ids)}
+    avatars = []
+    avatar_index = {}
+    avatar = []
+    for name in avatar_names:
+        url = avatar_url(name)
+        if url not in avatar_index:
+            avatar_index[url] = len(avatars)
+            avatars.append(url)
+        avatar.append(avatar_index[url])
+
+    return {
+        "format": "columnar",
+        "ids": ids,
+        "names": names,
+        "parents": [position.get(parent_id, -1) for parent_id in parent_ids],
+        "sides": sides,
+        "bv": bv,
+        "avatars": avatars,
+        "avatar": avatar,
+    }
+
+
+# ==========================================================
+# Depth-limited subtree (lazy tree pages / tree-api)
+# ==========================================================
+TREE_API_DEPTH = 3
+TREE_API_MAX_DEPTH = 6
+
+BOUNDED_SQL = """
+    WITH RECURSIVE subtree(id, lvl) AS (
+        SELECT id, 0 FROM {table} WHERE id = %s
+        UNION
+        SELECT m.id, s.lvl + 1 FROM {table} m
+        JOIN subtree s ON m.parent_id = s.id
+        WHERE s.lvl < %s AND m.side IN (%s, %s)
+    )
+    SELECT id FROM subtree
+"""
+
+
+def clamp_depth(value, default=TREE_API_DEPTH):
+    """?depth= query value -> 0..TREE_API_MAX_DEPTH."""
+    try:
+        depth = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(0, min(depth, TREE_API_MAX_DEPTH))
+
+
+def bounded_subtree(root, depth=TREE_API_DEPTH):
+    """
+    root + its binary downline down to `depth` levels, ONE query.
+
+    Flat list (root first, parents before children) of:
+        id, name, avatar, parent, side, level,
+        has_avatar                -> a photo is uploaded (avatar is then
+                                     not the DEFAULT_AVATAR placeholder)
+        left_count, right_count   -> whole-leg sizes (MemberLegStats)
+        has_left, has_right       -> a child exists on that side
+        has_more                  -> children exist below the depth limit
+    """
+    sql = BOUNDED_SQL.format(table=Member._meta.db_table)
+    children = Member.objects.filter(parent_id=OuterRef("id"))
+    rows = (
+        Member.objects.filter(id__in=RawSQL(sql, (root.id, depth) + SIDES))
+        .annotate(
+            has_left=Exists(children.filter(side="left")),
+            has_right=Exists(children.filter(side="right")),
+        )
+        .order_by("id")
+        .values(
+            "id", "auto_id", "name", "avatar", "side", "parent_id",
+            "leg_stats__left_total", "leg_stats__right_total",
+            "has_left", "has_right",
+        )
+    )
+    rows = {row["id"]: row for row in rows}
+
+    # first child per side (same as Member.left_child / right_child)
+    slots = {}
+    for row in rows.values():
+        if row["id"] != root.id and row["parent_id"] in rows:
+            slots.setdefault((row["parent_id"], row["side"]), row["id"])
+
+    nodes = []
+    queue = [(root.id, 0)]
+    while queue:
+        member_id, level = queue.pop(0)
+        row = rows[member_id]
+        parent = rows.get(row["parent_id"]) if member_id != root.id else None
+        nodes.append({
+            "id": row["auto_id"],
+            "name": row["name"],
+            "avatar": avatar_url(row["avatar"]),
+            "has_avatar": bool(row["avatar"]),
+            "parent": parent["auto_id"] if parent else None,
+            "side": row["side"] or "",
+            "level": level,
+            "left_count": row["leg_stats__left_total"] or 0,
+            "right_count": row["leg_stats__right_total"] or 0,
+            "has_left": row["has_left"],
+            "has_right": row["has_right"],
+            "has_more": level >= depth and (row["has_left"] or row["has_right"]),
+        })
+        for side in SIDES:
+            child_id = slots.get((member_id, side))
+            if child_id is not None:
+                queue.append((child_id, level + 1))
+    return nodes
+
+
+def nest_subtree(nodes):
+    """
+    Flat bounded_subtree() list -> nested root dict for
+    tree_node_dynamic.html (auto_id / left_child / right_child).
+    """
+    if not nodes:
+        return None
+
+    by_id = {}
+    for node in nodes:
+        by_id[node["id"]] = dict(node, auto_id=node["id"], left_child=None, right_child=None)
+
+    for node in nodes[1:]:
+        parent = by_id.get(node["parent"])
+        if parent is not None:
+            parent[f"{node['side']}_child"] = by_id[node["id"]]
+    return by_id[nodes[0]["id"]]
+
+
+def subtree_fragment(root, depth=TREE_API_DEPTH):
+    """
+    tree_node_dynamic.html markup of bounded_subtree(root, depth),
+    cached per (root, depth, root's tree_version).
+    """
+    from django.template.loader import render_to_string
+    from herbalapp.mlm.tree_cache import cached_fragment
+
+    return cached_fragment(
+        "node", root, depth,
+        lambda: render_to_string(
+            "herbalapp/tree_node_dynamic.html",
+            {"member": nest_subtree(bounded_subtree(root, depth))},
+        ),
+    )
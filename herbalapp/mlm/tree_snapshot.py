@@ -0,0 +1,326 @@
+# herbalapp/mlm/tree_snapshot.py
+"""
+In-memory binary tree snapshot (ENGINE FAST PATH)
+
+✅ ONE query loads every member's placement row
+✅ Left/Right leg totals for any number of dates in ONE post-order pass
+✅ No per-node queries, no Python recursion limit
+
+Counting rules are kept identical to
+herbalapp.mlm.final_master_engine.count_all_descendants:
+- a node is counted for a date only if joined_date <= that date
+- a node that is not yet joined hides its whole subtree for that date
+- is_active is NOT used for counting (same as the recursive helper)
+"""
+
+from herbalapp.models import Member
+
+SIDES = ("left", "right")
+
+
+class TreeSnapshot:
+    """
+    Flat, index-based copy of the placement tree.
+
+    rows: iterable of (id, parent_id, side, joined_date, is_active)
+    """
+
+    def __init__(self, rows):
+        self.ids = []
+        self.parent_ids = []
+        self.sides = []
+        self.joined_dates = []
+        self.is_active = []
+
+        for member_id, parent_id, side, joined_date, is_active in rows:
+            self.ids.append(member_id)
+            self.parent_ids.append(parent_id)
+            self.sides.append(side)
+            self.joined_dates.append(joined_date)
+            self.is_active.append(bool(is_active))
+
+        self.index = {member_id: i for i, member_id in enumerate(self.ids)}
+
+        # parent position per node (-1 = root / unknown parent)
+        self.parent_pos = [
+            self.index.get(parent_id, -1) if parent_id is not None else -1
+            for parent_id in self.parent_ids
+        ]
+
+        self._order = None
+        self._as_of_index = None
+
+    # ------------------------------------------------------
+    # Loader (single query)
+    # ------------------------------------------------------
+    @classmethod
+    def load(cls):
+        rows = (
+            Member.objects
+            .order_by()
+            .values_list("id", "parent_id", "side", "joined_date", "is_active")
+        )
+        return cls(rows.iterator(chunk_size=10000))
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ------------------------------------------------------
+    # Children-before-parent order (reverse BFS)
+    # ------------------------------------------------------
+    def post_order(self):
+        """
+        Positions ordered so every child comes before its parent.
+        Nodes caught in a parent cycle are never reached (same as
+        the recursive helper, which would never terminate for them).
+        """
+        if self._order is not None:
+            return self._order
+
+        children = [[] for _ in self.ids]
+        roots = []
+        for pos, parent_pos in enumerate(self.parent_pos):
+            if parent_pos < 0:
+                roots.append(pos)
+            else:
+                children[parent_pos].append(pos)
+
+        bfs = list(roots)
+        head = 0
+        while head < len(bfs):
+            bfs.extend(children[bfs[head]])
+            head += 1
+
+        bfs.reverse()
+        self._order = bfs
+        return self._order
+
+    # ------------------------------------------------------
+    # As-of-date index (Euler tour + merge-sort tree)
+    # ------------------------------------------------------
+    def as_of_index(self):
+        """AsOfLegIndex over this snapshot (built once, then reused)."""
+        if self._as_of_index is None:
+            from herbalapp.mlm.asof_index import AsOfLegIndex
+            self._as_of_index = AsOfLegIndex(self)
+        return self._as_of_index
+
+    # ------------------------------------------------------
+    # Leg totals for one or more dates (single pass)
+    # ------------------------------------------------------
+    def leg_totals(self, *as_of_dates, active_only=False):
+        """
+        Returns {member_id: ((left, right), ...)} with one (left, right)
+        pair per requested date, in the same order as as_of_dates.
+
+        as_of_date=None means "no date filter" (lifetime totals).
+        active_only=True counts only is_active members (their inactive
+        uplines still pass the count through, like MemberLegStats).
+        """
+        n = len(self.ids)
+        k = len(as_of_dates)
+
+        left = [[0] * n for _ in range(k)]
+        right = [[0] * n for _ in range(k)]
+
+        joined = self.joined_dates
+        sides = self.sides
+        parent_pos = self.parent_pos
+        active = self.is_active
+
+        for pos in self.post_order():
+            parent = parent_pos[pos]
+            if parent < 0:
+                continue
+
+            side = sides[pos]
+            if side == "left":
+                target = left
+            elif side == "right":
+                target = right
+            else:
+                continue
+
+            joined_date = joined[pos]
+            for d, as_of in enumerate(as_of_dates):
+                if as_of is not None and (joined_date is None or joined_date > as_of):
+                    continue
+                own = 0 if (active_only and not active[pos]) else 1
+                target[d][parent] += own + left[d][pos] + right[d][pos]
+
+        return {
+            member_id: tuple((left[d][pos], right[d][pos]) for d in range(k))
+            for pos, member_id in enumerate(self.ids)
+        }
+
+    # ------------------------------------------------------
+    # Downline BV rollup (single pass)
+    # ------------------------------------------------------
+    def bv_rollup(self, own_bv):
+        """
+        BV for every member at once (no date / is_active filter):
+
+        left_bv / right_bv         -> BV of all descendants whose OWN side
+                                      is "left" / "right" (Member.calculate_bv)
+        left_leg_bv / right_leg_bv -> BV of the whole left / right leg
+                                      subtree (Member.get_bv_counts)
+
+        own_bv: {member_id: bv}
+        Returns {member_id: (left_bv, right_bv, left_leg_bv, right_leg_bv)}
+        """
+        n = len(self.ids)
+        own = [own_bv.get(member_id, 0) for member_id in self.ids]
+        sides = self.sides
+
+        sub_left = [own[pos] if sides[pos] == "left" else 0 for pos in range(n)]
+        sub_right = [own[pos] if sides[pos] == "right" else 0 for pos in range(n)]
+        sub_total = list(own)
+        leg_left = [0] * n
+        leg_right = [0] * n
+
+        parent_pos = self.parent_pos
+        for pos in self.post_order():
+            parent = parent_pos[pos]
+            if parent < 0:
+                continue
+            sub_left[parent] += sub_left[pos]
+            sub_right[parent] += sub_right[pos]
+            sub_total[parent] += sub_total[pos]
+            if sides[pos] == "left":
+                leg_left[parent] += sub_total[pos]
+            elif sides[pos] == "right":
+                leg_right[parent] += sub_total[pos]
+
+        return {
+            member_id: (
+                sub_left[pos] - (own[pos] if sides[pos] == "left" else 0),
+                sub_right[pos] - (own[pos] if sides[pos] == "right" else 0),
+                leg_left[pos],
+                leg_right[pos],
+            )
+            for pos, member_id in enumerate(self.ids)
+        }
+
+    def side_bv_totals(self, own_bv):
+        """{member_id: (left_bv, right_bv)} -> Member.calculate_bv numbers"""
+        return {
+            member_id: rollup[:2]
+            for member_id, rollup in self.bv_rollup(own_bv).items()
+        }
+
+# ==========================================================
+# End-of-day leg totals (DailyLegSnapshot)
+# ==========================================================
+def load_daily_leg_totals(as_of_date, tree_stamp):
+    """
+    {member_id: (left, right)} stored for as_of_date, or None when that
+    day was never snapshotted (first run / older data) or the tree as of
+    that day has changed since (stored stamp != tree_stamp).
+    """
+    from herbalapp.models import DailyLegSnapshot, DailyLegSnapshotStamp
+
+    stored_stamp = DailyLegSnapshotStamp.objects.filter(date=as_of_date).values_list(
+        "tree_stamp", flat=True
+    ).first()
+    if stored_stamp != tree_stamp:
+        return None
+
+    rows = DailyLegSnapshot.objects.filter(date=as_of_date).values_list(
+        "member_id", "left_total", "right_total"
+    )
+    return {member_id: (left, right) for member_id, left, right in rows.iterator(chunk_size=10000)}
+
+
+def save_daily_leg_totals(as_of_date, totals, tree_stamp, batch_size=5000):
+    """
+    Replace the stored totals (and tree stamp) for as_of_date.
+    totals: {member_id: (left, right)}; zero rows are skipped.
+    """
+    from django.db import transaction
+    from herbalapp.models import DailyLegSnapshot, DailyLegSnapshotStamp
+    from herbalapp.mlm.engine_metrics import record_rows
+
+    rows = [
+        DailyLegSnapshot(member_id=member_id, date=as_of_date, left_total=left, right_total=right)
+        for member_id, (left, right) in totals.items()
+        if left or right
+    ]
+
+    with transaction.atomic():
+        DailyLegSnapshot.objects.filter(date=as_of_date).delete()
+        DailyLegSnapshot.objects.bulk_create(rows, batch_size=batch_size)
+        DailyLegSnapshotStamp.objects.update_or_create(
+            date=as_of_date, defaults={"tree_stamp": tree_stamp}
+        )
+    record_rows(len(rows))
+    return len(rows)
+
+
+def engine_leg_totals(run_date, snapshot=None, store_yesterday=False, save=True):
+    """
+    Engine input: {member_id: ((left_today, right_today), (left_yday, right_yday))}
+
+    ✅ Yesterday comes from DailyLegSnapshot (one query) when available
+       AND the tree as of yesterday is unchanged since it was stored
+    ✅ Otherwise both dates come from the same as-of index
+       (store_yesterday=True also stores them, for distributed shards)
+    ✅ Today's totals are stored for tomorrow's run (save=False: read only)
+
+    Semantics: "yesterday" is always yesterday's counts on TODAY's tree.
+    A move, delete, back-dated / late placement or admin parent / side /
+    joined_date edit of a member joined on or before yesterday changes the
+    tree stamp, so yesterday is recomputed and the change gives a zero
+    delta instead of being paid as today's joins.
+    """
+    from datetime import timedelta
+
+    snapshot = snapshot or TreeSnapshot.load()
+    index = snapshot.as_of_index()
+    yesterday = run_date - timedelta(days=1)
+    yesterday_stamp = index.tree_stamp(yesterday)
+
+    stored_yday = load_daily_leg_totals(yesterday, yesterday_stamp)
+    if stored_yday is None:
+        totals = index.leg_totals(run_date, yesterday)
+        if store_yesterday and save:
+            save_daily_leg_totals(
+                yesterday, {member_id: pairs[1] for member_id, pairs in totals.items()}, yesterday_stamp
+            )
+    else:
+        today = index.leg_totals(run_date)
+        totals = {
+            member_id: (pairs[0], stored_yday.get(member_id, (0, 0)))
+            for member_id, pairs in today.items()
+        }
+
+    if save:
+        save_daily_leg_totals(
+            run_date, {member_id: pairs[0] for member_id, pairs in totals.items()}, index.tree_stamp(run_date)
+        )
+    return totals
+
+
+def load_engine_leg_totals(run_date, first_id, last_id):
+    """
+    Engine input for ONE shard (member ids first_id..last_id), read back from
+    the DailyLegSnapshot rows stored by the coordinator (missing row = 0, 0).
+    """
+    from datetime import timedelta
+    from herbalapp.models import DailyLegSnapshot
+
+    yesterday = run_date - timedelta(days=1)
+    rows = DailyLegSnapshot.objects.filter(
+        date__in=[run_date, yesterday],
+        member_id__gte=first_id,
+        member_id__lte=last_id,
+    ).values_list("member_id", "date", "left_total", "right_total")
+
+    today = {}
+    yday = {}
+    for member_id, day, left, right in rows.iterator(chunk_size=10000):
+        (today if day == run_date else yday)[member_id] = (left, right)
+
+    return {
+        member_id: (today.get(member_id, (0, 0)), yday.get(member_id, (0, 0)))
+        for member_id in set(today) | set(yday)
+    }
@@ -1,9 +1,17 @@
 # herbalapp/mlm_rank_engine.py
 
+from bisect import bisect_right
+from itertools import accumulate
+
 from django.db import transaction
 from django.utils import timezone
 from herbalapp.rank_rules import RANK_SLABS
-from herbalapp.models import RankReward
+from herbalapp.models import Member, RankReward
+
+BULK_BATCH_SIZE = 1000
+
+# Cumulative matched BV needed to hold rank level k (level 0 = no rank)
+RANK_CUMULATIVE_BV = [0] + list(accumulate(slab[0] for slab in RANK_SLABS))
 
 
 def get_next_rank(level):
@@ -65,3 +73,110 @@ def process_rank_upgrade(member):
 
     return upgraded
 
+
+# ==========================================================
+# BATCH RANK UPGRADE (ENGINE)
+# ==========================================================
+def load_side_bv_totals():
+    """
+    {member_id: (left_bv, right_bv)} for every member with a MemberBV row
+    (same numbers as Member.calculate_bv), ONE values_list.
+    Missing row = no downline BV -> callers use (0, 0).
+    Repair a damaged table with rebuild_member_bv().
+    """
+    from herbalapp.models import MemberBV
+
+    rows = MemberBV.objects.order_by().values_list("member_id", "left_bv", "right_bv")
+    return {member_id: (left, right) for member_id, left, right in rows.iterator(chunk_size=10000)}
+
+
+def rank_level_for(matched_bv, level, checkpoint_bv):
+    """
+    Rank level reached from (level, checkpoint_bv) with matched_bv
+    (same result as looping process_rank_upgrade slab by slab).
+    """
+    if level < 0 or level >= len(RANK_SLABS):
+        return level
+
+    # progress is measured from the checkpoint -> shift onto the cumulative scale
+    reached = bisect_right(RANK_CUMULATIVE_BV, matched_bv - checkpoint_bv + RANK_CUMULATIVE_BV[level]) - 1
+    return max(level, min(reached, len(RANK_SLABS)))
+
+
+def process_rank_upgrades(run_date, members=None, bv_totals=None):
+    """
+    ✅ Set-based process_rank_upgrade() for many members
+
+    members   : Member objects (engine rank candidates); default = every
+                active binary-eligible member joined on/before run_date
+    bv_totals : load_side_bv_totals() result (loaded once when not given)
+
+    - matched BV from the rolled-up BV table, slabs crossed via bisect
+    - missing RankReward rows -> ONE bulk_create
+    - rank fields -> ONE bulk_update
+    Returns the list of upgraded members.
+    """
+    if members is None:
+        members = list(
+            Member.objects.filter(
+                is_active=True,
+                binary_eligible=True,
+                joined_date__lte=run_date,
+            ).only("id", "current_rank", "rank_level", "rank_checkpoint_bv", "rank_assigned_at")
+        )
+    if not members:
+        return []
+
+    if bv_totals is None:
+        bv_totals = load_side_bv_totals()
+
+    now = timezone.now()
+    upgraded = []
+    rewards = []
+
+    for member in members:
+        left_bv, right_bv = bv_totals.get(member.id, (0, 0))
+        matched_bv = int(min(left_bv, right_bv))
+
+        new_level = rank_level_for(matched_bv, member.rank_level, member.rank_checkpoint_bv)
+        if new_level == member.rank_level:
+            continue
+
+        for required_bv, title, monthly, months in RANK_SLABS[member.rank_level:new_level]:
+            rewards.append(RankReward(
+                member_id=member.id,
+                rank_title=title,
+                left_bv_snapshot=int(left_bv),
+                right_bv_snapshot=int(right_bv),
+                monthly_income=monthly,
+                duration_months=months,
+                start_date=now.date(),
+            ))
+            member.rank_checkpoint_bv += required_bv
+
+        member.current_rank = RANK_SLABS[new_level - 1][1]
+        member.rank_level = new_level
+        member.rank_assigned_at = now
+        upgraded.append(member)
+
+    if not upgraded:
+        return []
+
+    with transaction.atomic():
+        # ✅ Avoid duplicates (same rule as get_or_create per rank title)
+        existing = set(
+            RankReward.objects.filter(
+                member_id__in=[m.id for m in upgraded]
+            ).values_list("member_id", "rank_title")
+        )
+        RankReward.objects.bulk_create(
+            [r for r in rewards if (r.member_id, r.rank_title) not in existing],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        Member.objects.bulk_update(
+            upgraded,
+            ["current_rank", "rank_level", "rank_checkpoint_bv", "rank_assigned_at"],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+    return upgraded
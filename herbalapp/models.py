@@ -2,6 +2,7 @@
 from django.db import models
 from django.utils import timezone
 from decimal import Decimal
+from collections import deque
 from django.core.exceptions import ValidationError
 
 class EngineLock(models.Model):
@@ -10,6 +11,8 @@ class EngineLock(models.Model):
 
     ✅ Prevents parallel execution (Celery-safe)
     ✅ Tracks start/finish timestamps
+    ✅ Renewable lease (heartbeat_at) + progress for long runs
+    ✅ Chunk checkpoint (checkpoint_phase / checkpoint_member_id) for resume
     ✅ Supports "today rerun" logic from engine_lock.py using finished_at
     """
 
@@ -38,6 +41,24 @@ class EngineLock(models.Model):
         help_text="Engine completion timestamp"
     )
 
+    # ✅ Lease: running engine renews this; stale = no heartbeat for LEASE_TIMEOUT
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Last heartbeat from the running engine"
+    )
+
+    # ✅ Progress of the current / last run (members done / total)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+
+    # ✅ Distributed run: [first_id, last_id] of every shard already counted in progress_done
+    shards_done = models.JSONField(default=list, blank=True)
+
+    # ✅ Checkpoint for --resume (phase + last member id committed in binary phase)
+    checkpoint_phase = models.CharField(max_length=20, blank=True, default="")
+    checkpoint_member_id = models.BigIntegerField(null=True, blank=True)
+
     class Meta:
         db_table = "engine_lock"
         verbose_name = "Daily Engine Lock"
@@ -47,7 +68,8 @@ class EngineLock(models.Model):
         """Call when engine starts executing."""
         self.is_running = True
         self.started_at = timezone.now()
-        self.save(update_fields=["is_running", "started_at"])
+        self.heartbeat_at = self.started_at
+        self.save(update_fields=["is_running", "started_at", "heartbeat_at"])
 
     def mark_finished(self):
         """Call ONLY when engine completed successfully."""
@@ -61,6 +83,59 @@ class EngineLock(models.Model):
         return f"EngineLock({self.run_date} → {status})"
 
 
+# ==========================================================
+# ENGINE RUN METRICS (one row per run_with_lock execution)
+# ==========================================================
+class EngineRun(models.Model):
+    """
+    Per-run performance record for the MLM daily engine.
+
+    ✅ Linked to the EngineLock of that run_date
+    ✅ phases = {"binary": {"seconds": .., "queries": .., "db_ms": ..}, ...}
+    ✅ Totals kept as columns for quick admin sorting / regressions
+    """
+
+    STATUS_CHOICES = [
+        ("running", "Running"),
+        ("success", "Success"),
+        ("failed", "Failed"),
+    ]
+
+    # SET_NULL: force_run_daily deletes the day's lock, the history stays
+    lock = models.ForeignKey(
+        EngineLock,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="runs"
+    )
+    run_date = models.DateField(db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="running")
+
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    total_seconds = models.FloatField(default=0)
+    query_count = models.PositiveIntegerField(default=0)
+    db_time_ms = models.FloatField(default=0)
+
+    members_processed = models.PositiveIntegerField(default=0)
+    rows_written = models.PositiveIntegerField(default=0)
+    peak_rss_kb = models.PositiveBigIntegerField(null=True, blank=True)
+
+    phases = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        db_table = "engine_run"
+        ordering = ["-started_at"]
+        verbose_name = "Engine Run"
+        verbose_name_plural = "Engine Runs"
+
+    def __str__(self):
+        return f"EngineRun({self.run_date} → {self.status}, {self.total_seconds:.1f}s)"
+
+
 # ==========================================================
 # AUTO COUNTER FOR ROCKY IDs
 # ==========================================================
@@ -94,6 +169,9 @@ class Member(models.Model):
     class Meta:
         db_table = "herbalapp_member"
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["tin"], name="member_tin_idx"),
+        ]
 
     # ==========================================================
     # PLACEMENT ELIGIBILITY CHECK (1:2 or 2:1)
@@ -185,6 +263,23 @@ class Member(models.Model):
         related_name='placement_downline'
     )
 
+    # =====================================================
+    # EULER-TOUR INDEX (PLACEMENT TREE, see mlm/euler_index.py)
+    # descendants of X = tin BETWEEN X.tin AND X.tout
+    # =====================================================
+    tin = models.BigIntegerField(null=True, blank=True)
+    tout = models.BigIntegerField(null=True, blank=True)
+    depth = models.IntegerField(null=True, blank=True)
+    # latest joined_date on the path from the interval root (visible on D <=> path_joined <= D)
+    path_joined = models.DateField(null=True, blank=True)
+
+    # =====================================================
+    # SUBTREE VERSION (see mlm/tree_cache.py)
+    # bumped for the member + every upline on join / move / delete
+    # and Paid-order BV changes (ETag of the tree JSON endpoints)
+    # =====================================================
+    tree_version = models.PositiveBigIntegerField(default=0)
+
     # -------------------------
     # TIMESTAMP
     # -------------------------
@@ -268,6 +363,8 @@ class Member(models.Model):
     def save(self, *args, **kwargs):
         from django.db import transaction
 
+        adding = self._state.adding
+
         # =========================
         # AUTO ID GENERATOR (RockCounter)
         # =========================
@@ -317,7 +414,12 @@ class Member(models.Model):
         # =========================
         # FINAL SAVE AFTER AUTO FIELDS
         # =========================
-        super().save(update_fields=["placement", "sponsor", "side"])
+        # still part of the INSERT -> not a member edit for signals.py
+        self._auto_fields_save = adding
+        try:
+            super().save(update_fields=["placement", "sponsor", "side"])
+        finally:
+            self._auto_fields_save = False
 
     # ==========================================================
     # HELPER METHODS (TREE SAFE)
@@ -335,22 +437,17 @@ class Member(models.Model):
     # REPURCHASE BV HELPERS
     # ==========================================================
     def last_month_bv(self):
-        from datetime import timedelta
-        today = timezone.now()
-        first_day_this_month = today.replace(day=1)
-        last_day_last_month = first_day_this_month - timedelta(days=1)
-        first_day_last_month = last_day_last_month.replace(day=1)
-
-        repurchase_orders = Order.objects.filter(
-            member=self,
-            status="Paid",
-            created_at__date__gte=first_day_last_month,
-            created_at__date__lte=last_day_last_month,
-        )
-        total_bv = sum((o.product.bv_value * o.quantity) for o in repurchase_orders) if repurchase_orders else Decimal('0.00')
-        return Decimal(total_bv)
+        """Own Paid-order BV of last calendar month (one MemberMonthlyBV row)."""
+        from herbalapp.mlm.bv_rollup import get_month_bv, previous_month
+        return get_month_bv(self, previous_month())["self_bv"]
 
     def calculate_bv(self):
+        """Lifetime BV dict (self/left/right/total/matched) from MemberBV."""
+        from herbalapp.mlm.bv_rollup import get_member_bv
+        return get_member_bv(self)
+
+    def walk_bv(self):
+        """calculate_bv() by walking the whole downline (reference / repair check)."""
         visited = set()
         queue = deque([self])
         left_bv = Decimal('0.00')
@@ -390,10 +487,16 @@ class Member(models.Model):
         }
 
     def get_bv_counts(self):
+        """(left_leg_bv, right_leg_bv) from MemberBV."""
+        from herbalapp.mlm.bv_rollup import get_leg_bv
+        return get_leg_bv(self)
+
+    def walk_leg_bv(self):
+        """get_bv_counts() by walking both legs (reference / repair check)."""
         def resolve_bv(root_member):
             if not root_member:
                 return Decimal('0.00')
-            data = root_member.calculate_bv()
+            data = root_member.walk_bv()
             return Decimal(data.get("self_bv", Decimal('0.00'))) + Decimal(data.get("left_bv", Decimal('0.00'))) + Decimal(data.get("right_bv", Decimal('0.00')))
         left_bv = resolve_bv(self.left_child())
         right_bv = resolve_bv(self.right_child())
@@ -413,6 +516,213 @@ class Member(models.Model):
         self.rank_assigned_at = timezone.now()
         self.save(update_fields=["current_rank", "salary", "rank_reward", "rank_assigned_at"])
 
+
+# ==========================================================
+# MEMBER LEG STATS (INCREMENTAL SUBTREE COUNTERS)
+# ==========================================================
+class MemberLegStats(models.Model):
+    """
+    Lifetime left/right leg sizes per member.
+
+    ✅ Updated in the SAME transaction as every join / move / delete
+       (see herbalapp.mlm.tree_events)
+    ✅ O(1) reads for tree pages and APIs
+    ✅ Rebuild anytime: python manage.py rebuild_leg_stats
+    """
+
+    member = models.OneToOneField(
+        Member,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="leg_stats"
+    )
+
+    left_total = models.IntegerField(default=0)
+    right_total = models.IntegerField(default=0)
+    left_active = models.IntegerField(default=0)
+    right_active = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "herbalapp_member_leg_stats"
+        verbose_name = "Member Leg Stats"
+        verbose_name_plural = "Member Leg Stats"
+
+    def __str__(self):
+        return f"{self.member_id}: L={self.left_total} R={self.right_total}"
+
+
+# ==========================================================
+# DAILY LEG SNAPSHOT (END-OF-DAY LEG TOTALS)
+# ==========================================================
+class DailyLegSnapshot(models.Model):
+    """
+    Member's left/right leg totals as of a run date (written by the engine).
+
+    ✅ Next day's run reads "yesterday" totals with ONE query
+    ✅ Only non-zero rows are stored (missing row = 0 / 0)
+    """
+
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name="leg_snapshots")
+    date = models.DateField()
+
+    left_total = models.IntegerField(default=0)
+    right_total = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "herbalapp_daily_leg_snapshot"
+        ordering = ["-date", "member"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["member", "date"],
+                name="unique_member_date_leg_snapshot"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["date"], name="leg_snapshot_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.member_id} on {self.date}: L={self.left_total} R={self.right_total}"
+
+
+class DailyLegSnapshotStamp(models.Model):
+    """
+    Fingerprint of the placement tree behind the DailyLegSnapshot rows of a date.
+
+    ✅ Hash of (id, parent, side, joined_date) of every member joined on or
+       before that date (AsOfLegIndex.tree_stamp)
+    ✅ Stored rows are reused only while the stamp still matches the tree
+    """
+
+    date = models.DateField(unique=True)
+    tree_stamp = models.CharField(max_length=40)
+    created_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "herbalapp_daily_leg_snapshot_stamp"
+        ordering = ["-date"]
+
+    def __str__(self):
+        return f"{self.date}: {self.tree_stamp}"
+
+
+# ==========================================================
+# MEMBER BV ROLLUP (LIFETIME PAID-ORDER BV)
+# ==========================================================
+class MemberBV(models.Model):
+    """
+    Lifetime BV per member, rolled up the placement tree.
+
+    ✅ self_bv             -> member's own Paid orders
+    ✅ left_bv / right_bv  -> downline BV by each descendant's OWN side
+                              (same numbers as Member.calculate_bv walk)
+    ✅ left_leg_bv / right_leg_bv -> whole left / right leg subtree
+                              (same numbers as get_bv_counts walk)
+    ✅ Rebuild anytime: python manage.py rebuild_member_bv
+    """
+
+    member = models.OneToOneField(
+        Member,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="bv_stats"
+    )
+
+    self_bv = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    left_bv = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    right_bv = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    left_leg_bv = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    right_leg_bv = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "herbalapp_member_bv"
+        verbose_name = "Member BV"
+        verbose_name_plural = "Member BV"
+
+    @property
+    def matched_bv(self):
+        return min(self.left_bv, self.right_bv)
+
+    def __str__(self):
+        return f"{self.member_id}: L={self.left_bv} R={self.right_bv}"
+
+
+# ==========================================================
+# MEMBER MONTHLY BV (PAID-ORDER BV PER CALENDAR MONTH)
+# ==========================================================
+class MemberMonthlyBV(models.Model):
+    """
+    Paid-order BV per member per month (month = first day, local time).
+
+    ✅ self_bv            -> member's own Paid orders created that month
+    ✅ left_bv / right_bv -> downline BV by each descendant's OWN side
+                             (same meaning as MemberBV.left_bv / right_bv)
+    ✅ Kept current on order changes (herbalapp.signals)
+    ✅ Fill / repair: python manage.py compact_monthly_bv
+    ✅ Missing row = no BV that month
+    """
+
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name="monthly_bv")
+    month = models.DateField()
+
+    self_bv = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    left_bv = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    right_bv = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        db_table = "herbalapp_member_monthly_bv"
+        ordering = ["-month", "member"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["member", "month"],
+                name="unique_member_month_bv"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["month"], name="monthly_bv_month_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.member_id} {self.month:%Y-%m}: self={self.self_bv} L={self.left_bv} R={self.right_bv}"
+
+
+# ==========================================================
+# SPONSOR TREE CLOSURE (GENEALOGY)
+# ==========================================================
+class SponsorClosure(models.Model):
+    """
+    One row per (sponsor upline, sponsored downline) pair of the SPONSOR tree.
+
+    ✅ level 0 -> the member itself, 1 -> directly sponsored, 2 -> their
+       sponsored members, ...
+    ✅ "my team up to level N" / level-wise counts -> ONE indexed query
+    ✅ Kept current on join, sponsor change and delete (tree_events)
+    ✅ Fill / repair: python manage.py rebuild_sponsor_closure
+    """
+
+    ancestor = models.ForeignKey(Member, on_delete=models.CASCADE, related_name="sponsor_descendants")
+    descendant = models.ForeignKey(Member, on_delete=models.CASCADE, related_name="sponsor_ancestors")
+    level = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = "herbalapp_sponsor_closure"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ancestor", "descendant"],
+                name="unique_sponsor_closure_pair"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["ancestor", "level"], name="sponsor_closure_level_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} (L{self.level})"
+
 # ==========================================================
 # PAYMENT MODEL
 # ==========================================================
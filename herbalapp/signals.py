@@ -1,10 +1,18 @@
 # ==========================================================
 # 1) herbalapp/signals.py  ✅ STOP auto-trigger on member create
 # ==========================================================
-from django.db.models.signals import post_save
+from decimal import Decimal
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from herbalapp.models import Member
+from herbalapp.models import Member, Order
 from herbalapp.models import RankReward
+from herbalapp.mlm.bv_rollup import apply_order_bv, month_start
+from herbalapp.mlm import leg_stats
+from herbalapp.mlm.euler_index import refresh_path_joined
+from herbalapp.mlm.tree_cache import bump_chain, tree_version
+from herbalapp.mlm.tree_events import on_member_moved
+from herbalapp.utils.tree_utils import get_ancestor_chain
 
 def run_monthly_rank_payout():
     for rr in RankReward.objects.filter(active=True):
@@ -23,3 +31,154 @@ def run_income_update_on_new_member(sender, instance, created, **kwargs):
     """
     return  # ✅ disable completely (no celery call)
 
+
+
+# ==========================================================
+# 2) ORDER BV -> MemberBV + MemberMonthlyBV (same transaction as the save)
+# ==========================================================
+def _paid_bv(status, bv_value, quantity):
+    if status != "Paid" or bv_value is None:
+        return Decimal("0.00")
+    return bv_value * (quantity or 0)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_bv(sender, instance, **kwargs):
+    """Paid BV of the row BEFORE this save."""
+    instance._bv_before = None
+    if instance.pk:
+        instance._bv_before = (
+            Order.objects.filter(pk=instance.pk)
+            .values_list("member_id", "status", "product__bv_value", "quantity", "created_at")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Order)
+def push_order_bv(sender, instance, created, raw=False, **kwargs):
+    """
+    ✅ Order became Paid   -> +BV up the ancestor chain
+    ✅ Order left Paid     -> -BV up the ancestor chain
+    ✅ Paid order edited   -> only the difference is pushed
+    """
+    if raw:
+        return
+
+    new_bv = Decimal("0.00")
+    if instance.status == "Paid":
+        new_bv = _paid_bv(instance.status, instance.product.bv_value, instance.quantity)
+    new_month = month_start(instance.created_at)
+
+    before = getattr(instance, "_bv_before", None)
+    if before:
+        old_member_id, status, bv_value, quantity, created_at = before
+        old_bv = _paid_bv(status, bv_value, quantity)
+        old_month = month_start(created_at)
+        if (old_member_id, old_month) == (instance.member_id, new_month):
+            apply_order_bv(instance.member_id, new_bv - old_bv, new_month)
+            return
+        apply_order_bv(old_member_id, -old_bv, old_month)
+
+    apply_order_bv(instance.member_id, new_bv, new_month)
+
+
+@receiver(post_delete, sender=Order)
+def pull_order_bv(sender, instance, origin=None, **kwargs):
+    """
+    Deleted Paid order -> -BV.
+    Orders removed together with their member are skipped: member_remove()
+    already took the whole subtree's BV off the uplines.
+    """
+    if isinstance(origin, Member) or getattr(origin, "model", None) is Member:
+        return
+
+    if instance.status == "Paid":
+        apply_order_bv(
+            instance.member_id,
+            -_paid_bv(instance.status, instance.product.bv_value, instance.quantity),
+            month_start(instance.created_at),
+        )
+
+
+# ==========================================================
+# 3) MEMBER EDITS (admin / forms) -> derived tree data
+# ==========================================================
+# Fields whose change must reach the derived tree data:
+# shown in tree JSON / fragments (ETag + fragment cache versions),
+# placement (old + new upline chains) and joined_date (Euler path keys)
+MEMBER_TRACKED_FIELDS = (
+    "name", "avatar", "bv", "sponsor", "parent", "side", "is_active", "joined_date",
+)
+
+
+def _tracked_values(member):
+    values = {}
+    for name in MEMBER_TRACKED_FIELDS:
+        value = getattr(member, Member._meta.get_field(name).attname)
+        values[name] = getattr(value, "name", value)  # FieldFile -> stored name
+    return values
+
+
+@receiver(pre_save, sender=Member)
+def remember_member_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Tracked fields of the row BEFORE this save (skipped when none can change)."""
+    instance._tracked_before = None
+    if raw or not instance.pk:
+        return
+    if update_fields is not None and not set(update_fields) & set(MEMBER_TRACKED_FIELDS):
+        return
+    if getattr(instance, "_auto_fields_save", False):
+        return
+
+    row = Member.objects.filter(pk=instance.pk).only(*MEMBER_TRACKED_FIELDS).first()
+    if row is None:
+        return
+    instance._tracked_before = _tracked_values(row)
+
+    # placement edited outside tree_events.member_move -> old uplines now
+    instance._old_placement = None
+    moved = (row.parent_id, row.side) != (instance.parent_id, instance.side)
+    if moved and not getattr(instance, "_in_member_move", False):
+        instance._old_placement = (get_ancestor_chain(instance.pk), row.side)
+
+
+@receiver(post_save, sender=Member)
+def push_member_changes(sender, instance, created, raw=False, **kwargs):
+    """
+    ✅ Any tracked field edited -> tree_version of the member + every upline
+       (and of the old uplines after a parent change), so ETags and cached
+       fragments never serve the old name / avatar / BV / active state
+    ✅ joined_date edited -> Euler path keys of the member's interval
+       (as-of-date leg counts)
+    ✅ is_active toggled -> left_active / right_active of every upline
+       (MemberLegStats)
+    ✅ parent / side edited without member_move (admin) -> the same move
+       hooks (leg counters, BV, Euler index, both upline chains)
+    """
+    before = getattr(instance, "_tracked_before", None)
+    if raw or created or not before:
+        return
+
+    after = _tracked_values(instance)
+    changed = {name for name in MEMBER_TRACKED_FIELDS if before[name] != after[name]}
+    if not changed:
+        return
+
+    old_placement = getattr(instance, "_old_placement", None)
+
+    with transaction.atomic():
+        if "joined_date" in changed:
+            refresh_path_joined(instance.id)
+        if "is_active" in changed:
+            # still counted under the old uplines until the move below
+            leg_stats.apply_active_change(instance, old_placement[0] if old_placement else None)
+
+        if old_placement is not None:
+            on_member_moved(instance, *old_placement)
+        else:
+            bump_chain(instance.id)
+            if "parent" in changed and before["parent"] is not None:
+                bump_chain(before["parent"])
+
+    # a later full save() of this instance must not write the old version back
+    instance.tree_version = tree_version(instance)
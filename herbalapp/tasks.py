@@ -1,9 +1,12 @@
-from celery import shared_task
+from celery import shared_task, chord, group
 from datetime import date
+from django.db import DatabaseError
 from django.utils.dateparse import parse_date
 from django.utils import timezone
 from herbalapp.mlm.final_master_engine import run_full_daily_engine
 
+ENGINE_QUEUE = "mlm_engine"
+
 @shared_task
 def run_daily_engine_task(run_date_str=None):
     # beat args இல்லாமலும், args இருந்தாலும் work ஆகணும்
@@ -15,3 +18,56 @@ def run_daily_engine_task(run_date_str=None):
     run_full_daily_engine(run_date)
     return f"OK: MLM engine ran for {run_date}"
 
+
+# ==========================================================
+# ✅ DISTRIBUTED MODE (chord fan-out, no single 30-min task)
+# ==========================================================
+@shared_task
+def run_daily_engine_distributed_task(run_date_str=None, shard_size=None):
+    """
+    Coordinator: lease + reset + leg-total snapshot + shards,
+    then chord(binary shards) -> engine_finalize_task
+    """
+    from herbalapp.mlm.distributed_engine import (
+        SHARD_SIZE, finish_distributed_run, prepare_distributed_run,
+    )
+
+    run_date = parse_date(run_date_str) if run_date_str else timezone.localdate()
+
+    plan = prepare_distributed_run(run_date, shard_size or SHARD_SIZE)
+    if plan is None:
+        return f"SKIPPED: EngineLock for {run_date}"
+
+    if not plan["shards"]:
+        finish_distributed_run(run_date, plan["token"])
+        return f"OK: no members for {run_date}"
+
+    header = group(
+        engine_binary_shard_task.s(run_date.isoformat(), plan["token"], first_id, last_id).set(queue=ENGINE_QUEUE)
+        for first_id, last_id in plan["shards"]
+    )
+    callback = engine_finalize_task.s(run_date.isoformat(), plan["token"]).set(queue=ENGINE_QUEUE)
+    chord(header)(callback)
+
+    return f"DISPATCHED: {len(plan['shards'])} shards for {run_date}"
+
+
+@shared_task(bind=True, queue=ENGINE_QUEUE, acks_late=True, max_retries=3, default_retry_delay=30)
+def engine_binary_shard_task(self, run_date_str, token, first_id, last_id):
+    """Binary phase for one member-id range (idempotent -> safe to retry)."""
+    from herbalapp.mlm.distributed_engine import run_binary_shard
+
+    try:
+        return run_binary_shard(parse_date(run_date_str), token, first_id, last_id)
+    except DatabaseError as e:
+        raise self.retry(exc=e)
+
+
+@shared_task(queue=ENGINE_QUEUE)
+def engine_finalize_task(shard_counts, run_date_str, token):
+    """Chord callback: sponsor + final lock + EngineLock finished."""
+    from herbalapp.mlm.distributed_engine import finish_distributed_run
+
+    run_date = parse_date(run_date_str)
+    finish_distributed_run(run_date, token)
+    return f"OK: MLM engine ran for {run_date} ({sum(shard_counts)} members)"
@@ -0,0 +1,21 @@
+# herbalapp/templatetags/tree_tags.py
+
+from django import template
+from django.utils.safestring import mark_safe
+
+from herbalapp.mlm.tree_query import TREE_API_DEPTH, subtree_fragment
+
+register = template.Library()
+
+
+@register.simple_tag
+def tree_fragment(root_member, depth=TREE_API_DEPTH):
+    """
+    ✅ Rendered tree_node_dynamic.html markup for root_member, `depth`
+    levels deep, served from the fragment cache (mlm/tree_cache.py)
+
+        {% tree_fragment root_member %}
+    """
+    if root_member is None:
+        return ""
+    return mark_safe(subtree_fragment(root_member, depth))
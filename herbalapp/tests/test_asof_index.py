@@ -0,0 +1,90 @@
+import random
+from datetime import date, timedelta
+from django.test import SimpleTestCase, TestCase
+from herbalapp.models import Member
+from herbalapp.mlm.final_master_engine import _walk_descendants
+from herbalapp.mlm.leg_stats import get_leg_counts
+from herbalapp.mlm.tree_snapshot import TreeSnapshot
+
+
+def random_rows(n, start, monotone, seed=7):
+    """(id, parent_id, side, joined_date, is_active) rows of a random binary tree."""
+    rng = random.Random(seed)
+    rows = [(1, None, None, start, True)]
+    free = [(1, "left"), (1, "right")]
+    joined = {1: start}
+    for member_id in range(2, n + 1):
+        parent_id, side = free.pop(rng.randrange(len(free)))
+        if monotone:
+            day = joined[parent_id] + timedelta(days=rng.randrange(3))
+        else:
+            day = start + timedelta(days=rng.randrange(10))
+        if rng.random() < 0.02:
+            side = None if rng.random() < 0.5 else "middle"
+        if rng.random() < 0.02:
+            day = None
+        joined[member_id] = day or start + timedelta(days=99)
+        rows.append((member_id, parent_id, side, day, True))
+        free += [(member_id, "left"), (member_id, "right")]
+    return rows
+
+
+class AsOfLegIndexTest(SimpleTestCase):
+    start = date(2026, 1, 1)
+
+    def days(self):
+        return [None] + [self.start + timedelta(days=d) for d in range(-1, 12)]
+
+    def assert_matches_snapshot(self, snapshot):
+        index = snapshot.as_of_index()
+        days = self.days()
+        expected = snapshot.leg_totals(*days)
+        self.assertEqual(index.leg_totals(*days), expected)
+
+        for member_id, pairs in expected.items():
+            for day, (left, right) in zip(days, pairs):
+                self.assertEqual(index.count_as_of(member_id, "left", day), left, (member_id, day))
+                self.assertEqual(index.count_as_of(member_id, "right", day), right, (member_id, day))
+
+    def test_monotone_joins(self):
+        self.assert_matches_snapshot(TreeSnapshot(random_rows(300, self.start, monotone=True)))
+
+    def test_back_dated_joins(self):
+        # uplines joining after their downline -> exact fallback per member
+        self.assert_matches_snapshot(TreeSnapshot(random_rows(300, self.start, monotone=False)))
+
+    def test_unknown_and_cycle_members(self):
+        rows = [
+            (1, None, None, self.start, True),
+            (2, 1, "left", self.start, True),
+            (3, 4, "left", self.start, True),
+            (4, 3, "right", self.start, True),
+        ]
+        snapshot = TreeSnapshot(rows)
+        index = snapshot.as_of_index()
+        self.assertEqual(index.count_as_of(1, "left", self.start), 1)
+        self.assertEqual(index.count_as_of(3, "right", self.start), 0)
+        self.assertEqual(index.count_as_of(99, "left", self.start), 0)
+        self.assertEqual(index.leg_totals(self.start), snapshot.leg_totals(self.start))
+
+
+class AsOfLegCountsTest(TestCase):
+    def test_get_leg_counts_as_of_matches_walk(self):
+        start = date(2026, 1, 1)
+        root = Member.objects.create(auto_id="rocky001", name="root", phone="1", joined_date=start)
+        queue = [(root, "left"), (root, "right")]
+        for i in range(2, 16):
+            parent, side = queue.pop(0)
+            member = Member.objects.create(
+                auto_id=f"rocky{i:03d}", name=f"m{i}", phone="1",
+                parent=parent, side=side, joined_date=start + timedelta(days=(i * 7) % 4),
+            )
+            queue += [(member, "left"), (member, "right")]
+
+        index = TreeSnapshot.load().as_of_index()
+        for m in Member.objects.all():
+            for d in range(4):
+                day = start + timedelta(days=d)
+                walk = (_walk_descendants(m, "left", day), _walk_descendants(m, "right", day))
+                self.assertEqual(get_leg_counts(m, as_of_date=day, index=index), walk, (m.auto_id, day))
+                self.assertEqual(get_leg_counts(m, as_of_date=day), walk, (m.auto_id, day))
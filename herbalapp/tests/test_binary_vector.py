@@ -0,0 +1,57 @@
+import random
+from decimal import Decimal
+from django.test import SimpleTestCase
+from herbalapp.mlm.binary_vector import calculate_binary_income_vector
+from herbalapp.mlm.final_master_engine import calculate_member_binary_income_for_day
+
+
+class BinaryVectorTest(SimpleTestCase):
+    def test_matches_scalar_calculator(self):
+        rng = random.Random(7)
+        rows = [
+            (
+                rng.randint(0, 80), rng.randint(0, 80),
+                rng.randint(0, 20), rng.randint(0, 20),
+                rng.random() < 0.5, rng.random() < 0.3,
+            )
+            for _ in range(3000)
+        ]
+        # edge cases: eligibility day without a consumable 2:1 / 1:2 pair
+        rows += [(0, 0, 0, 0, False, True), (1, 1, 0, 0, True, True), (2, 0, 0, 1, False, True)]
+
+        res = calculate_binary_income_vector(*zip(*rows))
+
+        for i, (lt, rt, lcf, rcf, eligible, became) in enumerate(rows):
+            expected = calculate_member_binary_income_for_day(
+                None, lt, rt, lcf, rcf, eligible, became
+            )
+            for key in ("binary_pairs_paid", "flashout_units", "flashout_pairs_used",
+                        "washed_pairs", "left_cf_after", "right_cf_after"):
+                self.assertEqual(int(res[key][i]), expected[key], (key, rows[i]))
+            for key in ("eligibility_income", "binary_income", "flashout_income", "total_income"):
+                self.assertEqual(Decimal(int(res[key][i])) / 100, expected[key], (key, rows[i]))
+
+
+class BinaryParallelTest(SimpleTestCase):
+    def test_pool_matches_serial(self):
+        from datetime import date
+        from herbalapp.mlm.final_master_engine import (
+            compute_binary_rows, compute_binary_rows_parallel,
+        )
+
+        rng = random.Random(11)
+        run_date = date(2026, 1, 10)
+        rows = []
+        for i in range(400):
+            ly, ry = rng.randint(0, 30), rng.randint(0, 30)
+            rows.append((
+                i, "rocky001" if i == 0 else f"m{i}",
+                rng.random() < 0.5, None,
+                ly + rng.randint(0, 12), ry + rng.randint(0, 12), ly, ry,
+                rng.randint(0, 6), rng.randint(0, 6),
+            ))
+
+        self.assertEqual(
+            compute_binary_rows_parallel(run_date, rows, workers=3),
+            compute_binary_rows(run_date, rows),
+        )
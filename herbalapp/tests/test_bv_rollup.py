@@ -0,0 +1,132 @@
+import os
+from datetime import date
+from decimal import Decimal
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from herbalapp.models import Member, MemberBV, Order, Product
+from herbalapp.mlm.bv_rollup import get_leg_bv, get_member_bv, rebuild_member_bv
+from herbalapp.mlm.tree_events import member_move, member_remove
+
+
+class BVTreeMixin:
+    def setUp(self):
+        day = date(2026, 1, 1)
+        product = Product.objects.create(name="Kit", mrp=Decimal("500.00"), bv_value=Decimal("125.50"))
+        root = Member.objects.create(auto_id="rocky001", name="root", phone="1", joined_date=day)
+        queue = [(root, "left"), (root, "right")]
+        for i in range(2, 20):
+            parent, side = queue.pop(0)
+            member = Member.objects.create(
+                auto_id=f"rocky{i:03d}", name=f"m{i}", phone="1",
+                parent=parent, side=side, joined_date=day,
+            )
+            queue += [(member, "left"), (member, "right")]
+            Order.objects.create(
+                member=member, product=product, quantity=i % 3 + 1,
+                status="Paid" if i % 4 else "Cancelled",
+            )
+        Order.objects.create(member=root, product=product, quantity=2, status="Paid")
+        self.product = product
+
+
+class MemberBVRollupTest(BVTreeMixin, TestCase):
+    def test_rebuild_matches_downline_walks(self):
+        self.assertEqual(rebuild_member_bv(), Member.objects.count())
+
+        for m in Member.objects.all():
+            self.assertEqual(get_member_bv(m), m.walk_bv(), m.auto_id)
+            self.assertEqual(get_leg_bv(m), m.walk_leg_bv(), m.auto_id)
+
+        root = Member.objects.get(auto_id="rocky001")
+        self.assertGreater(root.calculate_bv()["matched_bv"], 0)
+
+    def test_reads_are_one_query(self):
+        rebuild_member_bv()
+        member = Member.objects.get(auto_id="rocky002")
+        with self.assertNumQueries(1):
+            member.calculate_bv()
+        with self.assertNumQueries(1):
+            member.get_bv_counts()
+
+    def test_missing_row_means_no_bv(self):
+        # new leaf, no Paid order yet -> no row, zeros without a walk
+        leaf = Member.objects.create(
+            auto_id="rocky020", name="m20", phone="1", parent=Member.objects.get(auto_id="rocky010"), side="left",
+        )
+        self.assertFalse(MemberBV.objects.filter(member=leaf).exists())
+        with self.assertNumQueries(1):
+            data = leaf.calculate_bv()
+        self.assertEqual(data, leaf.walk_bv())
+        self.assertEqual(leaf.get_bv_counts(), leaf.walk_leg_bv())
+
+    def test_command_is_rerun_safe(self):
+        call_command("rebuild_member_bv", stdout=open(os.devnull, "w"))
+        call_command("rebuild_member_bv", stdout=open(os.devnull, "w"))
+        self.assertEqual(MemberBV.objects.count(), Member.objects.count())
+
+
+class MemberBVIncrementalTest(BVTreeMixin, TestCase):
+    def assert_matches_rebuild(self):
+        live = {
+            row.member_id: (row.self_bv, row.left_bv, row.right_bv, row.left_leg_bv, row.right_leg_bv)
+            for row in MemberBV.objects.all()
+        }
+        rebuild_member_bv()
+        rebuilt = {
+            row.member_id: (row.self_bv, row.left_bv, row.right_bv, row.left_leg_bv, row.right_leg_bv)
+            for row in MemberBV.objects.all()
+        }
+        for member_id, values in rebuilt.items():
+            self.assertEqual(live.get(member_id, (0,) * 5), values, member_id)
+
+    def test_order_status_changes_propagate(self):
+        rebuild_member_bv()
+        leaf = Member.objects.get(auto_id="rocky019")
+        order = Order.objects.create(member=leaf, product=self.product, quantity=3, status="Pending")
+        self.assert_matches_rebuild()
+
+        order.status = "Paid"
+        order.save()
+        root = Member.objects.get(auto_id="rocky001")
+        self.assertEqual(get_member_bv(root), root.walk_bv())
+        self.assertEqual(get_leg_bv(root), root.walk_leg_bv())
+
+        order.quantity = 5
+        order.save()
+        self.assert_matches_rebuild()
+
+        order.status = "Cancelled"
+        order.save()
+        self.assert_matches_rebuild()
+
+        Order.objects.filter(member__auto_id="rocky006", status="Paid").first().delete()
+        self.assert_matches_rebuild()
+
+    def test_ancestor_update_is_one_statement(self):
+        rebuild_member_bv()
+        leaf = Member.objects.get(auto_id="rocky019")
+        order = Order.objects.create(member=leaf, product=self.product, quantity=1, status="Pending")
+        order.status = "Paid"
+        # pre_save read, order UPDATE, own row (ensure + update), side,
+        # ancestor chain, ancestor rows (ensure + ONE update),
+        # monthly rows (ensure + own update + ONE ancestor update),
+        # tree_version bump (ONE update)
+        with self.assertNumQueries(12):
+            order.save()
+
+    def test_move_and_remove_shift_subtree_bv(self):
+        rebuild_member_bv()
+        node = Member.objects.get(auto_id="rocky004")
+        new_parent = Member.objects.get(auto_id="rocky010")
+
+        with transaction.atomic(), member_move(node):
+            node.parent = new_parent
+            node.side = "right"
+            node.save(update_fields=["parent", "side"])
+        self.assert_matches_rebuild()
+
+        leaf = Member.objects.get(auto_id="rocky018")
+        with transaction.atomic(), member_remove(leaf):
+            leaf.delete()
+        self.assert_matches_rebuild()
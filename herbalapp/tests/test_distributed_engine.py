@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from herbalapp.models import DailyIncomeReport, EngineLock, EngineRun
+from herbalapp.mlm import final_master_engine
+from herbalapp.mlm.engine_lock import EngineLease, EngineLeaseLost
+from herbalapp.mlm.distributed_engine import prepare_distributed_run, run_binary_shard
+from herbalapp.mlm.final_master_engine import run_full_daily_engine
+from herbalapp.tasks import engine_finalize_task, run_daily_engine_distributed_task
+from herbalapp.tests.utils import build_binary_tree
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class DistributedEngineTest(TestCase):
+    def setUp(self):
+        self.start = date(2026, 1, 1)
+        build_binary_tree(24, self.start)
+
+    def dump(self):
+        return list(
+            DailyIncomeReport.objects.order_by("date", "member_id").values_list(
+                "date", "member_id", "left_cf", "right_cf", "binary_income",
+                "binary_eligibility_income", "sponsor_income", "total_income", "total_income_locked",
+            )
+        )
+
+    def test_chord_matches_serial_engine(self):
+        days = [self.start + timedelta(days=i) for i in range(3)]
+        for day in days:
+            run_daily_engine_distributed_task.apply(args=[day.isoformat(), 5])
+            lock = EngineLock.objects.get(run_date=day)
+            self.assertFalse(lock.is_running)
+            self.assertIsNotNone(lock.finished_at)
+            self.assertEqual(lock.progress_done, lock.progress_total)
+
+            # ONE EngineRun for coordinator + shards + callback
+            run = EngineRun.objects.get(run_date=day)
+            self.assertEqual(run.status, "success")
+            self.assertEqual(run.members_processed, lock.progress_total)
+            for phase in ("reset", "snapshot", "binary", "sponsor", "final_lock"):
+                self.assertIn(phase, run.phases)
+        distributed = self.dump()
+
+        EngineLock.objects.all().delete()
+        for day in days:
+            run_full_daily_engine(day)
+        self.assertEqual(self.dump(), distributed)
+
+    def test_retried_shard_does_not_double_credit(self):
+        day = self.start + timedelta(days=2)
+        plan = prepare_distributed_run(day, shard_size=6)
+        for first_id, last_id in plan["shards"]:
+            run_binary_shard(day, plan["token"], first_id, last_id)
+        before = self.dump()
+
+        # a shard retried after success rewrites the same values
+        run_binary_shard(day, plan["token"], *plan["shards"][0])
+        self.assertEqual(self.dump(), before)
+
+        # ... and is not counted twice in the progress
+        lock = EngineLock.objects.get(run_date=day)
+        self.assertEqual(lock.progress_done, lock.progress_total)
+        self.assertEqual(len(lock.shards_done), len(plan["shards"]))
+
+        engine_finalize_task.apply(args=[[0], day.isoformat(), plan["token"]])
+        credited = self.dump()
+
+        # a replayed callback finds the lease released -> no second credit
+        with self.assertRaises(EngineLeaseLost):
+            engine_finalize_task.apply(args=[[0], day.isoformat(), plan["token"]])
+        self.assertEqual(self.dump(), credited)
+
+    def test_shard_renews_lease_per_chunk(self):
+        day = self.start + timedelta(days=2)
+        plan = prepare_distributed_run(day, shard_size=100)
+        lock = EngineLock.objects.get(run_date=day)
+
+        with mock.patch.object(final_master_engine, "PERSIST_CHUNK", 4), \
+                mock.patch("herbalapp.mlm.engine_lock.HEARTBEAT_MIN_INTERVAL", timedelta(0)), \
+                mock.patch.object(EngineLease, "beat", autospec=True, side_effect=EngineLease.beat) as beat:
+            count = run_binary_shard(day, plan["token"], *plan["shards"][0])
+
+        # start + every chunk of the compute step and of the write loop
+        self.assertGreaterEqual(beat.call_count, 1 + 2 * -(-count // 4))
+        # chunk heartbeats do not overwrite the run's progress
+        lock.refresh_from_db()
+        self.assertEqual((lock.progress_done, lock.progress_total), (count, count))
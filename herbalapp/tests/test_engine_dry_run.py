@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from django.core.management import call_command
+from django.test import TestCase
+from herbalapp.models import DailyIncomeReport, DailyLegSnapshot, EngineLock, EngineRun, Member
+from herbalapp.mlm.final_master_engine import run_full_daily_engine
+from herbalapp.tests.utils import build_binary_tree
+
+
+class EngineDryRunTest(TestCase):
+    def setUp(self):
+        self.start = date(2026, 1, 1)
+        build_binary_tree(24, self.start)
+
+        run_full_daily_engine(self.start)
+        run_full_daily_engine(self.start + timedelta(days=1))
+        self.day = self.start + timedelta(days=2)
+
+    def table_counts(self):
+        return (
+            DailyIncomeReport.objects.count(), DailyLegSnapshot.objects.count(),
+            EngineLock.objects.count(), EngineRun.objects.count(),
+            list(Member.objects.order_by("id").values_list("binary_eligible", "binary_eligible_date")),
+        )
+
+    def test_dry_run_writes_nothing_and_matches_real_run(self):
+        before = self.table_counts()
+        result = run_full_daily_engine(self.day, dry_run=True)
+        self.assertEqual(self.table_counts(), before)
+        self.assertGreater(result["totals"]["sponsor_income"], 0)
+
+        run_full_daily_engine(self.day)
+        real = {
+            r.member_id: r
+            for r in DailyIncomeReport.objects.filter(date=self.day)
+        }
+        for row in result["rows"]:
+            report = real[row["member_id"]]
+            for name in ("binary_income", "eligibility_income", "sponsor_income", "total_income"):
+                self.assertEqual(row[name], getattr(report, name), (row["auto_id"], name))
+            self.assertEqual(row["right_cf_after"], report.right_cf)
+
+        self.assertEqual(
+            result["totals"]["total_income"],
+            sum(r.total_income for r in real.values()),
+        )
+
+    def test_command_dumps_jsonl(self):
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        try:
+            call_command(
+                "mlm_run_full_daily", date=self.day.isoformat(), dry_run=True, output=path,
+                stdout=open(os.devnull, "w"),
+            )
+            with open(path) as fp:
+                lines = [json.loads(line) for line in fp]
+        finally:
+            os.remove(path)
+
+        self.assertIn("totals", lines[-1])
+        self.assertEqual(len(lines) - 1, lines[-1]["totals"]["members"])
+        self.assertFalse(EngineLock.objects.filter(run_date=self.day).exists())
@@ -0,0 +1,88 @@
+import os
+from datetime import date, timedelta
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from herbalapp.models import EngineLock, EngineRun, Member
+from herbalapp.mlm.engine_lock import EngineLeaseLost, engine_heartbeat, run_with_lock
+from herbalapp.mlm.final_master_engine import run_full_daily_engine
+
+
+class EngineRunMetricsTest(TestCase):
+    def setUp(self):
+        self.day = date(2026, 1, 5)
+        root = Member.objects.create(auto_id="rocky001", name="root", phone="1", joined_date=self.day)
+        for i, side in ((2, "left"), (3, "right")):
+            Member.objects.create(
+                auto_id=f"rocky{i:03d}", name=f"m{i}", phone="1",
+                parent=root, side=side, sponsor=root, joined_date=self.day,
+            )
+
+    def test_run_records_phases(self):
+        run_full_daily_engine(self.day)
+
+        run = EngineRun.objects.get(run_date=self.day)
+        self.assertEqual(run.status, "success")
+        self.assertEqual(run.lock, EngineLock.objects.get(run_date=self.day))
+        self.assertEqual(run.members_processed, 3)
+        self.assertGreater(run.rows_written, 0)
+        for phase in ("snapshot", "reset", "binary", "sponsor", "final_lock"):
+            self.assertIn(phase, run.phases)
+        self.assertEqual(run.query_count, sum(p["queries"] for p in run.phases.values()))
+
+    def test_forced_rerun_keeps_run_history(self):
+        run_full_daily_engine(self.day)
+        call_command("force_run_daily", date=self.day.isoformat(), stdout=open(os.devnull, "w"))
+
+        runs = EngineRun.objects.filter(run_date=self.day)
+        self.assertEqual(runs.count(), 2)
+        self.assertEqual([run.status for run in runs], ["success", "success"])
+        # the first run's lock was deleted by the forced re-run
+        self.assertEqual(runs.filter(lock__isnull=True).count(), 1)
+
+    def test_failed_run_is_recorded(self):
+        def boom(run_date):
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            run_with_lock(self.day, boom)
+
+        run = EngineRun.objects.get(run_date=self.day)
+        self.assertEqual(run.status, "failed")
+        self.assertEqual(run.error, "boom")
+
+
+class EngineLeaseTest(TestCase):
+    def setUp(self):
+        self.day = date(2026, 1, 5)
+
+    def test_heartbeat_keeps_old_run_alive(self):
+        now = timezone.now()
+        EngineLock.objects.create(
+            run_date=self.day, is_running=True,
+            started_at=now - timedelta(hours=2), heartbeat_at=now - timedelta(minutes=1),
+        )
+        ran = []
+        run_with_lock(self.day, ran.append)
+        self.assertEqual(ran, [])
+
+        # no heartbeat for longer than the lease -> stale, taken over
+        EngineLock.objects.filter(run_date=self.day).update(heartbeat_at=now - timedelta(minutes=30))
+        run_with_lock(self.day, ran.append)
+        self.assertEqual(ran, [self.day])
+
+    def test_progress_and_lost_lease(self):
+        def engine(run_date):
+            engine_heartbeat(done=3, total=10, force=True)
+            lock = EngineLock.objects.get(run_date=run_date)
+            self.assertEqual((lock.progress_done, lock.progress_total), (3, 10))
+
+            # another worker took the lock over
+            EngineLock.objects.filter(run_date=run_date).update(started_at=lock.started_at - timedelta(1))
+            engine_heartbeat(force=True)
+
+        with self.assertRaises(EngineLeaseLost):
+            run_with_lock(self.day, engine)
+
+        # the other worker's lock is left untouched
+        self.assertTrue(EngineLock.objects.get(run_date=self.day).is_running)
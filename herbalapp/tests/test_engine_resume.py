@@ -0,0 +1,80 @@
+from datetime import date, timedelta
+from unittest import mock
+from django.test import TestCase
+from herbalapp.models import DailyIncomeReport, EngineLock, Member, SponsorIncomeLog
+from herbalapp.mlm import final_master_engine
+from herbalapp.mlm.engine_lock import EngineCheckpoint
+from herbalapp.mlm.final_master_engine import run_full_daily_engine
+from herbalapp.tests.utils import build_binary_tree
+
+
+class EngineResumeTest(TestCase):
+    def setUp(self):
+        self.start = date(2026, 1, 1)
+        build_binary_tree(32, self.start)
+
+        run_full_daily_engine(self.start)
+        run_full_daily_engine(self.start + timedelta(days=1))
+        self.day = self.start + timedelta(days=2)
+
+        # ✅ Clean run = expected result
+        run_full_daily_engine(self.day)
+        self.expected = self.day_state()
+        EngineLock.objects.filter(run_date=self.day).delete()
+
+    def day_state(self):
+        return (
+            list(
+                DailyIncomeReport.objects.filter(date=self.day).order_by("member_id").values_list(
+                    "member_id", "binary_income", "eligibility_income", "sponsor_income",
+                    "total_income", "left_cf", "right_cf", "total_income_locked",
+                )
+            ),
+            SponsorIncomeLog.objects.filter(date=self.day).count(),
+        )
+
+    def test_resume_after_crash_mid_binary(self):
+        real_write = final_master_engine.write_binary_chunk
+        calls = []
+
+        def crash_on_third_chunk(result):
+            calls.append(1)
+            if len(calls) == 3:
+                raise RuntimeError("worker killed")
+            real_write(result)
+
+        with mock.patch.object(final_master_engine, "PERSIST_CHUNK", 5), \
+                mock.patch.object(final_master_engine, "write_binary_chunk", crash_on_third_chunk):
+            with self.assertRaises(RuntimeError):
+                run_full_daily_engine(self.day)
+
+        phase, last_id = EngineCheckpoint(self.day).load()
+        self.assertEqual(phase, "binary")
+        self.assertIsNotNone(last_id)
+
+        with mock.patch.object(final_master_engine, "PERSIST_CHUNK", 5), \
+                mock.patch.object(final_master_engine, "write_binary_chunk", wraps=real_write) as write:
+            run_full_daily_engine(self.day, resume=True)
+
+        # ✅ Only the chunks after the checkpoint were written again
+        remaining = Member.objects.filter(id__gt=last_id, joined_date__lte=self.day).count()
+        self.assertEqual(write.call_count, -(-remaining // 5))
+        self.assertEqual(self.day_state(), self.expected)
+        self.assertEqual(EngineCheckpoint(self.day).load(), ("done", None))
+
+    def test_resume_after_sponsor_commit_does_not_double_credit(self):
+        real_mark = EngineCheckpoint.mark
+
+        def crash_before_final_lock(checkpoint, phase, member_id=None):
+            if phase == "final_lock":
+                raise RuntimeError("worker killed")
+            real_mark(checkpoint, phase, member_id)
+
+        with mock.patch.object(EngineCheckpoint, "mark", crash_before_final_lock):
+            with self.assertRaises(RuntimeError):
+                run_full_daily_engine(self.day)
+
+        self.assertEqual(EngineCheckpoint(self.day).load()[0], "sponsor")
+
+        run_full_daily_engine(self.day, resume=True)
+        self.assertEqual(self.day_state(), self.expected)
@@ -0,0 +1,108 @@
+import os
+from datetime import date, timedelta
+from unittest import mock
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from herbalapp.models import Member
+from herbalapp.mlm import euler_index
+from herbalapp.mlm.euler_index import count_leg_members, leg_members, rebuild_euler_index
+from herbalapp.mlm.final_master_engine import _walk_descendants
+from herbalapp.mlm.tree_events import member_move, member_remove, on_member_joined
+
+
+class EulerIndexTest(TestCase):
+    def add(self, auto_id, parent, side, joined_date):
+        with transaction.atomic():
+            m = Member.objects.create(
+                auto_id=auto_id, name=auto_id, phone="9000000000",
+                parent=parent, side=side, joined_date=joined_date,
+            )
+            on_member_joined(m)
+        return m
+
+    def setUp(self):
+        self.start = date(2026, 1, 1)
+        root = self.add("rocky001", None, None, self.start)
+        queue = [(root, "left"), (root, "right")]
+        for i in range(2, 26):
+            parent, side = queue.pop(0)
+            # some uplines join late -> their subtree is hidden before that
+            member = self.add(f"rocky{i:03d}", parent, side, self.start + timedelta(days=(i * 7) % 5))
+            queue += [(member, "left"), (member, "right")]
+
+    def assert_matches_walk(self):
+        days = [None] + [self.start + timedelta(days=d) for d in range(5)]
+        for m in Member.objects.all():
+            for side in ("left", "right"):
+                for day in days:
+                    self.assertEqual(
+                        count_leg_members(m, side, day),
+                        _walk_descendants(m, side, day),
+                        (m.auto_id, side, day),
+                    )
+
+    def test_incremental_joins_match_walk(self):
+        self.assert_matches_walk()
+        root = Member.objects.get(auto_id="rocky001")
+        self.assertEqual(root.depth, 0)
+        self.assertEqual(Member.objects.get(auto_id="rocky004").depth, 2)
+
+    def test_rebuild_matches_incremental(self):
+        Member.objects.update(tin=None, tout=None, depth=None)
+        self.assertIsNone(count_leg_members(Member.objects.get(auto_id="rocky001"), "left"))
+
+        call_command("rebuild_euler_index", stdout=open(os.devnull, "w"))
+        self.assert_matches_walk()
+
+    def test_deep_appends_open_room(self):
+        # a tiny gap forces the set-based "open room" path on every join
+        with mock.patch.object(euler_index, "EULER_GAP", 2):
+            rebuild_euler_index()
+            parent = Member.objects.get(auto_id="rocky025")
+            for i in range(26, 34):
+                parent = self.add(f"rocky{i:03d}", parent, "left" if i % 2 else "right", self.start)
+        self.assert_matches_walk()
+
+    def test_move_and_remove(self):
+        node = Member.objects.get(auto_id="rocky005")
+        new_parent = Member.objects.get(auto_id="rocky013")
+        with transaction.atomic(), member_move(node):
+            node.parent = new_parent
+            node.side = "left"
+            node.save(update_fields=["parent", "side"])
+        self.assert_matches_walk()
+        self.assertEqual(Member.objects.get(auto_id="rocky005").depth, 4)
+
+        gone = Member.objects.get(auto_id="rocky003")
+        with transaction.atomic(), member_remove(gone):
+            gone.delete()
+        self.assert_matches_walk()
+
+    def test_admin_parent_edit_moves_interval(self):
+        # plain save() of parent / side (MemberAdmin), no member_move
+        node = Member.objects.get(auto_id="rocky002")
+        node.parent = Member.objects.get(auto_id="rocky013")
+        node.side = "left"
+        node.save()
+        self.assert_matches_walk()
+        self.assertEqual(Member.objects.get(auto_id="rocky004").depth, 5)
+
+    def test_joined_date_edit_refreshes_path_keys(self):
+        # admin back-dates / post-dates a member with a downline
+        for joined in (self.start + timedelta(days=4), self.start):
+            node = Member.objects.get(auto_id="rocky006")
+            node.joined_date = joined
+            node.save()
+            self.assert_matches_walk()
+
+    def test_leg_is_one_range_query(self):
+        root = Member.objects.get(auto_id="rocky001")
+        with self.assertNumQueries(2) as ctx:
+            count_leg_members(root, "left", self.start + timedelta(days=4))
+        self.assertNotIn("EXISTS", ctx.captured_queries[1]["sql"].upper())
+        self.assertEqual(
+            set(leg_members(root, "right").values_list("auto_id", flat=True)),
+            {"rocky003", "rocky006", "rocky007", "rocky012", "rocky013", "rocky014", "rocky015",
+             "rocky024", "rocky025"},
+        )
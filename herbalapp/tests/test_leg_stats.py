@@ -0,0 +1,110 @@
+from django.db import transaction
+from django.test import TestCase
+from herbalapp.models import Member, MemberLegStats
+from herbalapp.mlm.final_master_engine import count_all_descendants
+from herbalapp.mlm.leg_stats import get_leg_counts, rebuild_leg_stats
+from herbalapp.mlm.tree_events import member_move, on_member_joined
+
+
+class MemberLegStatsTest(TestCase):
+    def add(self, auto_id, parent, side, is_active=True):
+        with transaction.atomic():
+            m = Member.objects.create(
+                auto_id=auto_id, name=auto_id, phone="9000000000",
+                parent=parent, side=side, is_active=is_active
+            )
+            on_member_joined(m)
+        return m
+
+    def setUp(self):
+        self.root = self.add("rocky001", None, None)
+        self.a = self.add("rocky002", self.root, "left")
+        self.b = self.add("rocky003", self.root, "right")
+        self.c = self.add("rocky004", self.a, "left")
+        self.d = self.add("rocky005", self.a, "right", is_active=False)
+        self.e = self.add("rocky006", self.c, "right")
+
+    def assert_matches_recursive(self):
+        for m in Member.objects.all():
+            expected = (
+                count_all_descendants(m, "left"),
+                count_all_descendants(m, "right"),
+            )
+            self.assertEqual(get_leg_counts(m), expected, m.auto_id)
+
+    def test_join_updates_every_ancestor(self):
+        self.assert_matches_recursive()
+        stats = MemberLegStats.objects.get(member=self.root)
+        self.assertEqual((stats.left_total, stats.right_total), (4, 1))
+        self.assertEqual((stats.left_active, stats.right_active), (3, 1))
+
+    def test_move_subtree(self):
+        with transaction.atomic(), member_move(self.c):
+            self.c.parent = self.b
+            self.c.side = "left"
+            self.c.save(update_fields=["parent", "side"])
+
+        self.assert_matches_recursive()
+        stats = MemberLegStats.objects.get(member=self.root)
+        self.assertEqual((stats.left_total, stats.right_total), (2, 3))
+
+    def test_admin_move_shifts_counters(self):
+        # plain save() of parent / side (MemberAdmin), together with is_active
+        self.c.parent = self.b
+        self.c.side = "left"
+        self.c.is_active = False
+        self.c.save()
+
+        self.assert_matches_recursive()
+        incremental = {
+            s.member_id: (s.left_total, s.right_total, s.left_active, s.right_active)
+            for s in MemberLegStats.objects.all()
+        }
+        self.assertEqual(incremental[self.root.id], (2, 3, 1, 2))
+
+        rebuild_leg_stats()
+        self.assertEqual(
+            {
+                s.member_id: (s.left_total, s.right_total, s.left_active, s.right_active)
+                for s in MemberLegStats.objects.all()
+            },
+            incremental,
+        )
+
+    def test_active_toggle_moves_active_counters(self):
+        def counters():
+            return {
+                s.member_id: (s.left_total, s.right_total, s.left_active, s.right_active)
+                for s in MemberLegStats.objects.all()
+            }
+
+        # admin deactivates rocky004 and re-activates rocky005 (plain save)
+        self.c.is_active = False
+        self.c.save()
+        self.d.is_active = True
+        self.d.save()
+        stats = MemberLegStats.objects.get(member=self.root)
+        self.assertEqual((stats.left_active, stats.right_active), (3, 1))
+        stats = MemberLegStats.objects.get(member=self.a)
+        self.assertEqual((stats.left_active, stats.right_active), (1, 1))
+
+        # saving again without a change leaves the counters alone
+        incremental = counters()
+        self.d.save()
+        self.assertEqual(counters(), incremental)
+
+        rebuild_leg_stats()
+        self.assertEqual(counters(), incremental)
+
+    def test_rebuild_matches_incremental(self):
+        before = {
+            s.member_id: (s.left_total, s.right_total, s.left_active, s.right_active)
+            for s in MemberLegStats.objects.all()
+        }
+        MemberLegStats.objects.all().delete()
+        rebuild_leg_stats()
+        after = {
+            s.member_id: (s.left_total, s.right_total, s.left_active, s.right_active)
+            for s in MemberLegStats.objects.all()
+        }
+        self.assertEqual(before, after)
@@ -0,0 +1,88 @@
+import os
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from herbalapp.models import Member, MemberMonthlyBV, Order, Product
+from herbalapp.mlm.bv_rollup import compact_monthly_bv, get_month_bv, month_start, previous_month
+
+
+class MemberMonthlyBVTest(TestCase):
+    def setUp(self):
+        day = date(2026, 1, 1)
+        self.product = Product.objects.create(name="Kit", mrp=Decimal("500.00"), bv_value=Decimal("100.00"))
+        root = Member.objects.create(auto_id="rocky001", name="root", phone="1", joined_date=day)
+        queue = [(root, "left"), (root, "right")]
+        self.months = [date(2026, 1, 1), date(2026, 2, 1), previous_month()]
+        for i in range(2, 16):
+            parent, side = queue.pop(0)
+            member = Member.objects.create(
+                auto_id=f"rocky{i:03d}", name=f"m{i}", phone="1",
+                parent=parent, side=side, joined_date=day,
+            )
+            queue += [(member, "left"), (member, "right")]
+            order = Order.objects.create(
+                member=member, product=self.product, quantity=i % 3 + 1,
+                status="Paid" if i % 5 else "Pending",
+            )
+            self.set_month(order, self.months[i % 3])
+
+    def set_month(self, order, month):
+        created = timezone.make_aware(datetime.combine(month.replace(day=15), time(12)))
+        Order.objects.filter(pk=order.pk).update(created_at=created)
+
+    def rows(self):
+        return {
+            (r.member_id, r.month): (r.self_bv, r.left_bv, r.right_bv)
+            for r in MemberMonthlyBV.objects.all()
+            if r.self_bv or r.left_bv or r.right_bv
+        }
+
+    def test_compaction_matches_order_scan(self):
+        compact_monthly_bv()
+
+        for m in Member.objects.all():
+            for month in self.months:
+                own = sum(
+                    (o.product.bv_value * o.quantity for o in Order.objects.filter(
+                        member=m, status="Paid", created_at__date__gte=month,
+                        created_at__date__lt=month_start(month + timedelta(days=31)),
+                    )),
+                    Decimal("0.00"),
+                )
+                self.assertEqual(get_month_bv(m, month)["self_bv"], own, (m.auto_id, month))
+
+        root = Member.objects.get(auto_id="rocky001")
+        total = sum(get_month_bv(root, month)["left_bv"] + get_month_bv(root, month)["right_bv"] for month in self.months)
+        self.assertEqual(total, root.calculate_bv()["left_bv"] + root.calculate_bv()["right_bv"])
+
+    def test_last_month_bv_reads_one_row(self):
+        compact_monthly_bv()
+        member = Member.objects.get(auto_id="rocky008")
+        with self.assertNumQueries(1):
+            value = member.last_month_bv()
+        self.assertEqual(value, Decimal("300.00"))
+
+    def test_order_changes_keep_month_current(self):
+        compact_monthly_bv()
+        leaf = Member.objects.get(auto_id="rocky015")
+        order = Order.objects.create(member=leaf, product=self.product, quantity=2, status="Pending")
+        order.status = "Paid"
+        order.save()
+        live = self.rows()
+
+        compact_monthly_bv(month_start(timezone.now()))
+        self.assertEqual(self.rows(), live)
+
+        order.status = "Cancelled"
+        order.save()
+        live = self.rows()
+        compact_monthly_bv()
+        self.assertEqual(self.rows(), live)
+
+    def test_command_single_month(self):
+        compact_monthly_bv()
+        before = self.rows()
+        call_command("compact_monthly_bv", month="2026-02", stdout=open(os.devnull, "w"))
+        self.assertEqual(self.rows(), before)
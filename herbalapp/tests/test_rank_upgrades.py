@@ -0,0 +1,91 @@
+from datetime import date
+from decimal import Decimal
+from django.test import TestCase
+from herbalapp.models import Member, Order, Product, RankReward
+from herbalapp.mlm.bv_rollup import rebuild_member_bv
+from herbalapp.mlm_rank_engine import (
+    load_side_bv_totals,
+    process_rank_upgrade,
+    process_rank_upgrades,
+    rank_level_for,
+)
+
+
+class RankUpgradeBatchTest(TestCase):
+    def setUp(self):
+        self.day = date(2026, 1, 1)
+        self.product = Product.objects.create(
+            name="Kit", mrp=Decimal("1000.00"), bv_value=Decimal("30000.00")
+        )
+        root = Member.objects.create(auto_id="rocky001", name="root", phone="1", joined_date=self.day)
+        queue = [(root, "left"), (root, "right")]
+        for i in range(2, 16):
+            parent, side = queue.pop(0)
+            member = Member.objects.create(
+                auto_id=f"rocky{i:03d}", name=f"m{i}", phone="1",
+                parent=parent, side=side, joined_date=self.day,
+                binary_eligible=True,
+            )
+            queue += [(member, "left"), (member, "right")]
+            Order.objects.create(
+                member=member, product=self.product, quantity=i % 4 + 1,
+                status="Paid" if i % 5 else "Pending",
+            )
+
+    def test_side_bv_totals_read_from_table(self):
+        rebuild_member_bv()
+        with self.assertNumQueries(1):
+            totals = load_side_bv_totals()
+        for m in Member.objects.all():
+            data = m.walk_bv()
+            self.assertEqual(totals[m.id], (data["left_bv"], data["right_bv"]), m.auto_id)
+
+    def test_side_bv_totals_missing_row_is_zero(self):
+        # incremental rows only: leaves without Paid BV have none
+        totals = load_side_bv_totals()
+        for m in Member.objects.all():
+            data = m.walk_bv()
+            self.assertEqual(totals.get(m.id, (0, 0)), (data["left_bv"], data["right_bv"]), m.auto_id)
+
+    def test_rank_level_for_matches_slab_loop(self):
+        self.assertEqual(rank_level_for(49_999, 0, 0), 0)
+        self.assertEqual(rank_level_for(50_000, 0, 0), 1)
+        self.assertEqual(rank_level_for(150_000, 0, 0), 2)
+        # checkpoint already at First Star -> progress counted from 50k
+        self.assertEqual(rank_level_for(149_999, 1, 50_000), 1)
+        self.assertEqual(rank_level_for(10 ** 12, 0, 0), 12)
+        self.assertEqual(rank_level_for(0, 3, 400_000), 3)
+
+    def test_batch_matches_per_member_upgrade(self):
+        members = list(Member.objects.order_by("id"))
+        for m in members:
+            process_rank_upgrade(m)
+        expected = list(
+            Member.objects.order_by("id").values_list("current_rank", "rank_level", "rank_checkpoint_bv")
+        )
+        expected_rewards = sorted(
+            RankReward.objects.values_list(
+                "member_id", "rank_title", "left_bv_snapshot", "right_bv_snapshot"
+            )
+        )
+        self.assertTrue(expected_rewards)
+
+        RankReward.objects.all().delete()
+        Member.objects.update(current_rank=None, rank_level=0, rank_checkpoint_bv=0)
+
+        upgraded = process_rank_upgrades(self.day, list(Member.objects.order_by("id")))
+        self.assertTrue(upgraded)
+        self.assertEqual(
+            list(Member.objects.order_by("id").values_list("current_rank", "rank_level", "rank_checkpoint_bv")),
+            expected,
+        )
+        self.assertEqual(
+            sorted(RankReward.objects.values_list(
+                "member_id", "rank_title", "left_bv_snapshot", "right_bv_snapshot"
+            )),
+            expected_rewards,
+        )
+
+        # ✅ Re-run: nothing new
+        self.assertEqual(process_rank_upgrades(self.day), [])
+        self.assertEqual(RankReward.objects.count(), len(expected_rewards))
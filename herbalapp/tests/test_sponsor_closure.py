@@ -0,0 +1,96 @@
+import os
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from herbalapp.models import Member, SponsorClosure
+from herbalapp.mlm.sponsor_closure import (
+    generation_report,
+    rebuild_sponsor_closure,
+    sponsor_level_counts,
+    sponsored_downline,
+)
+from herbalapp.mlm.tree_events import member_remove, on_member_joined, on_sponsor_changed
+
+
+class SponsorClosureTest(TestCase):
+    def add(self, i, sponsor, is_active=True):
+        with transaction.atomic():
+            m = Member.objects.create(
+                auto_id=f"rocky{i:03d}", name=f"m{i}", phone="1",
+                sponsor=sponsor, is_active=is_active,
+            )
+            on_member_joined(m)
+        return m
+
+    def setUp(self):
+        # rocky001 sponsors 002..004, each of them sponsors two more, ...
+        self.members = [self.add(1, None)]
+        for i in range(2, 23):
+            sponsor = self.members[(i - 2) // 3 if i <= 4 else (i - 5) // 2 + 1]
+            self.members.append(self.add(i, sponsor, is_active=bool(i % 4)))
+
+    def walk_levels(self, member, max_level=None):
+        counts = {}
+        frontier = [member]
+        level = 0
+        while frontier and (max_level is None or level < max_level):
+            level += 1
+            frontier = list(Member.objects.filter(sponsor__in=frontier))
+            if frontier:
+                counts[level] = len(frontier)
+        return counts
+
+    def pairs(self):
+        return set(SponsorClosure.objects.values_list("ancestor_id", "descendant_id", "level"))
+
+    def assert_matches_rebuild(self):
+        live = self.pairs()
+        rebuild_sponsor_closure()
+        self.assertEqual(live, self.pairs())
+
+    def test_joins_match_level_walk(self):
+        for m in Member.objects.all():
+            self.assertEqual(sponsor_level_counts(m), self.walk_levels(m), m.auto_id)
+        root = self.members[0]
+        self.assertEqual(sponsor_level_counts(root, max_level=2), self.walk_levels(root, 2))
+        self.assert_matches_rebuild()
+
+    def test_reads_are_one_query(self):
+        root = self.members[0]
+        with self.assertNumQueries(1):
+            downline = list(sponsored_downline(root, max_level=2))
+        self.assertEqual([m.sponsor_level for m in downline], [1] * 3 + [2] * 6)
+
+        with self.assertNumQueries(1):
+            report = generation_report(root)
+        self.assertEqual(sum(g["members"] for g in report), Member.objects.count() - 1)
+        self.assertEqual(
+            sum(g["active"] for g in report),
+            Member.objects.filter(is_active=True).exclude(id=root.id).count(),
+        )
+
+    def test_sponsor_change_moves_downline(self):
+        member = Member.objects.get(auto_id="rocky003")
+        with transaction.atomic():
+            member.sponsor = Member.objects.get(auto_id="rocky004")
+            member.save(update_fields=["sponsor"])
+            on_sponsor_changed(member)
+        self.assertEqual(self.walk_levels(self.members[0]), sponsor_level_counts(self.members[0]))
+        self.assert_matches_rebuild()
+
+        member.sponsor = member.sponsored_members.first()
+        with self.assertRaises(ValueError), transaction.atomic():
+            member.save(update_fields=["sponsor"])
+            on_sponsor_changed(member)
+
+    def test_delete_detaches_downline(self):
+        member = Member.objects.get(auto_id="rocky004")
+        with transaction.atomic(), member_remove(member):
+            member.delete()
+        self.assert_matches_rebuild()
+
+    def test_command_rebuild(self):
+        before = self.pairs()
+        SponsorClosure.objects.all().delete()
+        call_command("rebuild_sponsor_closure", stdout=open(os.devnull, "w"))
+        self.assertEqual(self.pairs(), before)
@@ -0,0 +1,48 @@
+from datetime import date
+from decimal import Decimal
+from django.test import TestCase
+from herbalapp.models import DailyIncomeReport, Member, SponsorIncomeLog
+from herbalapp.mlm.sponsor_engine import run_sponsor_income_batch
+
+
+class SponsorBatchTest(TestCase):
+    def setUp(self):
+        self.day = date(2026, 1, 10)
+
+        def add(auto_id, parent=None, side=None, sponsor=None):
+            return Member.objects.create(
+                auto_id=auto_id, name=auto_id, phone="9000000000",
+                parent=parent, side=side, sponsor=sponsor, joined_date=self.day
+            )
+
+        self.root = add("rocky001")
+        self.a = add("rocky002", self.root, "left", self.root)
+        add("rocky003", self.root, "right", self.root)
+        # a has direct 1:1 -> can receive
+        self.c = add("rocky004", self.a, "left", self.a)      # Rule-1 -> a
+        add("rocky005", self.a, "right", self.a)
+        self.e = add("rocky006", self.c, "left", self.a)      # Rule-2 -> a
+        self.f = add("rocky007", self.c, "right", self.c)     # Rule-1 -> c (c has e + f)
+
+        for child, amount in ((self.c, "500"), (self.e, "1000"), (self.f, "500"), (self.a, "500")):
+            DailyIncomeReport.objects.create(
+                member=child, date=self.day, binary_income=Decimal(amount)
+            )
+
+    def test_batch_credit_and_logs(self):
+        stats = run_sponsor_income_batch(self.day)
+
+        a_report = DailyIncomeReport.objects.get(member=self.a, date=self.day)
+        c_report = DailyIncomeReport.objects.get(member=self.c, date=self.day)
+        self.assertEqual(a_report.sponsor_income, Decimal("1500.00"))
+        self.assertEqual(c_report.sponsor_income, Decimal("500.00"))
+
+        # a's own sponsor is ROOT -> stays unlocked, no credit
+        self.assertFalse(a_report.sponsor_today_processed)
+        self.assertEqual(stats["children"], 3)
+        self.assertEqual(SponsorIncomeLog.objects.filter(date=self.day).count(), 3)
+
+        # re-run is duplicate safe
+        run_sponsor_income_batch(self.day)
+        a_report.refresh_from_db()
+        self.assertEqual(a_report.sponsor_income, Decimal("1500.00"))
@@ -0,0 +1,142 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import transaction
+from django.test import RequestFactory, TestCase
+from herbalapp import views_tree
+from herbalapp.models import Member, Order, Product
+from herbalapp.mlm.tree_cache import cached_fragment
+from herbalapp.mlm.tree_events import member_move, member_remove, on_member_joined
+
+
+class TreeMixin:
+    def add(self, auto_id, parent, side):
+        with transaction.atomic():
+            m = Member.objects.create(auto_id=auto_id, name=auto_id, phone="1", parent=parent, side=side)
+            on_member_joined(m)
+        return m
+
+    def setUp(self):
+        cache.clear()
+        self.root = self.add("rocky001", None, None)
+        self.a = self.add("rocky002", self.root, "left")
+        self.b = self.add("rocky003", self.root, "right")
+        self.c = self.add("rocky004", self.a, "left")
+        self.d = self.add("rocky005", self.b, "left")
+
+    def versions(self):
+        return dict(Member.objects.values_list("auto_id", "tree_version"))
+
+
+class TreeCacheTest(TreeMixin, TestCase):
+    def test_join_bumps_only_uplines(self):
+        before = self.versions()
+        self.add("rocky006", self.c, "right")
+        after = self.versions()
+
+        for auto_id in ("rocky001", "rocky002", "rocky004"):
+            self.assertEqual(after[auto_id], before[auto_id] + 1, auto_id)
+        for auto_id in ("rocky003", "rocky005"):
+            self.assertEqual(after[auto_id], before[auto_id], auto_id)
+
+    def test_move_and_remove_bump_both_chains(self):
+        before = self.versions()
+        with transaction.atomic(), member_move(self.c):
+            self.c.parent = self.d
+            self.c.side = "right"
+            self.c.save(update_fields=["parent", "side"])
+        after = self.versions()
+        for auto_id in ("rocky001", "rocky002", "rocky003", "rocky004", "rocky005"):
+            self.assertGreater(after[auto_id], before[auto_id], auto_id)
+
+        with transaction.atomic(), member_remove(self.c):
+            self.c.delete()
+        final = self.versions()
+        self.assertGreater(final["rocky005"], after["rocky005"])
+        self.assertEqual(final["rocky002"], after["rocky002"])
+
+    def test_fragment_reused_until_subtree_changes(self):
+        calls = []
+
+        def render(tag):
+            return lambda: calls.append(tag) or f"<div>{tag}{len(calls)}</div>"
+
+        first = cached_fragment("node", self.a, 3, render("a"))
+        cached_fragment("node", self.b, 3, render("b"))
+        with self.assertNumQueries(1):
+            self.assertEqual(cached_fragment("node", self.a, 3, render("a")), first)
+        self.assertEqual(calls, ["a", "b"])
+
+        # join under rocky002 -> its fragment re-rendered, rocky003 untouched
+        self.add("rocky006", self.c, "left")
+        self.assertNotEqual(cached_fragment("node", self.a, 3, render("a")), first)
+        cached_fragment("node", self.b, 3, render("b"))
+        self.assertEqual(calls, ["a", "b", "a"])
+
+        # plain save() of a shown field below rocky002 (admin rename)
+        self.c.name = "Renamed"
+        self.c.save()
+        cached_fragment("node", self.a, 3, render("a"))
+        cached_fragment("node", self.b, 3, render("b"))
+        self.assertEqual(calls, ["a", "b", "a", "a"])
+
+
+class TreeETagTest(TreeMixin, TestCase):
+    def get(self, view, auto_id, etag=None, **params):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        request = RequestFactory().get("/", params, **headers)
+        return view(request, auto_id)
+
+    def test_unchanged_subtree_answers_304(self):
+        for view in (views_tree.tree_data, views_tree.member_details_api):
+            first = self.get(view, "rocky002")
+            self.assertEqual(first.status_code, 200)
+
+            with self.assertNumQueries(1):
+                again = self.get(view, "rocky002", first["ETag"])
+            self.assertEqual(again.status_code, 304)
+
+            # other query string -> other body -> other ETag
+            self.assertNotEqual(self.get(view, "rocky002", as_of="2026-01-01")["ETag"], first["ETag"])
+
+    def test_join_and_paid_order_change_etag(self):
+        etag = self.get(views_tree.member_details_api, "rocky002")["ETag"]
+        sibling = self.get(views_tree.member_details_api, "rocky003")["ETag"]
+
+        self.add("rocky006", self.c, "right")
+        self.assertEqual(self.get(views_tree.member_details_api, "rocky002", etag).status_code, 200)
+        self.assertEqual(self.get(views_tree.member_details_api, "rocky003", sibling).status_code, 304)
+
+        etag = self.get(views_tree.tree_data, "rocky001")["ETag"]
+        product = Product.objects.create(name="Kit", mrp=Decimal("500.00"), bv_value=Decimal("100.00"))
+        order = Order.objects.create(member=self.d, product=product, quantity=1, status="Pending")
+        self.assertEqual(self.get(views_tree.tree_data, "rocky001", etag).status_code, 304)
+
+        order.status = "Paid"
+        order.save()
+        self.assertEqual(self.get(views_tree.tree_data, "rocky001", etag).status_code, 200)
+
+    def test_member_edits_change_etag(self):
+        for field, value in (("name", "Renamed"), ("bv", Decimal("50.00")), ("is_active", False),
+                             ("avatar", "avatars/new.png")):
+            etag = self.get(views_tree.tree_data, "rocky001")["ETag"]
+            sibling = self.get(views_tree.tree_data, "rocky002")["ETag"]
+
+            # plain save(), as the admin / forms do (no tree event)
+            member = Member.objects.get(auto_id="rocky005")
+            setattr(member, field, value)
+            member.save()
+
+            self.assertEqual(self.get(views_tree.tree_data, "rocky001", etag).status_code, 200, field)
+            self.assertEqual(self.get(views_tree.tree_data, "rocky002", sibling).status_code, 304, field)
+
+        # saving again without changes keeps the tag
+        etag = self.get(views_tree.tree_data, "rocky001")["ETag"]
+        member.save()
+        self.assertEqual(self.get(views_tree.tree_data, "rocky001", etag).status_code, 304)
+
+    def test_admin_parent_change_bumps_old_uplines(self):
+        etag = self.get(views_tree.member_details_api, "rocky002")["ETag"]
+        self.c.parent = self.d
+        self.c.side = "right"
+        self.c.save()
+        self.assertEqual(self.get(views_tree.member_details_api, "rocky002", etag).status_code, 200)
@@ -0,0 +1,156 @@
+import gzip
+import json
+from django.test import RequestFactory, TestCase
+from herbalapp.models import Member
+from herbalapp import views_tree
+from herbalapp.mlm import tree_query
+
+
+class TreeDataTest(TestCase):
+    def setUp(self):
+        root = Member.objects.create(auto_id="rocky001", name="root", phone="1")
+        queue = [(root, "left"), (root, "right")]
+        for i in range(2, 40):
+            parent, side = queue.pop(0)
+            member = Member.objects.create(
+                auto_id=f"rocky{i:03d}", name=f"m{i}", phone="1",
+                parent=parent, side=side, is_active=(i != 5),
+            )
+            queue += [(member, "left"), (member, "right")]
+        self.root = root
+
+    def dfs_payload(self, root):
+        """The old nested dfs() result, as sets."""
+        nodes = {root.auto_id}
+        edges = set()
+        stack = [root]
+        while stack:
+            parent = stack.pop()
+            for c in Member.objects.filter(parent=parent, is_active=True):
+                nodes.add(c.auto_id)
+                edges.add((parent.auto_id, c.auto_id))
+                stack.append(c)
+        return nodes, edges
+
+    def fetch(self, auto_id):
+        request = RequestFactory().get(f"/tree-data/{auto_id}/")
+        response = views_tree.tree_data(request, auto_id)
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_matches_nested_dfs(self):
+        for auto_id in ("rocky001", "rocky003", "rocky005"):
+            payload = self.fetch(auto_id)
+            nodes, edges = self.dfs_payload(Member.objects.get(auto_id=auto_id))
+            self.assertEqual({n["data"]["id"] for n in payload["nodes"]}, nodes, auto_id)
+            self.assertEqual(
+                {(e["data"]["source"], e["data"]["target"]) for e in payload["edges"]}, edges, auto_id
+            )
+
+        node = self.fetch("rocky002")["nodes"][0]["data"]
+        self.assertEqual(node, {"id": "rocky002", "name": "m2", "bv": "0", "avatar": tree_query.DEFAULT_AVATAR})
+
+    def test_small_chunks_stay_valid_json(self):
+        tree_query.STREAM_CHUNK, old = 3, tree_query.STREAM_CHUNK
+        try:
+            payload = self.fetch("rocky001")
+        finally:
+            tree_query.STREAM_CHUNK = old
+        self.assertEqual(len(payload["nodes"]), len(payload["edges"]) + 1)
+
+    def test_columnar_matches_cytoscape(self):
+        request = RequestFactory().get("/tree-data/rocky001/", {"format": "columnar"})
+        columns = json.loads(views_tree.tree_data(request, "rocky001").content)
+        payload = self.fetch("rocky001")
+
+        nodes = {
+            (auto_id, columns["names"][i], columns["bv"][i], columns["avatars"][columns["avatar"][i]])
+            for i, auto_id in enumerate(columns["ids"])
+        }
+        self.assertEqual(nodes, {
+            (n["data"]["id"], n["data"]["name"], float(n["data"]["bv"]), n["data"]["avatar"])
+            for n in payload["nodes"]
+        })
+
+        edges = {
+            (columns["ids"][p], columns["ids"][i])
+            for i, p in enumerate(columns["parents"]) if p >= 0
+        }
+        self.assertEqual(edges, {(e["data"]["source"], e["data"]["target"]) for e in payload["edges"]})
+        self.assertEqual(columns["avatars"], [tree_query.DEFAULT_AVATAR])
+        self.assertEqual(columns["sides"][:3], ["", "L", "R"])
+
+    def test_columnar_gzip_is_smaller(self):
+        factory = RequestFactory()
+        plain = b"".join(views_tree.tree_data(factory.get("/"), "rocky001").streaming_content)
+        node_count = len(json.loads(plain)["nodes"])
+
+        request = factory.get("/", {"format": "columnar"}, HTTP_ACCEPT_ENCODING="gzip")
+        response = views_tree.tree_data(request, "rocky001")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        body = gzip.decompress(response.content)
+        self.assertEqual(len(json.loads(body)["ids"]), node_count)
+        self.assertLess(len(body) * 2, len(plain))
+        self.assertLess(len(response.content) * 4, len(plain))
+
+    def test_one_query_for_whole_downline(self):
+        # root lookup + ONE recursive CTE, whatever the downline size
+        with self.assertNumQueries(2):
+            self.fetch("rocky001")
+
+
+class TreeApiTest(TestCase):
+    def setUp(self):
+        root = Member.objects.create(auto_id="rocky001", name="root", phone="1")
+        queue = [(root, "left"), (root, "right")]
+        for i in range(2, 32):
+            parent, side = queue.pop(0)
+            member = Member.objects.create(
+                auto_id=f"rocky{i:03d}", name=f"m{i}", phone="1", parent=parent, side=side,
+            )
+            queue += [(member, "left"), (member, "right")]
+
+    def fetch(self, auto_id, depth):
+        request = RequestFactory().get(f"/tree-api/{auto_id}/", {"depth": depth})
+        return json.loads(views_tree.tree_api(request, auto_id).content)
+
+    def test_depth_limit_and_has_more(self):
+        with self.assertNumQueries(2):
+            payload = self.fetch("rocky001", 2)
+
+        nodes = payload["nodes"]
+        self.assertEqual(payload["depth"], 2)
+        self.assertEqual(len(nodes), 7)
+        self.assertEqual([n["level"] for n in nodes], [0, 1, 1, 2, 2, 2, 2])
+        self.assertEqual(nodes[1]["parent"], "rocky001")
+        self.assertEqual([n["has_more"] for n in nodes[3:]], [True] * 4)
+        self.assertFalse(any(n["has_more"] for n in nodes[:3]))
+
+        # expanding a marked node continues exactly below it
+        deeper = self.fetch(nodes[3]["id"], 2)["nodes"]
+        self.assertEqual(deeper[0]["id"], nodes[3]["id"])
+        self.assertEqual({n["parent"] for n in deeper[1:3]}, {nodes[3]["id"]})
+        self.assertFalse(any(n["has_more"] for n in deeper))
+
+    def test_leaf_and_clamped_depth(self):
+        leaf = self.fetch("rocky031", 3)["nodes"]
+        self.assertEqual(len(leaf), 1)
+        self.assertFalse(leaf[0]["has_left"] or leaf[0]["has_more"])
+        self.assertEqual(self.fetch("rocky001", 99)["depth"], tree_query.TREE_API_MAX_DEPTH)
+        self.assertEqual(self.fetch("rocky001", "x")["depth"], tree_query.TREE_API_DEPTH)
+
+    def test_nested_nodes_for_template(self):
+        root = tree_query.nest_subtree(tree_query.bounded_subtree(Member.objects.get(auto_id="rocky001"), 1))
+        self.assertEqual(root["left_child"]["auto_id"], "rocky002")
+        self.assertEqual(root["right_child"]["auto_id"], "rocky003")
+        self.assertIsNone(root["left_child"]["left_child"])
+        self.assertTrue(root["left_child"]["has_more"])
+
+    def test_has_avatar_only_for_uploaded_photo(self):
+        Member.objects.filter(auto_id="rocky002").update(avatar="avatars/m2.png")
+        root = tree_query.nest_subtree(tree_query.bounded_subtree(Member.objects.get(auto_id="rocky001"), 1))
+
+        # avatar is always a URL (placeholder when empty), has_avatar drives the <img>
+        self.assertEqual(root["avatar"], tree_query.DEFAULT_AVATAR)
+        self.assertFalse(root["has_avatar"])
+        self.assertTrue(root["left_child"]["has_avatar"])
+        self.assertNotEqual(root["left_child"]["avatar"], tree_query.DEFAULT_AVATAR)
@@ -0,0 +1,96 @@
+from datetime import date, timedelta
+from django.db import transaction
+from django.test import TestCase
+from herbalapp.models import DailyLegSnapshot, Member
+from herbalapp.mlm.final_master_engine import count_all_descendants
+from herbalapp.mlm.tree_events import member_move, on_member_joined
+from herbalapp.mlm.tree_snapshot import TreeSnapshot, engine_leg_totals, load_daily_leg_totals
+
+
+class TreeSnapshotTest(TestCase):
+    def setUp(self):
+        self.today = date(2026, 1, 10)
+        self.yesterday = self.today - timedelta(days=1)
+        older = self.today - timedelta(days=5)
+
+        def add(auto_id, parent, side, joined):
+            return Member.objects.create(
+                auto_id=auto_id, name=auto_id, phone="9000000000",
+                parent=parent, side=side, joined_date=joined
+            )
+
+        self.root = add("rocky001", None, None, older)
+        a = add("rocky002", self.root, "left", older)
+        b = add("rocky003", self.root, "right", older)
+        c = add("rocky004", a, "left", self.yesterday)
+        add("rocky005", a, "right", self.today)
+        add("rocky006", c, "left", self.today)
+        # joined today under a node that joined yesterday
+        d = add("rocky007", b, "left", self.today)
+        # backdated node under a node joined today (hidden for yesterday)
+        add("rocky008", d, "right", self.yesterday)
+
+    def test_snapshot_matches_recursive_counts(self):
+        totals = TreeSnapshot.load().leg_totals(self.today, self.yesterday, None)
+
+        for m in Member.objects.all():
+            expected = tuple(
+                (
+                    count_all_descendants(m, "left", as_of_date=as_of),
+                    count_all_descendants(m, "right", as_of_date=as_of),
+                )
+                for as_of in (self.today, self.yesterday, None)
+            )
+            self.assertEqual(totals[m.id], expected, m.auto_id)
+
+    def test_root_totals(self):
+        totals = TreeSnapshot.load().leg_totals(self.today, self.yesterday)
+        self.assertEqual(totals[self.root.id], ((4, 3), (2, 1)))
+
+    def test_engine_reads_stored_yesterday(self):
+        # first run computes both dates and stores today's totals
+        first = engine_leg_totals(self.yesterday)
+        self.assertTrue(DailyLegSnapshot.objects.filter(date=self.yesterday).exists())
+
+        # next run takes yesterday from the stored rows
+        second = engine_leg_totals(self.today)
+        for member_id, pairs in second.items():
+            self.assertEqual(pairs[1], first[member_id][0])
+
+        self.assertEqual(second, TreeSnapshot.load().leg_totals(self.today, self.yesterday))
+
+    def stored_yesterday(self):
+        index = TreeSnapshot.load().as_of_index()
+        return load_daily_leg_totals(self.yesterday, index.tree_stamp(self.yesterday))
+
+    def test_todays_join_keeps_stored_yesterday(self):
+        engine_leg_totals(self.yesterday)
+        with transaction.atomic():
+            m = Member.objects.create(
+                auto_id="rocky009", name="rocky009", phone="9000000000",
+                parent=self.root, side="left", joined_date=self.today,
+            )
+            on_member_joined(m)
+        self.assertIsNotNone(self.stored_yesterday())
+
+    def test_tree_change_after_snapshot_gives_zero_delta(self):
+        def assert_recomputed():
+            self.assertIsNone(self.stored_yesterday())
+            self.assertEqual(
+                engine_leg_totals(self.today, save=False),
+                TreeSnapshot.load().leg_totals(self.today, self.yesterday),
+            )
+
+        # subtree joined yesterday moved to the other leg after the snapshot
+        engine_leg_totals(self.yesterday)
+        moved = Member.objects.get(auto_id="rocky004")
+        with transaction.atomic(), member_move(moved):
+            moved.parent = Member.objects.get(auto_id="rocky003")
+            moved.side = "right"
+            moved.save(update_fields=["parent", "side"])
+        assert_recomputed()
+
+        # admin back-dates a member that joined today (no tree event)
+        engine_leg_totals(self.yesterday)
+        Member.objects.filter(auto_id="rocky005").update(joined_date=self.yesterday - timedelta(days=1))
+        assert_recomputed()
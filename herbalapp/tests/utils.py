@@ -0,0 +1,23 @@
+# herbalapp/tests/utils.py
+from datetime import timedelta
+
+from herbalapp.models import Member
+
+
+def build_binary_tree(n, start):
+    """
+    rocky001 .. rocky{n-1} placed level by level (left, then right),
+    sponsor = parent, joined_date spread over start .. start + 2 days.
+    Returns the root member.
+    """
+    root = Member.objects.create(auto_id="rocky001", name="root", phone="1", joined_date=start)
+    queue = [(root, "left"), (root, "right")]
+    for i in range(2, n):
+        parent, side = queue.pop(0)
+        member = Member.objects.create(
+            auto_id=f"rocky{i:03d}", name=f"m{i}", phone="1",
+            parent=parent, side=side, sponsor=parent,
+            joined_date=start + timedelta(days=i % 3),
+        )
+        queue += [(member, "left"), (member, "right")]
+    return root
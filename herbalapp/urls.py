@@ -84,7 +84,9 @@ urlpatterns = [
 
     path("tree-modern/<str:root_id>/", views_tree.tree_modern_page, name="tree_modern_page"),
     path("tree-data/<str:root_id>/", views_tree.tree_data, name="tree_data"),
+    path("tree-api/<str:auto_id>/", views_tree.tree_api, name="tree_api"),
     path("member-details/<str:member_id>/", views_tree.member_details_api, name="member_details_api"),
+    path("sponsor-team/<str:member_id>/", views_tree.sponsor_team_api, name="sponsor_team_api"),
     path("member/root-income/", views.member_root_income_dashboard, name="member_root_income")
 ]
 
@@ -2,6 +2,7 @@
 
 from django.db import transaction
 from herbalapp.models import Member
+from herbalapp.mlm.tree_events import on_member_joined
 from .auto_id import generate_auto_id
 
 
@@ -29,7 +30,7 @@ def create_member(
             name=name,
             sponsor=sponsor,
             parent=parent,
-            position=position,
+            side=position,
             **extra_fields
         )
 
@@ -46,6 +47,9 @@ def create_member(
 
         member.save()
 
+        # ✅ Leg counters for every upline (same transaction)
+        on_member_joined(member)
+
         # -----------------------------
         # Update parent join counts
         # -----------------------------
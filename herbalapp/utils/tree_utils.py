@@ -13,23 +13,17 @@ def get_children(member: Member):
 
 def count_leg(member: Member, side: str):
     """
-    Count members in LEFT or RIGHT leg (recursive)
+    Count members in LEFT or RIGHT leg
     side = "L" or "R"
+    (Euler-tour range scan, see count_all_descendants)
     """
+    from herbalapp.mlm.final_master_engine import count_all_descendants
 
-    def _count(node):
-        total = 0
-        children = Member.objects.filter(placement=node)
-        for c in children:
-            total += 1
-            total += _count(c)
-        return total
+    if side == "L":
+        return count_all_descendants(member, "left")
 
-    if side == "L" and member.left_child:
-        return _count(member.left_child)
-
-    if side == "R" and member.right_child:
-        return _count(member.right_child)
+    if side == "R":
+        return count_all_descendants(member, "right")
 
     return 0
 
@@ -41,3 +35,51 @@ def get_leg_summary(member: Member):
         "right": count_leg(member, "R"),
     }
 
+
+
+# --------------------------------------------------
+# ✅ ANCESTOR CHAIN (ONE QUERY, RECURSIVE CTE)
+# --------------------------------------------------
+MAX_TREE_DEPTH = 100000
+
+_ANCESTOR_CHAIN_SQL = """
+    WITH RECURSIVE chain(id, parent_id, side, depth) AS (
+        SELECT id, parent_id, side, 0
+        FROM {table}
+        WHERE id = %s
+        UNION ALL
+        SELECT m.id, m.parent_id, m.side, c.depth + 1
+        FROM {table} m
+        JOIN chain c ON m.id = c.parent_id
+        WHERE c.depth < %s
+    )
+    SELECT parent_id, side
+    FROM chain
+    WHERE parent_id IS NOT NULL
+    ORDER BY depth
+"""
+
+
+def get_ancestor_chain(member_id):
+    """
+    Placement (parent) chain from the member up to the root.
+
+    Returns [(ancestor_id, side), ...] nearest first, where side is the
+    leg ("left"/"right") of that ancestor which contains the member.
+
+    Stops at the first node without a valid side: such a node is never
+    reached from its parent, so uplines above it do not count it.
+    """
+    from django.db import connection
+
+    sql = _ANCESTOR_CHAIN_SQL.format(table=Member._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [member_id, MAX_TREE_DEPTH])
+        rows = cursor.fetchall()
+
+    chain = []
+    for ancestor_id, side in rows:
+        if side not in ("left", "right"):
+            break
+        chain.append((ancestor_id, side))
+    return chain
@@ -530,6 +530,7 @@ from django.contrib import messages
 from django.views.decorators.http import require_POST
 
 from .models import Member
+from herbalapp.mlm.tree_events import member_move, member_remove, on_member_joined
 
 
 # =========================
@@ -576,16 +577,17 @@ def delete_member(request, auto_id):
         )
         return redirect("member_list")
 
-    # ✅ Detach safely from parent
-    parent = member.parent
-    if parent:
-        if parent.left_child_id == member.id:
-            parent.left_child = None
-        elif parent.right_child_id == member.id:
-            parent.right_child = None
-        parent.save(update_fields=["left_child", "right_child"])
+    with transaction.atomic(), member_remove(member):
+        # ✅ Detach safely from parent
+        parent = member.parent
+        if parent:
+            if parent.left_child_id == member.id:
+                parent.left_child = None
+            elif parent.right_child_id == member.id:
+                parent.right_child = None
+            parent.save(update_fields=["left_child", "right_child"])
 
-    member.delete()
+        member.delete()
 
     messages.success(request, f"✅ {member.name} deleted successfully!")
     return redirect("member_list")
@@ -651,7 +653,7 @@ def replace_member(request, auto_id):
         # =========================
         # 🔐 ATOMIC TREE MOVE
         # =========================
-        with transaction.atomic():
+        with transaction.atomic(), member_move(member):
 
             # Detach from old parent
             old_parent = member.parent
@@ -913,16 +915,26 @@ from django.urls import reverse
 # ======================================================
 # ROBUST TREE FUNCTIONS
 # ======================================================
+from herbalapp.mlm.tree_cache import cached_fragment, member_etag, not_modified, with_etag
+
 def _get_children(member):
     if not member:
         return None, None
-    return member.left_child, member.right_child()
+    return member.left_child(), member.right_child()
 
 
 def build_tree_html(member):
     if not member:
         return ""
 
+    # ✅ Whole-subtree markup cached per tree_version (bumped on join / move / delete)
+    return cached_fragment("ul", member, "all", lambda: _build_tree_html(member))
+
+
+def _build_tree_html(member):
+    if not member:
+        return ""
+
     left, right = _get_children(member)
 
     # ✅ Safe escaping
@@ -944,7 +956,7 @@ def build_tree_html(member):
     # LEFT CHILD
     # -------------------------
     if left:
-        node_html += build_tree_html(left)
+        node_html += _build_tree_html(left)
     else:
         add_url = reverse('add_member_form') + f"?parent={member.auto_id}&side=left"
         node_html += (
@@ -956,7 +968,7 @@ def build_tree_html(member):
     # RIGHT CHILD
     # -------------------------
     if right:
-        node_html += build_tree_html(right)
+        node_html += _build_tree_html(right)
     else:
         add_url = reverse('add_member_form') + f"?parent={member.auto_id}&side=right"
         node_html += (
@@ -969,6 +981,7 @@ def build_tree_html(member):
 
 from django.shortcuts import render, get_object_or_404
 from herbalapp.models import Member
+from herbalapp.mlm.leg_stats import get_leg_counts
 
 def tree_view(request, auto_id):
     # Normalize numeric ID → auto_id
@@ -982,9 +995,8 @@ def tree_view(request, auto_id):
     # Load member safely
     member = get_object_or_404(Member, auto_id=auto_id)
 
-    # Corrected counts
-    left_count = member.children.filter(side="left").count()
-    right_count = member.children.filter(side="right").count()
+    # ✅ Whole-leg counts (O(1) from MemberLegStats)
+    left_count, right_count = get_leg_counts(member)
     pairs = min(left_count, right_count)
 
     context = {
@@ -1107,6 +1119,7 @@ from django.http import JsonResponse
 from django.utils import timezone
 from datetime import timedelta
 from .models import Member
+from herbalapp.mlm.bv_rollup import get_member_bv, get_month_bv, previous_month
 
 def member_detail_json(request, auto_id):
     # -------------------------
@@ -1131,22 +1144,22 @@ def member_detail_json(request, auto_id):
         return JsonResponse({"error": "Member not found"}, status=404)
 
     # -------------------------
-    # BV calculation
+    # ETag: subtree version + last month -> 304 when unchanged
     # -------------------------
-    bv_data = member.calculate_bv()  # Should return self_bv, left_bv, right_bv, total_bv
+    etag = member_etag(member, previous_month())
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
 
     # -------------------------
-    # Last month BV
+    # BV (one MemberBV row, no downline walk)
     # -------------------------
-    last_month_start = (timezone.now().replace(day=1) - timedelta(days=1)).replace(day=1)
-    last_month_end = (last_month_start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    bv_data = get_member_bv(member)  # self_bv, left_bv, right_bv, total_bv, matched_bv
 
-    last_month_orders = member.order_set.filter(
-        status="Paid",
-        created_at__date__gte=last_month_start,
-        created_at__date__lte=last_month_end
-    )
-    last_month_bv = sum(o.product.bv_value * o.quantity for o in last_month_orders) if last_month_orders else 0
+    # -------------------------
+    # Last month BV (one MemberMonthlyBV row)
+    # -------------------------
+    last_month_bv = get_month_bv(member, previous_month())["self_bv"]
 
     # -------------------------
     # Sponsor / Binary / Flashout / Carry forward
@@ -1180,7 +1193,7 @@ def member_detail_json(request, auto_id):
         "carry_forward_pairs": int(carry_forward_pairs),
     }
 
-    return JsonResponse(data)
+    return with_etag(JsonResponse(data), etag)
 
 
 from django.db.models import Prefetch
@@ -1269,7 +1282,9 @@ def edit_member(request, auto_id):
 
 
 from django.shortcuts import render as ___render, get_object_or_404 as ___get, redirect as ___redirect
+from django.db import transaction
 from .models import Member as ___Member
+from herbalapp.mlm.tree_events import on_sponsor_changed
 
 def edit_sponsor(request, auto_id):
 
@@ -1294,8 +1309,14 @@ def edit_sponsor(request, auto_id):
         sponsor = ___Member.objects.filter(auto_id=sponsor_auto_id).first()
 
         if sponsor:
-            member.parent = sponsor
-            member.save()
+            # ✅ Sponsor tree only (placement is changed by the move screen)
+            try:
+                with transaction.atomic():
+                    member.sponsor = sponsor
+                    member.save(update_fields=["sponsor"])
+                    on_sponsor_changed(member)
+            except ValueError as exc:
+                return ___render(request, 'edit_sponsor.html', {'member': member, 'error': str(exc)})
 
             # ✅ Redirect to modern avatar tree (CORRECT)
             return ___redirect('member_tree_modern', auto_id=member.auto_id)
@@ -1940,10 +1961,16 @@ def member_bv(request, auto_id):
     else:
         member = get_object_or_404(Member, auto_id=auto_id)
 
-    # ✅ Calculate BV safely
-    bv_data = member.calculate_bv()  # returns dict: self_bv, left_bv, right_bv, total_bv
+    # ✅ Unchanged subtree BV -> 304 (version bumped by Paid orders below)
+    etag = member_etag(member)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    # ✅ BV from MemberBV rollup (one row read)
+    bv_data = get_member_bv(member)  # returns dict: self_bv, left_bv, right_bv, total_bv
 
-    return JsonResponse(bv_data)
+    return with_etag(JsonResponse(bv_data), etag)
 
 
 from django.shortcuts import render, redirect
@@ -1996,22 +2023,24 @@ def member_register(request):
             return redirect("member_register")
 
         # -------- SAVE MEMBER --------
-        Member.objects.create(
-            name=name,
-            phone=mobile,
-            email=email,
-            auto_id=auto_id,
-
-            placement_id=placement_id,   # STRING auto_id
-            sponsor_id=sponsor_id,       # STRING auto_id
-            parent=parent,               # FK
-            side=side,                   # left / right
-
-            place=place,
-            district=district,
-            pincode=pincode,
-            aadhar=aadhar,
-        )
+        with transaction.atomic():
+            new_member = Member.objects.create(
+                name=name,
+                phone=mobile,
+                email=email,
+                auto_id=auto_id,
+
+                placement_id=placement_id,   # STRING auto_id
+                sponsor_id=sponsor_id,       # STRING auto_id
+                parent=parent,               # FK
+                side=side,                   # left / right
+
+                place=place,
+                district=district,
+                pincode=pincode,
+                aadhar=aadhar,
+            )
+            on_member_joined(new_member)
 
         messages.success(
             request,
@@ -2181,6 +2210,7 @@ def add_member_under_parent(request, parent_id, position):
             joined_date=timezone.localdate(),
             is_active=True,
         )
+        on_member_joined(new_member)
 
         messages.success(
             request,
@@ -2315,6 +2345,7 @@ def add_member_form(request):
             side=side,          # 🔥 left / right
             sponsor=sponsor     # 🔥 Sponsor / referral
         )
+        on_member_joined(new_member)
 
         messages.success(
             request,
@@ -2546,85 +2577,15 @@ def income_api(request):
 from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
 from herbalapp.models import Member
 
-# ✅ Use your existing engine function (best counts)
-from herbalapp.mlm.final_master_engine import count_all_descendants
-
-def tree_modern_page(request, root_id="rocky002"):
-    return render(request, "tree.html", {"root_id": root_id})
-
-def tree_data(request, root_id):
-    root = get_object_or_404(Member, auto_id=root_id)
+# ✅ O(1) leg counts (MemberLegStats)
+from herbalapp.mlm.leg_stats import get_leg_counts
 
-    collected = []
-
-    def dfs(parent):
-        children = Member.objects.filter(parent=parent, is_active=True).order_by("id")
-        for c in children:
-            collected.append(c)
-            dfs(c)
-
-    dfs(root)
-
-    def avatar_url(m):
-        img = getattr(m, "avatar", None)
-        if img and hasattr(img, "url"):
-            return img.url
-        return "/static/img/default-avatar.png"
-
-    nodes = [{
-        "data": {
-            "id": root.auto_id,
-            "name": root.name,
-            "bv": str(root.bv or 0),
-            "avatar": avatar_url(root),
-        }
-    }]
-
-    edges = []
-
-    for m in collected:
-        nodes.append({
-            "data": {
-                "id": m.auto_id,
-                "name": m.name,
-                "bv": str(m.bv or 0),
-                "avatar": avatar_url(m),
-            }
-        })
-        if m.parent:
-            edges.append({
-                "data": {
-                    "source": m.parent.auto_id,
-                    "target": m.auto_id
-                }
-            })
-
-    return JsonResponse({"nodes": nodes, "edges": edges})
-
-def member_details_api(request, member_id):
-    m = get_object_or_404(Member, auto_id=member_id)
-
-    left_count = count_all_descendants(m, "left", as_of_date=None)
-    right_count = count_all_descendants(m, "right", as_of_date=None)
-
-    img = getattr(m, "avatar", None)
-    avatar = img.url if img and hasattr(img, "url") else "/static/img/default-avatar.png"
-
-    return JsonResponse({
-        "auto_id": m.auto_id,
-        "name": m.name,
-        "joined_date": str(m.joined_date) if m.joined_date else "",
-        "left_count": left_count,
-        "right_count": right_count,
-        "bv": str(m.bv or 0),
-        "avatar": avatar,
-        "sponsor": m.sponsor.auto_id if m.sponsor else "",
-        "parent": m.parent.auto_id if m.parent else "",
-        "side": m.side or "",
-    })
+# ✅ Tree page + tree JSON APIs: single copy in views_tree
+from herbalapp.views_tree import tree_modern_page, tree_data, member_details_api  # noqa: F401
 from django.utils import timezone
 from django.db.models import Sum, Value, DecimalField
 from django.db.models.functions import Coalesce
@@ -2639,8 +2600,8 @@ def member_root_income_dashboard(request):
         messages.error(request, "Member profile not found.")
         return redirect("member_list")
 
-    # ✅ BV (life-time)
-    bv_data = member.calculate_bv()
+    # ✅ BV (life-time, MemberBV rollup row)
+    bv_data = get_member_bv(member)
     left_bv = bv_data.get("left_bv", 0)
     right_bv = bv_data.get("right_bv", 0)
     matched_bv = bv_data.get("matched_bv", 0)
@@ -1,74 +1,70 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.gzip import gzip_page
 from datetime import timedelta
 from herbalapp.models import Member
 
-# Use your existing engine function (best counts)
-from herbalapp.mlm.final_master_engine import count_all_descendants
+# ✅ O(1) leg counts (MemberLegStats)
+from herbalapp.mlm.leg_stats import get_leg_counts
+from herbalapp.mlm.sponsor_closure import generation_report
+from herbalapp.mlm.tree_cache import member_etag, not_modified, with_etag
+from herbalapp.mlm.tree_query import bounded_subtree, clamp_depth, columnar_tree, stream_tree_json, subtree_fragment
 
 def tree_modern_page(request, root_id="rocky002"):
     return render(request, "tree.html", {"root_id": root_id})
 
+@gzip_page
 def tree_data(request, root_id):
     root = get_object_or_404(Member, auto_id=root_id)
 
-    collected = []
-
-    def dfs(parent):
-        children = Member.objects.filter(parent=parent, is_active=True).order_by("id")
-        for c in children:
-            collected.append(c)
-            dfs(c)
-
-    dfs(root)
-
-    def avatar_url(m):
-        img = getattr(m, "avatar", None)
-        if img and hasattr(img, "url"):
-            return img.url
-        return "/static/img/default-avatar.png"
-
-    nodes = [{
-        "data": {
-            "id": root.auto_id,
-            "name": root.name,
-            "bv": str(root.bv or 0),
-            "avatar": avatar_url(root),
-        }
-    }]
-
-    edges = []
-
-    for m in collected:
-        nodes.append({
-            "data": {
-                "id": m.auto_id,
-                "name": m.name,
-                "bv": str(m.bv or 0),
-                "avatar": avatar_url(m),
-            }
-        })
-        if m.parent:
-            edges.append({
-                "data": {
-                    "source": m.parent.auto_id,
-                    "target": m.auto_id
-                }
-            })
-
-    return JsonResponse({"nodes": nodes, "edges": edges})
+    # ✅ Nothing changed below root -> 304, no tree query at all
+    etag = member_etag(root, request.GET.urlencode())
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    # ✅ ?format=columnar -> compact parallel arrays (same downline, ONE query)
+    if request.GET.get("format") == "columnar":
+        return with_etag(JsonResponse(columnar_tree(root)), etag)
+
+    # ✅ Whole downline in ONE recursive query, JSON streamed in chunks
+    response = StreamingHttpResponse(stream_tree_json(root), content_type="application/json")
+    return with_etag(response, etag)
+
+def tree_api(request, auto_id):
+    """
+    ✅ Lazy tree expansion: GET /tree-api/<auto_id>/?depth=3
+    - bounded subtree (ONE query) with leg counts + "has_more" markers
+    - ?format=html -> same markup as the tree page, for in-place expand
+    """
+    root = get_object_or_404(Member, auto_id=auto_id)
+    depth = clamp_depth(request.GET.get("depth"))
+
+    if request.GET.get("format") == "html":
+        # ✅ cached per subtree version (mlm/tree_cache.py)
+        return HttpResponse(subtree_fragment(root, depth))
+
+    nodes = bounded_subtree(root, depth)
+    return JsonResponse({"root": root.auto_id, "depth": depth, "nodes": nodes})
 
 def member_details_api(request, member_id):
     m = get_object_or_404(Member, auto_id=member_id)
 
-    left_count = count_all_descendants(m, "left", as_of_date=None)
-    right_count = count_all_descendants(m, "right", as_of_date=None)
+    etag = member_etag(m, request.GET.urlencode())
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    # ✅ ?as_of=YYYY-MM-DD -> leg counts as on that day
+    as_of = parse_date(request.GET.get("as_of") or "")
+    left_count, right_count = get_leg_counts(m, as_of_date=as_of)
 
     img = getattr(m, "avatar", None)
     avatar = img.url if img and hasattr(img, "url") else "/static/img/default-avatar.png"
 
-    return JsonResponse({
+    response = JsonResponse({
         "auto_id": m.auto_id,
         "name": m.name,
         "joined_date": str(m.joined_date) if m.joined_date else "",
@@ -80,4 +76,19 @@ def member_details_api(request, member_id):
         "parent": m.parent.auto_id if m.parent else "",
         "side": m.side or "",
     })
+    return with_etag(response, etag)
 
+
+def sponsor_team_api(request, member_id):
+    """✅ Sponsor-tree generations (closure table, ?levels=N to limit depth)"""
+    m = get_object_or_404(Member, auto_id=member_id)
+
+    levels = request.GET.get("levels")
+    max_level = int(levels) if levels and levels.isdigit() else None
+
+    generations = generation_report(m, max_level)
+    return JsonResponse({
+        "auto_id": m.auto_id,
+        "total": sum(g["members"] for g in generations),
+        "generations": generations,
+    })
@@ -11,6 +11,7 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "rocky_herbals2.settings")
 django.setup()
 
 from herbalapp.models import Member, DailyIncomeReport
+from herbalapp.mlm.final_master_engine import count_all_descendants
 
 ROOT_ID = "rocky004"   # Dummy/root member
 today = date.today()    # Or set specific date
@@ -30,22 +31,9 @@ DailyIncomeReport.objects.filter(member__auto_id=ROOT_ID).update(
 # Step 2: Recalculate left/right counts dynamically
 # ----------------------------
 def recalc_counts(member):
-    left_total = 0
-    right_total = 0
-
-    left_children = Member.objects.filter(parent=member, side="left").exclude(auto_id=ROOT_ID)
-    right_children = Member.objects.filter(parent=member, side="right").exclude(auto_id=ROOT_ID)
-
-    left_total += left_children.count()
-    right_total += right_children.count()
-
-    for child in left_children:
-        l, r = recalc_counts(child)
-        left_total += l + r
-
-    for child in right_children:
-        l, r = recalc_counts(child)
-        right_total += l + r
+    # ✅ Euler-tour range scans instead of a recursive walk per member
+    left_total = count_all_descendants(member, "left")
+    right_total = count_all_descendants(member, "right")
 
     # Update carry_forward counts
     member.left_carry_forward = left_total